@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of the enumerators of matchings, run with ``python -m benchmarks``."""
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Contains the reproducible families of bipartite graphs used by the benchmarks.
+
+Every graph has the ``bipartite`` node attribute expected by the enumerators, and random graphs
+are drawn from a fixed seed.
+"""
+import itertools
+
+import networkx as nx
+
+from py_bipartite_matching.biparite_sample import davis_southern_women_graph
+
+__all__ = [
+    'random_graph', 'complete_graph', 'ladder_graph', 'cycle_graph', 'davis_graph',
+    'cubelet_graph'
+]
+
+# Faces of the eight corner cubelets of a Rubik's cube, and a scrambled sequence of their faces
+_CUBELETS = ['URF', 'DFR', 'UFL', 'DLF', 'ULB', 'DBL', 'DRB', 'UBR']
+_CUBELET_EXAMPLE = 'FLUUFFLB'
+
+
+def _with_sides(graph: nx.Graph) -> nx.Graph:
+    # Sets the `bipartite` attribute from a 2-colouring, the side of node 0 being the top one
+    # `nx.bipartite.color` gives node 0 the colour 1
+    nx.set_node_attributes(graph, {node: 1 - colour
+                                   for node, colour in nx.bipartite.color(graph).items()},
+                           'bipartite')
+    return graph
+
+
+def random_graph(n: int, m: int, p: float, seed: int = 0) -> nx.Graph:
+    """Returns a random G(n, m, p) graph, where each of the n * m edges is kept with
+    probability p."""
+    return nx.bipartite.random_graph(n, m, p, seed=seed)
+
+
+def complete_graph(n: int) -> nx.Graph:
+    """Returns the complete bipartite graph K_{n,n}."""
+    return nx.complete_bipartite_graph(n, n)
+
+
+def ladder_graph(n: int) -> nx.Graph:
+    """Returns the ladder with n rungs, whose perfect matchings are counted by Fibonacci."""
+    return _with_sides(nx.ladder_graph(n))
+
+
+def cycle_graph(n: int) -> nx.Graph:
+    """Returns the cycle with n nodes on each side."""
+    return _with_sides(nx.cycle_graph(2 * n))
+
+
+def davis_graph() -> nx.Graph:
+    """Returns the Davis Southern Women graph, 18 women attending 14 events."""
+    return davis_southern_women_graph()
+
+
+def cubelet_graph(copies: int = 1) -> nx.Graph:
+    """Returns the graph between the faces of a scrambled cube and its corner cubelets, with
+    ``copies`` disjoint copies of it."""
+    graph = nx.Graph()
+    for copy in range(copies):
+        faces = [(copy, 'face', i) for i in range(len(_CUBELET_EXAMPLE))]
+        cubelets = [(copy, 'cubelet', i) for i in range(len(_CUBELETS))]
+        graph.add_nodes_from(faces, bipartite=0)
+        graph.add_nodes_from(cubelets, bipartite=1)
+        graph.add_edges_from(
+            (face, cubelet)
+            for (face, color), (cubelet, colors) in itertools.product(
+                zip(faces, _CUBELET_EXAMPLE), zip(cubelets, _CUBELETS)) if color in colors)
+    return graph
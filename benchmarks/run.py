@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""Contains the cases of the benchmarks, their measures and the comparison of two runs.
+
+Each case enumerates the matchings of a graph until ``max_matchings`` are found or
+``max_seconds`` have passed. The timing pass records the time to the first matching, the
+throughput and the percentiles of the delay between two matchings. The peak memory is measured
+in a second pass over the first matchings with `tracemalloc`, which slows the enumeration down
+too much to be timed.
+
+Results are saved as JSON. A run compared with a baseline fails when a case is slower or uses
+more memory than the baseline by more than a threshold.
+"""
+import argparse
+import fnmatch
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+import networkx as nx
+
+import py_bipartite_matching
+from py_bipartite_matching.py_bipartite_matching import (enum_perfect_matchings,
+                                                         enum_maximum_matchings,
+                                                         enum_maximal_matchings)
+from py_bipartite_matching.brute_force_bipartite_matching import (
+    brute_force_enum_perfect_matchings, brute_force_enum_maximum_matchings,
+    brute_force_enum_maximal_matchings)
+
+from . import graphs
+
+__all__ = ['Case', 'CASES', 'measure', 'run_cases', 'compare', 'main']
+
+FORMAT_VERSION = 1
+MAX_MATCHINGS = 10000
+MAX_SECONDS = 1.0
+THRESHOLD = 0.25
+# Matchings enumerated by the pass of tracemalloc, enough to reach the peak of the enumerators
+# that keep their state between two matchings
+MEMORY_MATCHINGS = 1000
+PERCENTILES = (50, 90, 99)
+
+
+class Case(NamedTuple):
+    """Benchmark of an enumerator on a graph, built once before it is measured."""
+    name: str
+    enumerator: Callable[[nx.Graph], Iterator[Any]]
+    graph: Callable[[], nx.Graph]
+
+
+CASES = [
+    Case('perfect/complete-8', enum_perfect_matchings, lambda: graphs.complete_graph(8)),
+    Case('perfect/ladder-40', enum_perfect_matchings, lambda: graphs.ladder_graph(40)),
+    Case('perfect/cycle-200', enum_perfect_matchings, lambda: graphs.cycle_graph(200)),
+    Case('perfect/random-40-0.2', enum_perfect_matchings,
+         lambda: graphs.random_graph(40, 40, 0.2)),
+    Case('perfect/random-200-0.04', enum_perfect_matchings,
+         lambda: graphs.random_graph(200, 200, 0.04)),
+    Case('perfect/cubelets-3', enum_perfect_matchings, lambda: graphs.cubelet_graph(3)),
+    Case('maximum/davis', enum_maximum_matchings, graphs.davis_graph),
+    Case('maximum/random-30x40-0.1', enum_maximum_matchings,
+         lambda: graphs.random_graph(30, 40, 0.1)),
+    Case('maximum/ladder-41', enum_maximum_matchings, lambda: graphs.ladder_graph(41)),
+    Case('maximal/davis', enum_maximal_matchings, graphs.davis_graph),
+    Case('maximal/ladder-20', enum_maximal_matchings, lambda: graphs.ladder_graph(20)),
+    Case('maximal/random-20-0.2', enum_maximal_matchings,
+         lambda: graphs.random_graph(20, 20, 0.2)),
+    Case('brute-force-perfect/complete-7', brute_force_enum_perfect_matchings,
+         lambda: graphs.complete_graph(7)),
+    Case('brute-force-perfect/cubelets-1', brute_force_enum_perfect_matchings,
+         graphs.cubelet_graph),
+    Case('brute-force-maximum/random-10x12-0.3', brute_force_enum_maximum_matchings,
+         lambda: graphs.random_graph(10, 12, 0.3)),
+    Case('brute-force-maximal/ladder-10', brute_force_enum_maximal_matchings,
+         lambda: graphs.ladder_graph(10)),
+]
+
+
+def measure(matchings: Callable[[], Iterator[Any]],
+            max_matchings: int = MAX_MATCHINGS,
+            max_seconds: float = MAX_SECONDS,
+            trace_memory: bool = True) -> Dict[str, Any]:
+    """Measures the enumeration of the iterator returned by ``matchings``.
+
+    The times are in seconds and include the call of ``matchings``. ``peak_memory`` is in bytes,
+    `None` when ``trace_memory`` is False.
+    """
+    delays = []
+    start = previous = time.perf_counter()
+    iterator = matchings()
+    for _ in iterator:
+        now = time.perf_counter()
+        delays.append(now - previous)
+        previous = now
+        if len(delays) >= max_matchings or now - start >= max_seconds:
+            break
+    total = previous - start
+    _close(iterator)
+
+    result: Dict[str, Any] = {
+        'matchings': len(delays),
+        'complete': len(delays) < max_matchings and total < max_seconds,
+        'total_time': total,
+        'time_to_first': delays[0] if delays else None,
+        'matchings_per_second': len(delays) / total if delays and total > 0 else None,
+    }
+    for percentile, delay in zip(PERCENTILES, _percentiles(delays)):
+        result[f'delay_p{percentile}'] = delay
+    result['delay_max'] = max(delays) if delays else None
+    if trace_memory:
+        result['peak_memory'] = _peak_memory(matchings, min(len(delays), MEMORY_MATCHINGS))
+    else:
+        result['peak_memory'] = None
+    return result
+
+
+def _close(iterator: Iterator[Any]) -> None:
+    # Stops a generator left before its end, so that it releases its state
+    close = getattr(iterator, 'close', None)
+    if close is not None:
+        close()
+
+
+def _percentiles(delays: List[float]) -> List[Optional[float]]:
+    if not delays:
+        return [None] * len(PERCENTILES)
+    return [float(value) for value in np.percentile(delays, PERCENTILES)]
+
+
+def _peak_memory(matchings: Callable[[], Iterator[Any]], n_matchings: int) -> int:
+    # Peak of the memory allocated while the first `n_matchings` are enumerated again
+    tracemalloc.start()
+    try:
+        iterator = matchings()
+        for _ in zip(range(n_matchings), iterator):
+            pass
+        _close(iterator)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_cases(cases: List[Case],
+              max_matchings: int = MAX_MATCHINGS,
+              max_seconds: float = MAX_SECONDS,
+              trace_memory: bool = True,
+              log: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """Measures ``cases`` and returns the results with a description of the environment."""
+    results = {}
+    for case in cases:
+        graph = case.graph()
+        result = measure(lambda: case.enumerator(graph), max_matchings, max_seconds,
+                         trace_memory)
+        result['nodes'] = graph.number_of_nodes()
+        result['edges'] = graph.number_of_edges()
+        results[case.name] = result
+        if log is not None:
+            log(_format_result(case.name, result))
+    return {
+        'format_version': FORMAT_VERSION,
+        'package_version': py_bipartite_matching.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'max_matchings': max_matchings,
+        'max_seconds': max_seconds,
+        'results': results,
+    }
+
+
+def _format_result(name: str, result: Dict[str, Any]) -> str:
+
+    def seconds(value: Optional[float]) -> str:
+        return '-' if value is None else f'{value * 1e6:.1f}us'
+
+    rate = result['matchings_per_second']
+    memory = result['peak_memory']
+    return (f"{name:<40} {result['matchings']:>7}{'' if result['complete'] else '+'} "
+            f"first {seconds(result['time_to_first'])}  "
+            f"{'-' if rate is None else f'{rate:.0f}'}/s  "
+            f"p50 {seconds(result['delay_p50'])}  p99 {seconds(result['delay_p99'])}  "
+            f"peak {'-' if memory is None else f'{memory / 1024:.0f}KiB'}")
+
+
+# Measures compared between runs, and whether a larger value is better
+_COMPARED = (('matchings_per_second', True), ('time_to_first', False), ('peak_memory', False))
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any],
+            threshold: float = THRESHOLD) -> List[str]:
+    """Returns the regressions of ``current`` with respect to ``baseline``.
+
+    A measure regresses when it is worse than the baseline by more than ``threshold``, a
+    fraction of the baseline. Cases missing from either run are ignored.
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        for key, larger_is_better in _COMPARED:
+            old = reference.get(key)
+            new = result.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if larger_is_better else change) > threshold:
+                regressions.append(f'{name}: {key} {old:.4g} -> {new:.4g} ({change:+.0%})')
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description=__doc__.split('\n')[0])
+    parser.add_argument('--output', help='file to save the results to, as JSON')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='largest relative slowdown allowed (default: %(default)s)')
+    parser.add_argument('--filter', default='*',
+                        help='shell pattern of the names of the cases to run')
+    parser.add_argument('--max-matchings', type=int, default=MAX_MATCHINGS)
+    parser.add_argument('--max-seconds', type=float, default=MAX_SECONDS)
+    parser.add_argument('--no-memory', action='store_true', help='skip the pass of tracemalloc')
+    parser.add_argument('--list', action='store_true', help='list the cases and exit')
+    args = parser.parse_args(argv)
+
+    cases = [case for case in CASES if fnmatch.fnmatchcase(case.name, args.filter)]
+    if args.list:
+        for case in cases:
+            print(case.name)
+        return
+
+    current = run_cases(cases, args.max_matchings, args.max_seconds, not args.no_memory, print)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(current, file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(baseline, current, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regression beyond {args.threshold:.0%}')
@@ -6,5 +6,11 @@ __version__ = '0.2.0'
 
 # flake8: noqa
 
-from .py_bipartite_matching import enum_maximum_matchings, enum_perfect_matchings
+from .py_bipartite_matching import (enum_maximum_matchings, enum_perfect_matchings,
+                                    factorize_perfect_matchings, matching_array_labels)
+from .factorized_matchings import FactorizedMatchings
+from .stats import EnumerationStats
+from .counting import count_maximum_matchings, count_perfect_matchings
+from .sampling import sample_perfect_matchings
+from .storage import MatchingFile, write_matchings
 from .graphs_utils import top_nodes, bottom_nodes, draw_bipartite, draw_matching
\ No newline at end of file
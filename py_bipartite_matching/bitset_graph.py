@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""Contains a bitset representation of small bipartite graphs and the search of perfect matchings.
+
+The neighbourhood of every node is a Python int whose bit i stands for the i-th node of the other
+side. Each pair of a top node with its partner in M is a node of the pair graph, with an arc from
+pair i to pair j when the bottom node of i is adjacent to the top node of j. Its strongly
+connected components are those of D(G, M), and they are found with a few unions of neighbourhoods
+per component: the pairs reachable from a pair, then the ones among them that reach it back.
+
+The search makes the same choices as the one on `CompactBipartiteGraph` and yields the matchings in
+the same order. It only pays off on small dense graphs, where a union of neighbourhoods replaces
+a scan of many edges.
+"""
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .compact_graph import CompactBipartiteGraph, UNMATCHED
+from .stats import EnumerationStats
+
+__all__ = ['BitsetBipartiteGraph']
+
+# Largest side of the graphs searched on bitsets, and smallest density of their edges. The bitset
+# search is about twice as fast on dense graphs, and both searches are on par on graphs of 64 top
+# nodes with 3 edges per node.
+MAX_BITSET_SIZE = 64
+MIN_BITSET_DENSITY = 1 / 16
+
+
+def _bits(mask: int) -> Iterator[int]:
+    # Positions of the set bits of `mask`, from the lowest one
+    while mask:
+        bit = mask & -mask
+        yield bit.bit_length() - 1
+        mask ^= bit
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count('1')
+
+
+class BitsetBipartiteGraph:
+    """Balanced bipartite graph with a perfect matching, stored as bitsets of neighbours.
+
+    ``top_adjacency[t]`` holds the bottom neighbours of the top node t and
+    ``bottom_adjacency[b]`` the top neighbours of the bottom node b, over the alive edges of a
+    `CompactBipartiteGraph`. ``mate`` holds the bottom node of each top node in M and
+    ``bottom_mate`` the reverse. ``degree`` is indexed like the nodes of the compact graph, top
+    nodes first.
+    """
+
+    def __init__(self, compact_graph: CompactBipartiteGraph, match: List[int]) -> None:
+        n_top = compact_graph.n_top
+        self.n_top = n_top
+        self.labels = compact_graph.labels
+        self.top_adjacency = [0] * n_top
+        self.bottom_adjacency = [0] * (compact_graph.n_nodes - n_top)
+        # Bottom neighbours of every top node in the order of the compact graph, which decides
+        # between edges of the same degree
+        self.top_neighbors: List[List[int]] = []
+        for top in range(n_top):
+            neighbors = []
+            for p in range(compact_graph.indptr[top], compact_graph.indptr[top + 1]):
+                bottom = compact_graph.indices[p] - n_top
+                neighbors.append(bottom)
+                if compact_graph.alive[compact_graph.edge_ids[p]]:
+                    self.top_adjacency[top] |= 1 << bottom
+                    self.bottom_adjacency[bottom] |= 1 << top
+            self.top_neighbors.append(neighbors)
+        self.mate = [compact_graph.edge_bottom[match[top]] - n_top for top in range(n_top)]
+        self.bottom_mate = [UNMATCHED] * len(self.bottom_adjacency)
+        for top, bottom in enumerate(self.mate):
+            self.bottom_mate[bottom] = top
+        self.degree = list(compact_graph.degree)
+
+    @staticmethod
+    def is_suitable(compact_graph: CompactBipartiteGraph) -> bool:
+        """Tells whether the perfect matchings of a balanced graph are found faster on bitsets."""
+        n_top = compact_graph.n_top
+        return (0 < n_top <= MAX_BITSET_SIZE and
+                compact_graph.n_edges >= MIN_BITSET_DENSITY * n_top * n_top)
+
+    def matching_to_dict(self, mate: List[int]) -> Dict[Any, Any]:
+        """Converts ``mate`` to a top -> bottom dict of labels."""
+        labels = self.labels
+        n_top = self.n_top
+        return {labels[top]: labels[n_top + bottom] for top, bottom in enumerate(mate)}
+
+    def _state(self) -> Tuple[List[int], ...]:
+        return (self.top_adjacency[:], self.bottom_adjacency[:], self.mate[:],
+                self.bottom_mate[:], self.degree[:])
+
+    def _restore(self, state: Tuple[List[int], ...]) -> None:
+        (self.top_adjacency[:], self.bottom_adjacency[:], self.mate[:], self.bottom_mate[:],
+         self.degree[:]) = state
+
+    def _component(self, top: int) -> int:
+        # Pairs of the strongly connected component of `top`. In a trimmed graph it is the set of
+        # pairs reachable from it.
+        bottom_adjacency = self.bottom_adjacency
+        mate = self.mate
+        reached = frontier = 1 << top
+        while frontier:
+            successors = 0
+            for pair in _bits(frontier):
+                successors |= bottom_adjacency[mate[pair]]
+            frontier = successors & ~reached
+            reached |= frontier
+        return reached
+
+    def _remove_edge(self, top: int, bottom: int) -> None:
+        self.top_adjacency[top] &= ~(1 << bottom)
+        self.bottom_adjacency[bottom] &= ~(1 << top)
+        self.degree[top] -= 1
+        self.degree[self.n_top + bottom] -= 1
+
+    def _remove_nodes_of_edge(self, top: int, bottom: int) -> None:
+        top_adjacency = self.top_adjacency
+        bottom_adjacency = self.bottom_adjacency
+        for neighbor in _bits(top_adjacency[top]):
+            bottom_adjacency[neighbor] &= ~(1 << top)
+            self.degree[self.n_top + neighbor] -= 1
+        for neighbor in _bits(bottom_adjacency[bottom]):
+            top_adjacency[neighbor] &= ~(1 << bottom)
+            self.degree[neighbor] -= 1
+        top_adjacency[top] = bottom_adjacency[bottom] = 0
+        self.degree[top] = self.degree[self.n_top + bottom] = 0
+
+    def trim(self, pairs: int) -> None:
+        """Removes the edges between different strongly connected components of the pair graph.
+
+        ``pairs`` are the pairs whose components may have changed, which hold whole components
+        since no edge leaves them.
+        """
+        top_adjacency = self.top_adjacency
+        bottom_adjacency = self.bottom_adjacency
+        mate = self.mate
+        bottom_mate = self.bottom_mate
+        degree = self.degree
+        n_top = self.n_top
+        remaining = pairs
+        while remaining:
+            root = remaining & -remaining
+            # Pairs reachable from the root, then the ones among them that reach it back
+            forward = self._component(root.bit_length() - 1) & remaining
+            forward_bottoms = 0
+            for pair in _bits(forward):
+                forward_bottoms |= 1 << mate[pair]
+            component = frontier = root
+            component_bottoms = 1 << mate[root.bit_length() - 1]
+            while frontier:
+                predecessors = 0
+                for pair in _bits(frontier):
+                    predecessors |= top_adjacency[pair]
+                new_bottoms = predecessors & forward_bottoms & ~component_bottoms
+                component_bottoms |= new_bottoms
+                frontier = 0
+                for bottom in _bits(new_bottoms):
+                    frontier |= 1 << bottom_mate[bottom]
+                component |= frontier
+            remaining &= ~component
+
+            # A single pair is on no cycle, its matching edge goes as well
+            keep = component_bottoms if component != root else 0
+            for pair in _bits(component):
+                removed = top_adjacency[pair] & ~keep
+                if removed:
+                    top_adjacency[pair] ^= removed
+                    for bottom in _bits(removed):
+                        bottom_adjacency[bottom] &= ~(1 << pair)
+                        degree[n_top + bottom] -= 1
+                    degree[pair] = _popcount(top_adjacency[pair])
+
+    def _branching_edge(self) -> Tuple[int, int]:
+        # Same choice as `_branching_edge` on the compact graph: a node of largest degree, on its
+        # edge out of M whose other end has the smallest degree, in the order of the compact graph
+        degree = self.degree
+        n_top = self.n_top
+        node = degree.index(max(degree))
+        best_edge = (UNMATCHED, UNMATCHED)
+        best_degree = len(degree)
+        if node < n_top:
+            adjacency = self.top_adjacency[node]
+            for bottom in self.top_neighbors[node]:
+                if (adjacency >> bottom & 1 and bottom != self.mate[node] and
+                        degree[n_top + bottom] < best_degree):
+                    best_edge = (node, bottom)
+                    best_degree = degree[n_top + bottom]
+        else:
+            bottom = node - n_top
+            for top in _bits(self.bottom_adjacency[bottom]):
+                if self.mate[top] != bottom and degree[top] < best_degree:
+                    best_edge = (top, bottom)
+                    best_degree = degree[top]
+        return best_edge
+
+    def _flip_cycle_through_edge(self, top: int, bottom: int) -> None:
+        # Breadth first search in the pair graph from `top` to the pair of `bottom`, visiting the
+        # successors of a pair in the order of the compact graph, then every pair of the path takes
+        # the bottom node of the previous one and `top` takes `bottom`
+        bottom_adjacency = self.bottom_adjacency
+        mate = self.mate
+        target = self.bottom_mate[bottom]
+        parent = {top: UNMATCHED}
+        visited = 1 << top
+        queue = [top]
+        for pair in queue:
+            successors = bottom_adjacency[mate[pair]] & ~visited
+            visited |= successors
+            for successor in _bits(successors):
+                parent[successor] = pair
+                queue.append(successor)
+            if target in parent:
+                break
+        pair = target
+        while pair != top:
+            previous = parent[pair]
+            mate[pair] = mate[previous]
+            self.bottom_mate[mate[pair]] = pair
+            pair = previous
+        mate[top] = bottom
+        self.bottom_mate[bottom] = top
+
+    def walk_perfect_matchings(self,
+                               stats: Optional[EnumerationStats] = None) -> Iterator[List[int]]:
+        """Yields ``mate`` for every perfect matching but the first one, changed in place.
+
+        The graph must be trimmed with respect to the first one. ``stats`` counts and times the
+        phases of the search as the search on the compact graph does.
+        """
+        branching_edge = self._branching_edge
+        flip_cycle_through_edge = self._flip_cycle_through_edge
+        remove_nodes_of_edge = self._remove_nodes_of_edge
+        remove_edge = self._remove_edge
+        trim = self.trim
+        state = self._state
+        restore = self._restore
+        if stats is not None:
+            (branching_edge, flip_cycle_through_edge, remove_nodes_of_edge, remove_edge, trim,
+             state, restore) = self._instrumented_steps(stats)
+        # Frames hold the branching edge, the state the node received, which the branch without
+        # the edge starts from, and the depth of the node
+        stack: List[Tuple[int, int, Tuple[List[int], ...], int]] = []
+        depth = 0
+        while True:
+            if stats is not None:
+                stats.enter_node(depth)
+            # Step 1
+            # After trimming, G has no edge if and only if M is its only perfect matching
+            if any(self.top_adjacency):
+                # Steps 2 to 4
+                # Choose an edge e out of M and construct M' by flipping a cycle through e
+                top, bottom = branching_edge()
+                stack.append((top, bottom, state(), depth))
+                flip_cycle_through_edge(top, bottom)
+                # Step 5
+                # Construct G+(e) and trim it with respect to M'
+                pairs = self._component(top) & ~(1 << top)
+                remove_nodes_of_edge(top, bottom)
+                trim(pairs)
+                depth += 1
+                yield self.mate
+                continue
+            if not stack:
+                if stats is not None:
+                    stats.search_over()
+                return
+            # Step 6
+            # Construct G-(e) and trim it with respect to M
+            top, bottom, node_state, depth = stack.pop()
+            restore(node_state)
+            pairs = self._component(top)
+            remove_edge(top, bottom)
+            trim(pairs)
+            depth += 1
+
+    def _n_edges(self) -> int:
+        return sum(self.degree[:self.n_top])
+
+    def _instrumented_steps(self, stats: EnumerationStats) -> Tuple[Any, ...]:
+        # Wraps the steps of `walk_perfect_matchings` with the counters and timers of `stats`. A
+        # cycle search covers the choice of the branching edge and the flip of the cycle.
+        clock = time.perf_counter
+
+        def timed_branching_edge() -> Tuple[int, int]:
+            start = clock()
+            edge = self._branching_edge()
+            stats.cycle_search_time += clock() - start
+            return edge
+
+        def timed_flip_cycle_through_edge(top: int, bottom: int) -> None:
+            start = clock()
+            self._flip_cycle_through_edge(top, bottom)
+            stats.cycle_searches += 1
+            stats.cycle_search_time += clock() - start
+
+        def timed_remove_nodes_of_edge(top: int, bottom: int) -> None:
+            start = clock()
+            stats.removed_edges += self.degree[top] + self.degree[self.n_top + bottom] - 1
+            self._remove_nodes_of_edge(top, bottom)
+            stats.update_time += clock() - start
+
+        def timed_remove_edge(top: int, bottom: int) -> None:
+            start = clock()
+            self._remove_edge(top, bottom)
+            stats.removed_edges += 1
+            stats.update_time += clock() - start
+
+        def timed_trim(pairs: int) -> None:
+            start = clock()
+            n_edges = self._n_edges()
+            self.trim(pairs)
+            stats.removed_edges += n_edges - self._n_edges()
+            stats.trims += 1
+            stats.trim_time += clock() - start
+
+        def timed_state() -> Tuple[List[int], ...]:
+            start = clock()
+            node_state = self._state()
+            stats.update_time += clock() - start
+            return node_state
+
+        def timed_restore(node_state: Tuple[List[int], ...]) -> None:
+            start = clock()
+            n_edges = self._n_edges()
+            self._restore(node_state)
+            stats.restored_edges += self._n_edges() - n_edges
+            stats.update_time += clock() - start
+
+        return (timed_branching_edge, timed_flip_cycle_through_edge, timed_remove_nodes_of_edge,
+                timed_remove_edge, timed_trim, timed_state, timed_restore)
@@ -1,40 +1,137 @@
 # -*- coding: utf-8 -*-
 """
 Contains classes and functions to enumerate matchings based on brute force methods.
+
+The matchings are built with NumPy, one top node at a time, for a whole block of partial matchings
+at once: each of them is extended with every neighbour of the top node that it leaves unused,
+which the biadjacency matrix and a bit mask of the used bottom nodes tell. Perfect matchings are
+completed in one step with a table of the permutations of the bottom nodes left to the last top
+nodes. The oracles are meant to check the enumerators on graphs of up to a dozen nodes per side.
 """
-from typing import Iterator, Any, Dict
+from typing import Iterator, Any, Dict, Optional, Tuple
 
 import itertools
+import numpy as np
 import networkx as nx
 from networkx.algorithms.bipartite.matching import maximum_matching
 
-from .graphs_utils import (top_nodes, bottom_nodes)
+from .graphs_utils import BipartitePartition
+from .permanent import biadjacency_matrix
+
+__all__ = [
+    'brute_force_enum_perfect_matchings', 'brute_force_enum_maximum_matchings',
+    'brute_force_enum_maximal_matchings', 'brute_force_matching_array', 'PERFECT', 'MAXIMUM',
+    'MAXIMAL'
+]
+
+# Kinds of matchings of `brute_force_matching_array`
+PERFECT = 'perfect'
+MAXIMUM = 'maximum'
+MAXIMAL = 'maximal'
+
+UNMATCHED = -1
+
+# Bottom nodes of a bit mask of int64, and top nodes completed with the table of permutations
+_MAX_BOTTOM_NODES = 62
+_PERMUTATION_TABLE_SIZE = 5
+
+
+def brute_force_matching_array(graph: nx.Graph, kind: str = PERFECT) -> np.ndarray:
+    """Returns every matching of a ``kind`` of a bipartite graph, as rows of an int32 array.
+
+    ``kind`` is `PERFECT`, `MAXIMUM` or `MAXIMAL`. The rows have the layout of the arrays of
+    ``output='array'``: a column per top node holding the index of its bottom node, or -1, in the
+    order of `matching_array_labels`. They are sorted, which makes them easy to compare.
+    """
+    if kind not in (PERFECT, MAXIMUM, MAXIMAL):
+        raise ValueError(f"Unknown kind of matchings '{kind}'")
+    partition = BipartitePartition(graph)
+    if partition.n_bottom > _MAX_BOTTOM_NODES:
+        raise ValueError(f'The brute force is limited to {_MAX_BOTTOM_NODES} bottom nodes')
+    adjacency = biadjacency_matrix(graph, partition.top_nodes, partition.bottom_nodes) > 0
+    n_top = partition.n_top
+    if kind == PERFECT:
+        if n_top != partition.n_bottom or n_top == 0:
+            return np.empty((0, n_top), dtype=np.int32)
+        rows = _perfect_assignments(adjacency)
+    elif kind == MAXIMUM:
+        size = len(maximum_matching(graph, top_nodes=partition.top_nodes)) // 2
+        if size == 0:
+            return np.empty((0, n_top), dtype=np.int32)
+        rows, _ = _partial_assignments(adjacency, n_top, n_top - size)
+    else:
+        rows, used = _partial_assignments(adjacency, n_top, None)
+        # A matching is maximal when every top node it leaves unmatched only has used neighbours
+        neighbor_masks = adjacency.astype(np.int64).dot(
+            np.left_shift(np.int64(1), np.arange(partition.n_bottom, dtype=np.int64)))
+        open_edges = (rows == UNMATCHED) & (neighbor_masks[None, :] & ~used[:, None] != 0)
+        rows = rows[~open_edges.any(axis=1)]
+    rows = rows.astype(np.int32)
+    # A graph without top nodes has a single empty matching, which lexsort cannot sort
+    return rows[np.lexsort(rows.T[::-1])] if rows.size else rows
 
-__all__ = ['brute_force_enum_perfect_matchings']
+
+def _partial_assignments(adjacency: np.ndarray, n_rows: int,
+                         max_unmatched: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    # Matchings of the first `n_rows` top nodes that leave at most `max_unmatched` of them
+    # unmatched, any number when it is `None`, with the bit masks of their bottom nodes
+    rows = np.empty((1, 0), dtype=np.int8)
+    used = np.zeros(1, dtype=np.int64)
+    n_unmatched = np.zeros(1, dtype=np.int64)
+    for top in range(n_rows):
+        blocks = []
+        for bottom in np.flatnonzero(adjacency[top]).tolist():
+            extended = (used >> bottom) & 1 == 0
+            blocks.append((extended, bottom, used[extended] | np.int64(1) << bottom,
+                           n_unmatched[extended]))
+        if max_unmatched is None:
+            left = np.ones(len(rows), dtype=bool)
+        else:
+            left = n_unmatched < max_unmatched
+        blocks.append((left, UNMATCHED, used[left], n_unmatched[left] + 1))
+        rows = np.concatenate([
+            np.column_stack([rows[selected], np.full(len(block_used), bottom, dtype=np.int8)])
+            for selected, bottom, block_used, _ in blocks
+        ])
+        used = np.concatenate([block_used for _, _, block_used, _ in blocks])
+        n_unmatched = np.concatenate([block_unmatched for *_, block_unmatched in blocks])
+    return rows, used
+
+
+def _perfect_assignments(adjacency: np.ndarray) -> np.ndarray:
+    # The first top nodes are matched one at a time, then the bottom nodes left to the last ones
+    # are laid out by every permutation of the table and checked against the biadjacency matrix
+    n = adjacency.shape[0]
+    n_table = min(n, _PERMUTATION_TABLE_SIZE)
+    rows, used = _partial_assignments(adjacency, n - n_table, 0)
+    if len(rows) == 0:
+        return np.empty((0, n), dtype=np.int8)
+    permutations = np.array(list(itertools.permutations(range(n_table))), dtype=np.int64)
+    free = (used[:, None] >> np.arange(n, dtype=np.int64)) & 1 == 0
+    left = np.nonzero(free)[1].reshape(len(rows), n_table)
+    completions = left[:, permutations]
+    last_tops = np.arange(n - n_table, n)
+    valid = adjacency[last_tops, completions].all(axis=2)
+    prefixes = np.repeat(rows, valid.sum(axis=1), axis=0)
+    return np.concatenate([prefixes, completions[valid].astype(np.int8)], axis=1)
+
+
+def _rows_to_dicts(graph: nx.Graph, rows: np.ndarray) -> Iterator[Dict[Any, Any]]:
+    partition = BipartitePartition(graph)
+    top_nodes = partition.top_nodes
+    bottom_nodes = partition.bottom_nodes
+    for row in rows.tolist():
+        yield {top: bottom_nodes[bottom]
+               for top, bottom in zip(top_nodes, row) if bottom != UNMATCHED}
 
 
 def brute_force_enum_perfect_matchings(graph: nx.Graph) -> Iterator[Dict[Any, Any]]:
-    if len(list(top_nodes(graph))) != len(list(bottom_nodes(graph))):
-        return
-    size = len(list(top_nodes(graph)))
-    matching = maximum_matching(graph, top_nodes=top_nodes(graph))
-    matching = {k: v for k, v in matching.items() if k in top_nodes(graph)}
-    if matching and len(matching) == size:
-        for values in itertools.product(*map(graph.neighbors, top_nodes(graph))):
-            if len(set(values)) == len(values):
-                matching = dict(zip(top_nodes(graph), values))
-                yield matching
+    return _rows_to_dicts(graph, brute_force_matching_array(graph, PERFECT))
 
 
 def brute_force_enum_maximum_matchings(graph: nx.Graph) -> Iterator[Dict[Any, Any]]:
-    matching = maximum_matching(graph, top_nodes=top_nodes(graph))
-    matching = {k: v for k, v in matching.items() if k in top_nodes(graph)}
-    matching_len = len(matching)
-    if matching_len == 0:
-        return
-    for edges in itertools.combinations(graph.edges(), matching_len):
-        if len({edge[0] for edge in edges}) < matching_len:
-            continue
-        if len({edge[1] for edge in edges}) < matching_len:
-            continue
-        yield dict(edges)
+    return _rows_to_dicts(graph, brute_force_matching_array(graph, MAXIMUM))
+
+
+def brute_force_enum_maximal_matchings(graph: nx.Graph) -> Iterator[Dict[Any, Any]]:
+    return _rows_to_dicts(graph, brute_force_matching_array(graph, MAXIMAL))
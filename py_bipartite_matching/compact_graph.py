@@ -0,0 +1,635 @@
+# -*- coding: utf-8 -*-
+"""Contains the integer-indexed representation of a bipartite graph used by the enumerators.
+
+The nodes of a `networkx` bipartite graph are relabeled once to ``0..n-1`` (top nodes first,
+then bottom nodes) and the adjacency is stored in CSR form. Labels are only used again when a
+matching is handed back to the caller.
+
+Matchings are stored as a list indexed by node that holds the id of the matched edge, or
+``UNMATCHED``, for both sides so that the mate of a bottom node is found as fast as the one of a
+top node. The directed matching graph D(G, M) is never built: matching edges go from top to
+bottom and the remaining edges from bottom to top, which is decided on the fly from that list.
+"""
+import heapq
+from array import array
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import networkx as nx
+
+from .graphs_utils import BipartitePartition
+
+UNMATCHED = -1
+
+__all__ = ['CompactBipartiteGraph', 'UNMATCHED']
+
+
+class CompactBipartiteGraph:
+    """Bipartite graph relabeled to consecutive integers with array-backed CSR adjacency.
+
+    Top nodes take the indices ``0..n_top-1`` and bottom nodes ``n_top..n-1``. Every edge has an id
+    in ``0..n_edges-1``; ``edge_top`` and ``edge_bottom`` hold its end points. The CSR arrays
+    ``indptr``, ``indices`` and ``edge_ids`` list, for every node, its neighbours and the ids of
+    the edges that lead to them.
+
+    The structure never changes. Subgraphs are obtained by clearing ``alive`` flags, and every
+    removal is recorded in an undo log so that `undo` can bring back the graph as it was at an
+    `undo_mark`.
+    """
+
+    def __init__(self, graph: nx.Graph, partition: Optional[BipartitePartition] = None) -> None:
+        if partition is None:
+            partition = BipartitePartition(graph)
+        tops = partition.top_nodes_of(graph)
+        self.labels: List[Any] = tops + [node for node in graph if node in partition.bottom]
+        self.n_top = len(tops)
+        self.n_nodes = len(self.labels)
+        self.index: Dict[Any, int] = {label: i for i, label in enumerate(self.labels)}
+
+        edge_top = array('l')
+        edge_bottom = array('l')
+        for top in range(self.n_top):
+            for neighbor in graph.adj[self.labels[top]]:
+                edge_top.append(top)
+                edge_bottom.append(self.index[neighbor])
+        self.edge_top = edge_top
+        self.edge_bottom = edge_bottom
+        self.n_edges = len(edge_top)
+
+        # CSR adjacency over both sides, built with a counting sort on the end points
+        degree = [0] * self.n_nodes
+        for top, bottom in zip(edge_top, edge_bottom):
+            degree[top] += 1
+            degree[bottom] += 1
+        indptr = array('l', [0] * (self.n_nodes + 1))
+        for node in range(self.n_nodes):
+            indptr[node + 1] = indptr[node] + degree[node]
+        position = list(indptr[:-1])
+        indices = array('l', [0] * (2 * self.n_edges))
+        edge_ids = array('l', [0] * (2 * self.n_edges))
+        for edge, (top, bottom) in enumerate(zip(edge_top, edge_bottom)):
+            indices[position[top]] = bottom
+            edge_ids[position[top]] = edge
+            position[top] += 1
+            indices[position[bottom]] = top
+            edge_ids[position[bottom]] = edge
+            position[bottom] += 1
+        self.indptr = indptr
+        self.indices = indices
+        self.edge_ids = edge_ids
+
+        self.alive = bytearray(b'\x01') * self.n_edges
+        self.degree = degree
+        self.n_alive_edges = self.n_edges
+        self._removed_edges: List[int] = []
+
+        # Working arrays of `strongly_connected_components`
+        self.component = [0] * self.n_nodes
+        self._n_components = 0
+        # Previous components of the nodes, with the length of the undo log when they changed
+        self._component_log: List[Tuple[int, int, int]] = []
+        self._tarjan_index = [0] * self.n_nodes
+        self._tarjan_low = [0] * self.n_nodes
+        self._tarjan_position = [0] * self.n_nodes
+        self._tarjan_visit = [0] * self.n_nodes
+        self._tarjan_on_stack = bytearray(self.n_nodes)
+        self._tarjan_pass = 0
+
+        # Index of the free nodes of `find_feasible_two_edge_path`, see `index_free_nodes`
+        self._free_heap: Optional[List[int]] = None
+        self._free_candidates = bytearray(self.n_nodes)
+        self._in_free_heap = bytearray(self.n_nodes)
+        self._free_match: List[int] = []
+
+    def is_top(self, node: int) -> bool:
+        return node < self.n_top
+
+    def max_degree_node(self) -> int:
+        return max(range(self.n_nodes), key=self.degree.__getitem__)
+
+    def neighbors(self, node: int) -> List[Tuple[int, int]]:
+        """Returns the ``(neighbor, edge)`` pairs of the alive edges incident to ``node``."""
+        alive = self.alive
+        edge_ids = self.edge_ids
+        indices = self.indices
+        return [(indices[p], edge_ids[p]) for p in range(self.indptr[node], self.indptr[node + 1])
+                if alive[edge_ids[p]]]
+
+    def remove_edge(self, edge: int) -> None:
+        if self.alive[edge]:
+            self.alive[edge] = 0
+            self.degree[self.edge_top[edge]] -= 1
+            self.degree[self.edge_bottom[edge]] -= 1
+            self.n_alive_edges -= 1
+            self._removed_edges.append(edge)
+
+    def undo_mark(self) -> int:
+        """Returns a position of the undo log to which the graph can be brought back later."""
+        return len(self._removed_edges)
+
+    def removed_edges_since(self, mark: int) -> List[int]:
+        """Returns the edges removed since `undo_mark` returned ``mark``, in order of removal."""
+        return self._removed_edges[mark:]
+
+    def undo(self, mark: int) -> None:
+        """Restores every edge removed since `undo_mark` returned ``mark``.
+
+        The strongly connected components computed since then are restored as well.
+        """
+        component = self.component
+        component_log = self._component_log
+        while component_log and component_log[-1][0] > mark:
+            _, node, node_component = component_log.pop()
+            component[node] = node_component
+        removed_edges = self._removed_edges
+        alive = self.alive
+        degree = self.degree
+        free_heap = self._free_heap
+        while len(removed_edges) > mark:
+            edge = removed_edges.pop()
+            alive[edge] = 1
+            top = self.edge_top[edge]
+            bottom = self.edge_bottom[edge]
+            degree[top] += 1
+            degree[bottom] += 1
+            # A node that gets back its first edge can be free again
+            if free_heap is not None and (degree[top] == 1 or degree[bottom] == 1):
+                self.note_unmatched((top, bottom))
+        self.n_alive_edges = self.n_edges - len(removed_edges)
+
+    def search_state(self) -> Dict[str, Any]:
+        """Returns the undo log and the strongly connected components as plain lists and ints."""
+        return {
+            'removed_edges': list(self._removed_edges),
+            'component': list(self.component),
+            'component_log': [list(entry) for entry in self._component_log],
+            'n_components': self._n_components,
+        }
+
+    def restore_search_state(self, state: Dict[str, Any]) -> None:
+        """Brings the graph to a state returned by `search_state` for the same graph."""
+        self.undo(0)
+        for edge in state['removed_edges']:
+            self.remove_edge(edge)
+        self.component = list(state['component'])
+        self._component_log = [tuple(entry) for entry in state['component_log']]
+        self._n_components = state['n_components']
+
+    def remove_node(self, node: int) -> None:
+        """Removes every alive edge incident to ``node``."""
+        alive = self.alive
+        edge_ids = self.edge_ids
+        for p in range(self.indptr[node], self.indptr[node + 1]):
+            if alive[edge_ids[p]]:
+                self.remove_edge(edge_ids[p])
+
+    def remove_nodes_of_edge(self, edge: int) -> List[int]:
+        """Removes every edge incident to the end points of ``edge``, the edge included.
+
+        Returns the other end points of the removed edges.
+        """
+        ends = (self.edge_top[edge], self.edge_bottom[edge])
+        neighbors = []
+        for node in ends:
+            for p in range(self.indptr[node], self.indptr[node + 1]):
+                if self.alive[self.edge_ids[p]]:
+                    self.remove_edge(self.edge_ids[p])
+                    if self.indices[p] not in ends:
+                        neighbors.append(self.indices[p])
+        return neighbors
+
+    def matching_from_dict(self, matching: Dict[Any, Any]) -> List[int]:
+        """Converts a top -> bottom dict of labels to a list of matched edge ids per node."""
+        match = [UNMATCHED] * self.n_nodes
+        for top_label, bottom_label in matching.items():
+            top = self.index[top_label]
+            bottom = self.index[bottom_label]
+            for p in range(self.indptr[top], self.indptr[top + 1]):
+                if self.indices[p] == bottom:
+                    match[top] = match[bottom] = self.edge_ids[p]
+                    break
+        return match
+
+    def matching_to_dict(self, match: List[int]) -> Dict[Any, Any]:
+        """Converts a list of matched edge ids per node to a top -> bottom dict of labels."""
+        labels = self.labels
+        edge_bottom = self.edge_bottom
+        return {labels[top]: labels[edge_bottom[match[top]]] for top in range(self.n_top)
+                if match[top] != UNMATCHED}
+
+    def fixed_edges_and_graph(self, match: List[int]) -> Tuple[Dict[Any, Any], nx.Graph]:
+        """Splits a graph trimmed with respect to ``match`` into the edges of ``match`` that are in
+        all its matchings and the labeled `networkx` graph whose matchings complete them.
+
+        Every edge of a trimmed graph is in some matching, so the matched edges in all of them are
+        the ones whose end points have no other alive edge.
+        """
+        labels = self.labels
+        edge_top = self.edge_top
+        edge_bottom = self.edge_bottom
+        degree = self.degree
+        fixed_edges = {}
+        fixed_nodes = set()
+        for top in range(self.n_top):
+            edge = match[top]
+            if edge != UNMATCHED and degree[top] <= 1 and degree[edge_bottom[edge]] <= 1:
+                fixed_edges[labels[top]] = labels[edge_bottom[edge]]
+                fixed_nodes.update((top, edge_bottom[edge]))
+        graph = nx.Graph()
+        graph.add_nodes_from((labels[node], {'bipartite': 0 if self.is_top(node) else 1})
+                             for node in range(self.n_nodes)
+                             if degree[node] and node not in fixed_nodes)
+        graph.add_edges_from((labels[edge_top[edge]], labels[edge_bottom[edge]])
+                             for edge in range(self.n_edges)
+                             if self.alive[edge] and edge_top[edge] not in fixed_nodes)
+        return fixed_edges, graph
+
+    def _out_edges(self, node: int, match: List[int]) -> List[Tuple[int, int]]:
+        # Out-going edges of `node` in D(G, M): top -> bottom along the matching, bottom -> top
+        # along every other edge
+        if node < self.n_top:
+            edge = match[node]
+            if edge != UNMATCHED and self.alive[edge]:
+                return [(self.edge_bottom[edge], edge)]
+            return []
+        return [(neighbor, edge) for neighbor, edge in self.neighbors(node)
+                if match[neighbor] != edge]
+
+    def strongly_connected_components(self, match: List[int],
+                                      roots: Optional[Iterable[int]] = None) -> List[int]:
+        """Labels the strongly connected components of D(G, M) reachable from ``roots``.
+
+        Iterative Tarjan over the alive edges, working on arrays allocated once per graph. The
+        component of every visited node is written to ``component``, with ids that are never reused
+        by later calls, and the visited nodes are returned. All nodes are roots by default.
+        """
+        n_top = self.n_top
+        indptr = self.indptr
+        indices = self.indices
+        edge_ids = self.edge_ids
+        edge_bottom = self.edge_bottom
+        alive = self.alive
+        index = self._tarjan_index
+        low = self._tarjan_low
+        position = self._tarjan_position
+        visit = self._tarjan_visit
+        on_stack = self._tarjan_on_stack
+        component = self.component
+        # Nodes count as visited when their mark equals the one of the current call
+        self._tarjan_pass += 1
+        current_pass = self._tarjan_pass
+        n_components = self._n_components
+        component_log = self._component_log
+        log_position = len(self._removed_edges)
+
+        visited: List[int] = []
+        stack: List[int] = []
+        counter = 0
+        for root in range(self.n_nodes) if roots is None else roots:
+            if visit[root] == current_pass:
+                continue
+            visit[root] = current_pass
+            index[root] = low[root] = counter
+            counter += 1
+            visited.append(root)
+            stack.append(root)
+            on_stack[root] = 1
+            position[root] = 0 if root < n_top else indptr[root]
+            work = [root]
+            while work:
+                node = work[-1]
+                next_node = -1
+                if node < n_top:
+                    # The only out-going edge of a top node is its matching edge
+                    if position[node] == 0:
+                        position[node] = 1
+                        edge = match[node]
+                        if edge != UNMATCHED and alive[edge]:
+                            neighbor = edge_bottom[edge]
+                            if visit[neighbor] != current_pass:
+                                next_node = neighbor
+                            elif on_stack[neighbor] and index[neighbor] < low[node]:
+                                low[node] = index[neighbor]
+                else:
+                    # A bottom node goes to the top nodes of its edges out of the matching
+                    p = position[node]
+                    end = indptr[node + 1]
+                    while p < end:
+                        edge = edge_ids[p]
+                        neighbor = indices[p]
+                        p += 1
+                        if not alive[edge] or match[neighbor] == edge:
+                            continue
+                        if visit[neighbor] != current_pass:
+                            next_node = neighbor
+                            break
+                        if on_stack[neighbor] and index[neighbor] < low[node]:
+                            low[node] = index[neighbor]
+                    position[node] = p
+
+                if next_node != -1:
+                    visit[next_node] = current_pass
+                    index[next_node] = low[next_node] = counter
+                    counter += 1
+                    visited.append(next_node)
+                    stack.append(next_node)
+                    on_stack[next_node] = 1
+                    position[next_node] = 0 if next_node < n_top else indptr[next_node]
+                    work.append(next_node)
+                    continue
+
+                work.pop()
+                if work and low[node] < low[work[-1]]:
+                    low[work[-1]] = low[node]
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component_log.append((log_position, member, component[member]))
+                        component[member] = n_components
+                        if member == node:
+                            break
+                    n_components += 1
+        self._n_components = n_components
+        return visited
+
+    def trim(self, match: List[int], seeds: Optional[Iterable[int]] = None) -> None:
+        """Removes the edges of D(G, M) that join two different strongly connected components.
+
+        For a perfect matching M these are exactly the edges that are in no perfect matching
+        other than the ones forced in all of them.
+
+        When the graph was trimmed before a few edges were removed, only the components that lost
+        an edge need to be computed again. ``seeds`` are then the end points of those edges: every
+        node of such a component can still be reached from them, and no edge leaves it.
+        """
+        n_top = self.n_top
+        indptr = self.indptr
+        indices = self.indices
+        edge_ids = self.edge_ids
+        alive = self.alive
+        component = self.component
+        for node in self.strongly_connected_components(match, seeds):
+            if node >= n_top:
+                continue
+            for p in range(indptr[node], indptr[node + 1]):
+                edge = edge_ids[p]
+                if alive[edge] and component[node] != component[indices[p]]:
+                    self.remove_edge(edge)
+
+    def connected_nodes(self, seeds: Iterable[int]) -> List[int]:
+        """Returns the nodes of the connected components of alive edges that contain ``seeds``."""
+        indptr = self.indptr
+        indices = self.indices
+        edge_ids = self.edge_ids
+        alive = self.alive
+        found = set(seeds)
+        nodes = list(found)
+        for node in nodes:
+            for p in range(indptr[node], indptr[node + 1]):
+                if alive[edge_ids[p]] and indices[p] not in found:
+                    found.add(indices[p])
+                    nodes.append(indices[p])
+        return nodes
+
+    def connected_components(self, nodes: Optional[Iterable[int]] = None) -> List[List[int]]:
+        """Returns the nodes of every connected component of alive edges.
+
+        Only the components of ``nodes``, all nodes by default, are returned. Nodes without alive
+        edges are in no component.
+        """
+        degree = self.degree
+        found: Set[int] = set()
+        components = []
+        for node in range(self.n_nodes) if nodes is None else nodes:
+            if degree[node] and node not in found:
+                component = self.connected_nodes((node, ))
+                found.update(component)
+                components.append(component)
+        return components
+
+    def nodes_left_unmatched(self, match: List[int],
+                             nodes: Optional[Iterable[int]] = None) -> Set[int]:
+        """Returns the nodes with alive edges that some maximum matching leaves unmatched.
+
+        M must be a maximum matching. These are the nodes that can be reached from a node
+        unmatched by M through an even alternating path. Only ``nodes``, all of them by default,
+        are searched; they must hold whole connected components.
+        """
+        n_top = self.n_top
+        indptr = self.indptr
+        indices = self.indices
+        edge_ids = self.edge_ids
+        edge_top = self.edge_top
+        edge_bottom = self.edge_bottom
+        alive = self.alive
+        degree = self.degree
+        if nodes is None:
+            nodes = range(self.n_nodes)
+        queue = deque(node for node in nodes
+                      if degree[node] and (match[node] == UNMATCHED or not alive[match[node]]))
+        reachable = set(queue)
+        while queue:
+            node = queue.popleft()
+            # An edge out of the matching followed by the matching edge of its other end
+            for p in range(indptr[node], indptr[node + 1]):
+                edge = edge_ids[p]
+                if not alive[edge] or edge == match[node]:
+                    continue
+                neighbor = indices[p]
+                mate_edge = match[neighbor]
+                if mate_edge == UNMATCHED or not alive[mate_edge]:
+                    continue
+                next_node = edge_bottom[mate_edge] if neighbor < n_top else edge_top[mate_edge]
+                if next_node not in reachable:
+                    reachable.add(next_node)
+                    queue.append(next_node)
+        return reachable
+
+    def trim_maximum(self, match: List[int], seeds: Optional[Iterable[int]] = None) -> None:
+        """Removes the edges out of the maximum matching M that are in no maximum matching.
+
+        An edge out of M is in some maximum matching if and only if it lies on a cycle of D(G, M)
+        or on an even alternating path that starts at a node left unmatched by M. The latter are
+        the edges whose top end can be reached from an unmatched top node, or whose bottom end can
+        be reached from an unmatched bottom node, by alternating paths.
+
+        Both conditions only depend on the connected component of an edge. When the graph was
+        trimmed before a few edges were removed, only the components that contain ``seeds``, the
+        end points of those edges, are computed again.
+        """
+        n_top = self.n_top
+        indptr = self.indptr
+        indices = self.indices
+        edge_ids = self.edge_ids
+        alive = self.alive
+        nodes = range(self.n_nodes) if seeds is None else self.connected_nodes(seeds)
+        self.strongly_connected_components(match, nodes)
+        component = self.component
+        reachable = self.nodes_left_unmatched(match, nodes)
+
+        for node in nodes:
+            if node >= n_top:
+                continue
+            for p in range(indptr[node], indptr[node + 1]):
+                edge = edge_ids[p]
+                bottom = indices[p]
+                if (alive[edge] and match[node] != edge and component[node] != component[bottom]
+                        and node not in reachable and bottom not in reachable):
+                    self.remove_edge(edge)
+
+    def _path(self, match: List[int], source: int, target: int) -> Optional[List[int]]:
+        # Breadth first search in D(G, M) inside the strongly connected component of `source`,
+        # returns the edges of a shortest path
+        n_top = self.n_top
+        indptr = self.indptr
+        indices = self.indices
+        edge_ids = self.edge_ids
+        edge_top = self.edge_top
+        edge_bottom = self.edge_bottom
+        alive = self.alive
+        component = self.component
+        source_component = component[source]
+        parent_edge = {source: UNMATCHED}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if node == target:
+                path = []
+                while node != source:
+                    edge = parent_edge[node]
+                    path.append(edge)
+                    node = edge_bottom[edge] if node < n_top else edge_top[edge]
+                return path[::-1]
+            if node < n_top:
+                edge = match[node]
+                if edge != UNMATCHED and alive[edge]:
+                    neighbor = edge_bottom[edge]
+                    if neighbor not in parent_edge and component[neighbor] == source_component:
+                        parent_edge[neighbor] = edge
+                        queue.append(neighbor)
+                continue
+            for p in range(indptr[node], indptr[node + 1]):
+                edge = edge_ids[p]
+                neighbor = indices[p]
+                if (alive[edge] and match[neighbor] != edge and neighbor not in parent_edge
+                        and component[neighbor] == source_component):
+                    parent_edge[neighbor] = edge
+                    queue.append(neighbor)
+        return None
+
+    def find_cycle_with_edge_of_matching(
+            self,
+            match: List[int],
+            components_are_current: bool = False,
+            nodes: Optional[Iterable[int]] = None) -> Optional[List[int]]:
+        """Returns the edges of a cycle of D(G, M) that starts with a matching edge.
+
+        The cycle alternates between matching edges, at even positions, and edges out of the
+        matching, at odd positions. Returns `None` if D(G, M) has no such cycle.
+
+        A matching edge is on a cycle if and only if both its ends are in the same strongly
+        connected component, so one pass of Tarjan and one search inside that component are
+        enough. The pass is skipped when ``components_are_current``, i.e. when ``component``
+        already describes D(G, M), as it does right after a trim. Only the matching edges of
+        ``nodes``, all nodes by default, are tried.
+        """
+        if not components_are_current:
+            self.strongly_connected_components(match)
+        component = self.component
+        edge_bottom = self.edge_bottom
+        alive = self.alive
+        for top in range(self.n_top) if nodes is None else nodes:
+            if top >= self.n_top:
+                continue
+            edge = match[top]
+            if edge == UNMATCHED or not alive[edge]:
+                # The graph could have been reduced
+                continue
+            bottom = edge_bottom[edge]
+            if component[top] == component[bottom]:
+                path = self._path(match, bottom, top)
+                assert path is not None
+                return [edge] + path
+        return None
+
+    def find_cycle_through_edge(self, match: List[int], edge: int) -> Optional[List[int]]:
+        """Returns the edges of a cycle of D(G, M) that ends with ``edge``, an edge out of M.
+
+        The cycle has the same layout as the ones of `find_cycle_with_edge_of_matching`. Returns
+        `None` if ``edge`` is in no cycle.
+        """
+        # The edge goes from its bottom end to its top end, close it with a path back
+        path = self._path(match, self.edge_top[edge], self.edge_bottom[edge])
+        if path is None:
+            return None
+        return path + [edge]
+
+    def index_free_nodes(self, match: List[int], nodes: Iterable[int]) -> None:
+        """Keeps an index of the ``nodes`` left unmatched by ``match`` that have alive edges.
+
+        ``match`` is followed as it changes in place. Edges removed and brought back by `undo`
+        update the index, and the nodes that a change of ``match`` leaves unmatched must be passed
+        to `note_unmatched`. Stale entries are only dropped when they reach the top of the index,
+        so keeping it costs a logarithmic time per node that becomes free.
+        """
+        self._free_match = match
+        self._free_candidates = bytearray(self.n_nodes)
+        self._in_free_heap = bytearray(self.n_nodes)
+        self._free_heap = []
+        for node in nodes:
+            self._free_candidates[node] = 1
+        self.note_unmatched(range(self.n_nodes))
+
+    def note_unmatched(self, nodes: Iterable[int]) -> None:
+        """Adds to the index of `index_free_nodes` the ``nodes`` that are free."""
+        free_heap = self._free_heap
+        if free_heap is None:
+            return
+        match = self._free_match
+        in_free_heap = self._in_free_heap
+        for node in nodes:
+            if (self._free_candidates[node] and not in_free_heap[node] and
+                    match[node] == UNMATCHED and self.degree[node]):
+                in_free_heap[node] = 1
+                heapq.heappush(free_heap, node)
+
+    def _first_free_node(self) -> Optional[int]:
+        # Smallest indexed node that is still free, dropping the stale entries above it
+        free_heap = self._free_heap
+        assert free_heap is not None
+        match = self._free_match
+        while free_heap:
+            node = free_heap[0]
+            if match[node] == UNMATCHED and self.degree[node]:
+                return node
+            heapq.heappop(free_heap)
+            self._in_free_heap[node] = 0
+        return None
+
+    def find_feasible_two_edge_path(
+            self,
+            match: List[int],
+            free_nodes: Optional[Iterable[int]] = None) -> Optional[Tuple[int, int]]:
+        """Returns a matching edge and an adjacent edge whose other end point is not matched.
+
+        Exchanging both edges gives a new matching of the same size. Returns `None` if there is
+        no such pair of edges.
+
+        ``free_nodes`` must contain every node with alive edges left unmatched by M, the first one
+        of them is used. Without them, the smallest node of the index of `index_free_nodes` is
+        used. Any alive edge of such a node leads to a matched node when M is maximum, so the pair
+        is read from the first one.
+        """
+        if free_nodes is None:
+            node = self._first_free_node()
+            free_nodes = () if node is None else (node, )
+        degree = self.degree
+        for node in free_nodes:
+            if match[node] != UNMATCHED or degree[node] == 0:
+                continue
+            for neighbor, new_edge in self.neighbors(node):
+                old_edge = match[neighbor]
+                if old_edge != UNMATCHED and self.alive[old_edge]:
+                    return old_edge, new_edge
+        return None
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""Contains functions to count the perfect and maximum matchings of a bipartite graph.
+
+The counts follow the binary split of Uno's enumeration: the matchings of G are the ones of G+(e)
+plus the ones of G-(e). No matching is ever built, the trimmed graph is factorised into its
+connected components, whose counts multiply, and components with a known number of matchings
+are not searched. Dense components may be counted as the permanent of their biadjacency matrix.
+"""
+import math
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+import networkx as nx
+from networkx.algorithms.bipartite.matching import maximum_matching
+
+from .compact_graph import CompactBipartiteGraph, UNMATCHED
+from .graphs_utils import BipartitePartition
+from .permanent import biadjacency_matrix, permanent
+from .py_bipartite_matching import (_Trim, _branching_edge, _exchange_edges, _flip_cycle,
+                                    _undo_matching_changes)
+
+__all__ = ['count_perfect_matchings', 'count_maximum_matchings', 'AUTO', 'ENUMERATE', 'PERMANENT']
+
+# Finds, inside a connected component, an edge e out of M and a matching M' that contains e. It
+# changes the shared matching into M' and returns e with the changes that bring back M.
+_Branch = Callable[[CompactBipartiteGraph, List[int], List[int]],
+                   Tuple[int, List[Tuple[int, int]]]]
+
+# Counts the matchings of a component without searching it, or returns `None`
+_CountLeaf = Callable[[CompactBipartiteGraph, List[int]], Optional[int]]
+
+# Counting methods of `count_perfect_matchings`
+AUTO = 'auto'
+ENUMERATE = 'enumerate'
+PERMANENT = 'permanent'
+
+# Largest side of a component whose permanent is considered
+_PERMANENT_MAX_SIZE = 28
+# Logarithm of the cost of a node of the search tree over the cost of a term of the permanent
+_LOG_NODE_TO_TERM_COST = math.log(10000)
+
+# Steps of the explicit stack of `_count_matchings`. `_COUNT` pushes the number of matchings of a
+# set of nodes on the value stack, `_MINUS` enters the second branch of a component, `_RESTORE`
+# brings the graph back, and `_ADD` and `_MULTIPLY` combine the values of the branches and of the
+# components.
+_COUNT = 0
+_MINUS = 1
+_RESTORE = 2
+_ADD = 3
+_MULTIPLY = 4
+
+
+def count_perfect_matchings(graph: nx.Graph, method: str = AUTO) -> int:
+    """Returns the number of perfect matchings of a bipartite graph.
+
+    The count is the number of matchings yielded by `enum_perfect_matchings`. ``method`` is
+    `ENUMERATE` to split the search tree only, `PERMANENT` to compute the permanent of the
+    biadjacency matrix of the whole graph, or `AUTO` to split the search tree and take the
+    permanent of the components dense enough for it to be cheaper.
+    """
+    if method not in (AUTO, ENUMERATE, PERMANENT):
+        raise ValueError(f"Unknown counting method '{method}'")
+    partition = BipartitePartition(graph)
+    if partition.n_top != partition.n_bottom or partition.n_top == 0:
+        return 0
+    if method == PERMANENT:
+        return permanent(biadjacency_matrix(graph, partition.top_nodes, partition.bottom_nodes))
+    matching = partition.top_to_bottom(maximum_matching(graph, top_nodes=partition.top_nodes))
+    if len(matching) != partition.n_top:
+        return 0
+    compact_graph = CompactBipartiteGraph(graph, partition)
+    match = compact_graph.matching_from_dict(matching)
+    compact_graph.trim(match)
+    count_leaf = _closed_form_or_permanent_count if method == AUTO else _closed_form_count
+    return _count_matchings(compact_graph, match, _perfect_matching_branch, compact_graph.trim,
+                            count_leaf)
+
+
+def count_maximum_matchings(graph: nx.Graph) -> int:
+    """Returns the number of maximum matchings of a bipartite graph.
+
+    The count is the number of matchings yielded by `enum_maximum_matchings`.
+    """
+    partition = BipartitePartition(graph)
+    matching = partition.top_to_bottom(maximum_matching(graph, top_nodes=partition.top_nodes))
+    if not matching:
+        return 0
+    compact_graph = CompactBipartiteGraph(graph, partition)
+    match = compact_graph.matching_from_dict(matching)
+    compact_graph.trim_maximum(match)
+    return _count_matchings(compact_graph, match, _maximum_matching_branch,
+                            compact_graph.trim_maximum, _closed_form_count)
+
+
+def _perfect_matching_branch(compact_graph: CompactBipartiteGraph, match: List[int],
+                             nodes: List[int]) -> Tuple[int, List[Tuple[int, int]]]:
+    # As G is trimmed, an edge out of M lies on a cycle of D(G, M) inside its component
+    edge = _branching_edge(compact_graph, match, nodes)
+    cycle = compact_graph.find_cycle_through_edge(match, edge)
+    assert cycle is not None
+    return edge, _flip_cycle(compact_graph, match, cycle)
+
+
+def _maximum_matching_branch(compact_graph: CompactBipartiteGraph, match: List[int],
+                             nodes: List[int]) -> Tuple[int, List[Tuple[int, int]]]:
+    # As G is trimmed, an edge out of M is either on a cycle of D(G, M) or on an even alternating
+    # path from an unmatched node, whose first two edges can be exchanged
+    cycle = compact_graph.find_cycle_with_edge_of_matching(match,
+                                                           components_are_current=True,
+                                                           nodes=nodes)
+    if cycle is not None:
+        return cycle[1], _flip_cycle(compact_graph, match, cycle)
+    free_nodes = [node for node in nodes if match[node] == UNMATCHED]
+    two_edge_path = compact_graph.find_feasible_two_edge_path(match, free_nodes)
+    assert two_edge_path is not None
+    old_edge, edge = two_edge_path
+    return edge, _exchange_edges(compact_graph, match, old_edge, edge)
+
+
+def _closed_form_count(compact_graph: CompactBipartiteGraph,
+                       component: List[int]) -> Optional[int]:
+    # Number of matchings of a trimmed component with a known shape, `None` for any other shape.
+    # Every edge of a trimmed component is in some matching, so the maximum matchings of a
+    # complete bipartite component, of a cycle and of a component with two nodes on a side are
+    # counted from their degrees.
+    degree = compact_graph.degree
+    n_top = 0
+    n_edges = 0
+    for node in component:
+        if compact_graph.is_top(node):
+            n_top += 1
+            n_edges += degree[node]
+    n_bottom = len(component) - n_top
+    if n_edges == n_top * n_bottom:
+        small, large = sorted((n_top, n_bottom))
+        return math.factorial(large) // math.factorial(large - small)
+    if all(degree[node] == 2 for node in component):
+        # An even cycle has two perfect matchings
+        return 2
+    if n_top == 2 or n_bottom == 2:
+        # Both nodes of the small side are matched, to any two different neighbours
+        small_side_is_top = n_top == 2
+        first, second = [node for node in component
+                         if compact_graph.is_top(node) == small_side_is_top]
+        first_neighbors = {neighbor for neighbor, _ in compact_graph.neighbors(first)}
+        second_neighbors = {neighbor for neighbor, _ in compact_graph.neighbors(second)}
+        return (len(first_neighbors) * len(second_neighbors) -
+                len(first_neighbors & second_neighbors))
+    return None
+
+
+def _permanent_is_cheaper(n_top: int, n_edges: int) -> bool:
+    # A balanced random component with density p has about n! p^n perfect matchings, and the
+    # search tree visits a node for each of them, while Ryser's formula has 2^n terms of n
+    # factors computed in NumPy blocks
+    if n_top > _PERMANENT_MAX_SIZE:
+        return False
+    log_matchings = math.lgamma(n_top + 1) + n_top * math.log(n_edges / n_top**2)
+    log_permanent_cost = n_top * math.log(2) + math.log(n_top)
+    return log_permanent_cost < log_matchings + _LOG_NODE_TO_TERM_COST
+
+
+def _closed_form_or_permanent_count(compact_graph: CompactBipartiteGraph,
+                                    component: List[int]) -> Optional[int]:
+    count = _closed_form_count(compact_graph, component)
+    if count is not None:
+        return count
+    tops = [node for node in component if compact_graph.is_top(node)]
+    n_edges = sum(compact_graph.degree[node] for node in tops)
+    if not _permanent_is_cheaper(len(tops), n_edges):
+        return None
+    column_of = {node: column for column, node in enumerate(
+        node for node in component if not compact_graph.is_top(node))}
+    matrix = np.zeros((len(tops), len(tops)), dtype=np.int64)
+    for row, node in enumerate(tops):
+        for neighbor, _ in compact_graph.neighbors(node):
+            matrix[row, column_of[neighbor]] = 1
+    return permanent(matrix)
+
+
+def _count_matchings(compact_graph: CompactBipartiteGraph, match: List[int], branch: _Branch,
+                     trim: _Trim, count_leaf: _CountLeaf) -> int:
+    # The graph is trimmed with respect to M, so the matchings of G are the products of the
+    # matchings of its connected components. A component is split like a node of the search tree
+    # of the enumerators, and its G+(e) and G-(e) are split again into components.
+    values: List[int] = []
+    stack: List[Tuple[Any, ...]] = [(_COUNT, list(range(compact_graph.n_nodes)), False)]
+    while stack:
+        frame = stack.pop()
+        step = frame[0]
+
+        if step == _COUNT:
+            _, nodes, is_component = frame
+            if not is_component:
+                components = compact_graph.connected_components(nodes)
+                if len(components) != 1:
+                    stack.append((_MULTIPLY, len(components)))
+                    stack.extend((_COUNT, component, True) for component in components)
+                    continue
+                nodes = components[0]
+            count = count_leaf(compact_graph, nodes)
+            if count is not None:
+                values.append(count)
+                continue
+
+            # The matchings with e are the ones of G+(e) with M'
+            edge, changes = branch(compact_graph, match, nodes)
+            mark = compact_graph.undo_mark()
+            neighbors = compact_graph.remove_nodes_of_edge(edge)
+            trim(match, neighbors)
+            stack.append((_ADD, ))
+            stack.append((_RESTORE, mark))
+            stack.append((_MINUS, edge, changes, mark, nodes))
+            stack.append((_COUNT, nodes, False))
+
+        elif step == _MINUS:
+            # The matchings without e are the ones of G-(e) with M
+            _, edge, changes, mark, nodes = frame
+            compact_graph.undo(mark)
+            _undo_matching_changes(compact_graph, match, changes)
+            compact_graph.remove_edge(edge)
+            trim(match, (compact_graph.edge_top[edge], compact_graph.edge_bottom[edge]))
+            stack.append((_COUNT, nodes, False))
+
+        elif step == _RESTORE:
+            _, mark = frame
+            compact_graph.undo(mark)
+
+        elif step == _ADD:
+            values.append(values.pop() + values.pop())
+
+        else:
+            _, n_values = frame
+            product = 1
+            for _ in range(n_values):
+                product *= values.pop()
+            values.append(product)
+
+    return values.pop()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Contains the result of an enumeration factorised over independent components of a graph."""
+import itertools
+from typing import Any, Dict, Iterator, List, Sequence
+
+__all__ = ['FactorizedMatchings']
+
+
+class FactorizedMatchings:
+    """Matchings of a graph given as the Cartesian product of the matchings of its components.
+
+    Every matching is made of the ``fixed_edges``, which are in all matchings, and of one of the
+    matchings of each factor. The matchings are never expanded: the number of matchings is the
+    product of the sizes of the factors and the k-th matching is decoded from k in the mixed radix
+    of those sizes. Iterating yields the matchings in the same order as indexing, the last factor
+    changing fastest.
+    """
+
+    def __init__(self, fixed_edges: Dict[Any, Any],
+                 factors: List[Sequence[Dict[Any, Any]]]) -> None:
+        self.fixed_edges = fixed_edges
+        self.factors = factors
+
+    @property
+    def n_matchings(self) -> int:
+        """Number of matchings, which can exceed the range allowed for `len`."""
+        n_matchings = 1
+        for factor in self.factors:
+            n_matchings *= len(factor)
+        return n_matchings
+
+    def __len__(self) -> int:
+        return self.n_matchings
+
+    def __getitem__(self, index: int) -> Dict[Any, Any]:
+        n_matchings = self.n_matchings
+        if index < 0:
+            index += n_matchings
+        if not 0 <= index < n_matchings:
+            raise IndexError('matching index out of range')
+        matching = dict(self.fixed_edges)
+        parts = []
+        for factor in reversed(self.factors):
+            index, position = divmod(index, len(factor))
+            parts.append(factor[position])
+        for part in reversed(parts):
+            matching.update(part)
+        return matching
+
+    def __iter__(self) -> Iterator[Dict[Any, Any]]:
+        for parts in itertools.product(*self.factors):
+            matching = dict(self.fixed_edges)
+            for part in parts:
+                matching.update(part)
+            yield matching
@@ -1,8 +1,7 @@
 # utils for graphs of the networkx library
-import copy
 import networkx as nx
 from networkx.algorithms.shortest_paths import shortest_path
-from typing import Any, Union, Optional, Iterator, Iterable, Tuple, Dict, List, cast
+from typing import Any, Union, Optional, Iterator, Iterable, Tuple, Dict, List, Set, cast
 
 LEFT = 0
 RIGHT = 1
@@ -28,6 +27,44 @@ def bottom_nodes(graph: nx.Graph,
                 yield node_id
 
 
+class BipartitePartition:
+    """Index of the two sides of a bipartite graph, built with a single scan of its nodes.
+
+    ``top`` and ``bottom`` are sets for constant time membership checks, ``top_nodes`` and
+    ``bottom_nodes`` list the nodes of each side in the order of the graph. The index stays valid
+    for every subgraph of the graph it was built from.
+    """
+
+    def __init__(self, graph: nx.Graph) -> None:
+        self.top_nodes: List[Any] = []
+        self.bottom_nodes: List[Any] = []
+        for node_id, node_data in graph.nodes(data=True).__iter__():
+            if node_data['bipartite'] == 0:
+                self.top_nodes.append(node_id)
+            elif node_data['bipartite'] == 1:
+                self.bottom_nodes.append(node_id)
+        self.top = frozenset(self.top_nodes)
+        self.bottom = frozenset(self.bottom_nodes)
+        self.n_top = len(self.top_nodes)
+        self.n_bottom = len(self.bottom_nodes)
+
+    def is_top(self, node: Any) -> bool:
+        return node in self.top
+
+    def is_bottom(self, node: Any) -> bool:
+        return node in self.bottom
+
+    def top_nodes_of(self, graph: nx.Graph) -> List[Any]:
+        """Returns the top nodes of ``graph``, a subgraph of the indexed graph."""
+        top = self.top
+        return [node for node in graph if node in top]
+
+    def top_to_bottom(self, matching: Dict[Any, Any]) -> Dict[Any, Any]:
+        """Expresses a matching given in both directions only from top nodes to bottom nodes."""
+        top = self.top
+        return {k: v for k, v in matching.items() if k in top}
+
+
 def bipartite_node_positions(graph: nx.Graph) -> Dict[int, Tuple[int, int]]:
     pos: Dict[int, Tuple[int, int]] = dict()
     pos.update((n, (1, i)) for i, n in enumerate(top_nodes(graph)))  # put nodes from X at x=1
@@ -65,38 +102,40 @@ def draw_matching(graph: nx.Graph, matching: Dict[Any, Any], labels: bool = Fals
     draw_edges(graph, matching.items())
 
 
-def find_cycle_with_edge_of_matching(graph: nx.Graph, matching: Dict[Any, Any]) -> List[Any]:
-    tmp_graph = copy.deepcopy(graph)
-    # Remove the edge so and find a path from a node of the edge to the other one.
-    # If a path is found, the circle is completed with the removed edge
+def find_cycle_with_edge_of_matching(graph: nx.DiGraph, matching: Dict[Any, Any]) -> List[Any]:
+    # A matching edge is on a cycle if and only if both of its nodes are in the same strongly
+    # connected component. The cycle is then completed with a path from a node of the edge back to
+    # the other one, found with a single search.
+    component_of = {}
+    for number, component in enumerate(nx.strongly_connected_components(graph)):
+        for node in component:
+            component_of[node] = number
     for k, v in matching.items():
-        if not tmp_graph.has_edge(k, v):
+        if not graph.has_edge(k, v):
             # The graph could have been reduced
             continue
-        tmp_graph.remove_edge(k, v)
-        try:
-            path = shortest_path(G=tmp_graph, source=v, target=k)
-        except nx.NetworkXNoPath:
-            tmp_graph.add_edge(k, v)
-            continue
-        else:
-            tmp_graph.add_edge(k, v)
-            return cast(List[Any], path)
+        if component_of[k] == component_of[v]:
+            return cast(List[Any], shortest_path(G=graph, source=v, target=k))
     # No cycle was found
     raise nx.NetworkXNoCycle
 
 
-def find_feasible_two_edge_path(graph: nx.Graph,
-                                matching: Dict[Any, Any]) -> Optional[Tuple[Any, Any, Any]]:
+def find_feasible_two_edge_path(
+        graph: nx.Graph,
+        matching: Dict[Any, Any],
+        partition: Optional[BipartitePartition] = None) -> Optional[Tuple[Any, Any, Any]]:
     # This path has the form top1 -> bottom -> top2 or bottom1 -> top -> bottom2
     # first: must be in the left part of the graph and in matching
     # second: must be in the right part of the graph and in matching
     # third: is also in the left part of the graph and but must not be in matching
+    if partition is None:
+        partition = BipartitePartition(graph)
+    matched_nodes = set(matching.values())
 
     for top, bottom in matching.items():
-        if top in top_nodes(graph) and bottom in bottom_nodes(graph):
+        if partition.is_top(top) and partition.is_bottom(bottom):
             for new_bottom in graph.neighbors(top):
-                if new_bottom not in matching.values():
+                if new_bottom not in matched_nodes:
                     return (bottom, top, new_bottom)
             for new_top in graph.neighbors(bottom):
                 if new_top not in matching:
@@ -156,4 +195,38 @@ def graph_without_edge(graph: nx.Graph, edge: Tuple[Any, Any]) -> nx.Graph:
 
     assert len(new_graph.edges) == len(graph.edges) - 1
     assert len(new_graph.nodes) == len(graph.nodes)
-    return new_graph
\ No newline at end of file
+    return new_graph
+
+
+def constrained_graph(
+        graph: nx.Graph, required_edges: Iterable[Tuple[Any, Any]],
+        forbidden_edges: Iterable[Tuple[Any, Any]]) -> Tuple[nx.Graph, Dict[Any, Any]]:
+    """Returns the subgraph left to match once the required edges are fixed and the forbidden
+    edges removed, with the required edges from top nodes to bottom nodes.
+
+    As for G+(e) and G-(e), the subgraph has neither the nodes of the required edges nor the
+    forbidden edges. A ValueError is raised when an edge is not in the graph, when two required
+    edges share a node or when an edge is both required and forbidden.
+    """
+    partition = BipartitePartition(graph)
+    fixed_edges: Dict[Any, Any] = dict()
+    fixed_nodes: Set[Any] = set()
+    for edge in required_edges:
+        if not graph.has_edge(*edge):
+            raise ValueError(f'Required edge {edge} is not in the graph')
+        top, bottom = edge if partition.is_top(edge[0]) else edge[::-1]
+        if top in fixed_nodes or bottom in fixed_nodes:
+            raise ValueError(f'Required edge {edge} shares a node with another required edge')
+        fixed_edges[top] = bottom
+        fixed_nodes.update((top, bottom))
+    new_graph = nx.Graph(graph)
+    for edge in forbidden_edges:
+        if not graph.has_edge(*edge):
+            raise ValueError(f'Forbidden edge {edge} is not in the graph')
+        top, bottom = edge if partition.is_top(edge[0]) else edge[::-1]
+        if fixed_edges.get(top) == bottom:
+            raise ValueError(f'Edge {edge} is both required and forbidden')
+        if new_graph.has_edge(top, bottom):
+            new_graph.remove_edge(top, bottom)
+    new_graph.remove_nodes_from(fixed_nodes)
+    return new_graph, fixed_edges
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Contains the exact permanent of square 0/1 matrices, used to count perfect matchings.
+
+The number of perfect matchings of a balanced bipartite graph is the permanent of its
+biadjacency matrix. It is computed with Ryser's formula
+
+    perm(A) = (-1)^n sum over column subsets S of (-1)^|S| prod_i sum_{j in S} a_ij
+
+whose 2^n terms are visited in Gray-code order, so that the row sums of consecutive subsets
+differ by a single column. The subsets of the first columns are handled at once as a NumPy block.
+"""
+from typing import Any, List
+
+import numpy as np
+import networkx as nx
+
+__all__ = ['permanent', 'biadjacency_matrix']
+
+# Columns whose subsets are expanded together in a block of row sums
+_BLOCK_COLUMNS = 12
+_INT64_LIMIT = 2**63
+
+
+def biadjacency_matrix(graph: nx.Graph, top_nodes: List[Any],
+                       bottom_nodes: List[Any]) -> np.ndarray:
+    """Returns the 0/1 matrix with a row per top node and a column per bottom node."""
+    column_of = {node: column for column, node in enumerate(bottom_nodes)}
+    matrix = np.zeros((len(top_nodes), len(bottom_nodes)), dtype=np.int64)
+    for row, node in enumerate(top_nodes):
+        for neighbor in graph.adj[node]:
+            column = column_of.get(neighbor)
+            if column is not None:
+                matrix[row, column] = 1
+    return matrix
+
+
+def permanent(matrix: np.ndarray) -> int:
+    """Returns the permanent of a square matrix of non-negative integers.
+
+    The computation uses int64 when the terms of Ryser's formula are bounded below 2^63 and
+    Python integers otherwise, so the result is always exact.
+    """
+    n = matrix.shape[0]
+    if matrix.shape != (n, n):
+        raise ValueError('The permanent is only defined for square matrices')
+    if n == 0:
+        return 1
+    # Every term is at most the product of the row sums, and a block adds up 2^n_block of them
+    n_block = min(n, _BLOCK_COLUMNS)
+    bound = 2**n_block
+    for row_sum in matrix.sum(axis=1).tolist():
+        bound *= int(row_sum)
+    if bound == 0:
+        return 0
+    dtype = np.int64 if bound < _INT64_LIMIT else object
+    matrix = matrix.astype(dtype)
+
+    # Row sums of every subset of the first columns, with the sign of its size
+    subsets = np.arange(2**n_block)
+    block_bits = ((subsets[:, None] >> np.arange(n_block)) & 1).astype(dtype)
+    block_sums = block_bits.dot(matrix[:, :n_block].T)
+    block_signs = np.where(block_bits.sum(axis=1) % 2 == 0, 1, -1).astype(dtype)
+
+    # Gray-code walk over the subsets of the remaining columns
+    row_sums = np.zeros(n, dtype=dtype)
+    total = 0
+    gray = 0
+    for step in range(2**(n - n_block)):
+        if step:
+            bit = (step & -step).bit_length() - 1
+            gray ^= 1 << bit
+            if gray >> bit & 1:
+                row_sums += matrix[:, n_block + bit]
+            else:
+                row_sums -= matrix[:, n_block + bit]
+        terms = np.prod(block_sums + row_sums, axis=1)
+        value = int(block_signs.dot(terms))
+        total += -value if bin(gray).count('1') % 2 else value
+    return -total if n % 2 else total
@@ -5,291 +5,1249 @@ Maximum and Maximal Matchings in Bipartite Graphs. From Takeaki Uno publication.
 The function `enum_perfect_matchings` can be used to enumerate all maximum matchings of a `BipartiteGraph`.
 The function `enum_maximum_matchings` can be used to enumerate all maximum matchings of a `BipartiteGraph`.
 """
-from typing import cast, Iterator, Any, Dict, List, Tuple
+import functools
+import itertools
+import math
+import pickle
+import time
+from array import array
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor, as_completed,
+                                wait)
+from typing import (Callable, Deque, Iterable, Iterator, Any, Dict, List, NamedTuple, Optional,
+                    Sequence, Set, Tuple, Union)
 
-import copy
+import numpy as np
 import networkx as nx
 from networkx.algorithms.bipartite.matching import maximum_matching
 
-from .graphs_utils import (create_directed_matching_graph, find_cycle_with_edge_of_matching,
-                           find_feasible_two_edge_path, graph_without_edge,
-                           graph_without_nodes_of_edge,
-                           strongly_connected_components_decomposition, top_nodes, bottom_nodes)
+from .bitset_graph import BitsetBipartiteGraph
+from .compact_graph import CompactBipartiteGraph, UNMATCHED
+from .factorized_matchings import FactorizedMatchings
+from .graphs_utils import BipartitePartition, constrained_graph
+from .ranked_matchings import enum_ranked_maximum_matchings, enum_ranked_perfect_matchings
+from .stats import BITSET_ENGINE, COMPACT_ENGINE, EnumerationStats
 
-LEFT = 0
-RIGHT = 1
+__all__ = [
+    'enum_perfect_matchings', 'factorize_perfect_matchings', 'enum_maximum_matchings',
+    'enum_maximal_matchings', 'matching_array_labels', 'DICT', 'ARRAY',
+    'DELTA'
+]
 
-__all__ = ['enum_perfect_matchings', 'enum_maximum_matchings', 'enum_maximal_matchings']
+# Output modes of the enumerators
+DICT = 'dict'
+ARRAY = 'array'
+DELTA = 'delta'
 
 
-def enum_perfect_matchings(graph: nx.Graph) -> Iterator[Dict[Any, Any]]:
-    if len(list(top_nodes(graph))) != len(list(bottom_nodes(graph))):
+# Tells whether to cut off a search-tree node, from the edges in all its matchings and the graph
+# that completes them
+Prune = Callable[[Dict[Any, Any], nx.Graph], bool]
+
+# State of a search from which it can be resumed, made of lists and ints only
+Checkpoint = Dict[str, Any]
+
+
+def enum_perfect_matchings(graph: nx.Graph,
+                           workers: Optional[int] = None,
+                           ordered: bool = True,
+                           factorize: bool = False,
+                           weight: Optional[str] = None,
+                           k: Optional[int] = None,
+                           required_edges: Iterable[Tuple[Any, Any]] = (),
+                           forbidden_edges: Iterable[Tuple[Any, Any]] = (),
+                           prune: Optional[Prune] = None,
+                           stats: Optional[EnumerationStats] = None,
+                           checkpoint: Optional[Callable[[Checkpoint], None]] = None,
+                           checkpoint_every: Optional[int] = None,
+                           checkpoint_seconds: Optional[float] = None,
+                           resume: Optional[Checkpoint] = None,
+                           output: str = DICT,
+                           batch_size: int = 1024) -> Iterator[Any]:
+    """Enumerates all perfect matchings of a bipartite graph.
+
+    With ``workers`` above 1 the search tree is split into independent subproblems that are
+    searched by a pool of that many processes. The matchings are then yielded in the same order
+    as a serial search, or in order of completion when ``ordered`` is false. A serial search of a
+    small dense graph runs on bitsets, see `BitsetBipartiteGraph`, with the same results.
+
+    With ``factorize`` the connected components left by trimming are enumerated separately and
+    the matchings are streamed from their Cartesian product, see `factorize_perfect_matchings`.
+
+    With ``weight`` the matchings are yielded by non-decreasing sum of the ``weight`` attribute
+    of their edges, 1 for edges without it, see `enum_ranked_perfect_matchings`. At most ``k``
+    matchings are yielded, so that the ``k`` cheapest ones cost ``k`` assignment problems.
+
+    Only the matchings that contain all ``required_edges`` and none of the ``forbidden_edges``
+    are enumerated, see `constrained_graph`. No matching is yielded when no perfect matching
+    satisfies them.
+
+    ``prune`` is called with the edges shared by all the matchings of a node of the search tree,
+    as a top -> bottom dict, and with the graph whose matchings complete them. When it returns
+    true the node is cut off and none of its matchings is yielded.
+
+    ``stats``, an `EnumerationStats`, counts the nodes checked and cut off by ``prune``, and the
+    work and time of each phase of the serial search tree, on bitsets or not. Without it the
+    search is not instrumented.
+
+    ``checkpoint`` is called every ``checkpoint_every`` matchings and every ``checkpoint_seconds``
+    seconds, checked when the next matching is requested, and once the search is over. It
+    receives the state of the search as a dict of lists and ints that `json` can save. Passed as
+    ``resume`` to a new call with the same graph and arguments, it continues the search after the
+    matchings yielded before the checkpoint.
+
+    Pruning, ``stats`` and checkpoints need the serial search, without ``factorize`` nor
+    ``weight``.
+
+    With ``output`` set to `ARRAY` the matchings are yielded in int32 arrays of ``batch_size``
+    rows, fewer in the last one, and a column per top node. Each row holds the index of the
+    bottom node matched to each top node, or -1, in the order of the labels returned by
+    `matching_array_labels`. The serial search copies the matched edges of the top nodes into
+    the batch and converts them to bottom indices once per batch, without building a dict per
+    matching.
+
+    With ``output`` set to `DELTA` each matching is yielded as ``(index, parent, changes)``, its
+    position in the output, the position of the matching it derives from in the search tree,
+    ``None`` for the first one, and the ``(top, old_bottom, new_bottom)`` triples of the top nodes
+    whose bottom node differs from the previous matching, ``None`` when unmatched. The serial
+    search of the whole graph is needed, without constraints nor checkpoints.
+    """
+    _check_serial_search_options(workers, weight, factorize, prune=prune, stats=stats,
+                                 checkpoint=checkpoint, resume=resume)
+    required_edges = list(required_edges)
+    forbidden_edges = list(forbidden_edges)
+    special_search = bool(required_edges or forbidden_edges or weight is not None or factorize or
+                          (workers is not None and workers > 1))
+    if (_check_output(output, batch_size, checkpoint, resume, special_search) and
+            (special_search or k is not None)):
+        matchings = enum_perfect_matchings(graph, workers, ordered, factorize, weight, k,
+                                           required_edges, forbidden_edges, prune, stats)
+        yield from _matchings_to_arrays(graph, matchings, batch_size)
+        return
+    if required_edges or forbidden_edges:
+        subgraph, fixed_edges = constrained_graph(graph, required_edges, forbidden_edges)
+        if prune is not None:
+            prune = functools.partial(_prune_with_fixed_edges, prune, fixed_edges)
+        if subgraph.number_of_nodes() == 0:
+            if prune is None or not _count_pruned(stats, prune({}, subgraph), _ROOT_NODE):
+                yield fixed_edges
+            return
+        # The enumerators keep using the matchings they yield, which are not updated in place
+        for matching in enum_perfect_matchings(subgraph, workers, ordered, factorize, weight, k,
+                                               prune=prune, stats=stats, checkpoint=checkpoint,
+                                               checkpoint_every=checkpoint_every,
+                                               checkpoint_seconds=checkpoint_seconds,
+                                               resume=resume):
+            yield {**matching, **fixed_edges}
+        return
+    if weight is not None:
+        yield from itertools.islice(enum_ranked_perfect_matchings(graph, weight), k)
         return
-    size = len(list(top_nodes(graph)))
-    matching = maximum_matching(graph, top_nodes=top_nodes(graph))
+    if k is not None:
+        matchings = enum_perfect_matchings(graph, workers, ordered, factorize, prune=prune,
+                                           stats=stats, checkpoint=checkpoint,
+                                           checkpoint_every=checkpoint_every,
+                                           checkpoint_seconds=checkpoint_seconds, resume=resume,
+                                           output=output)
+        yield from itertools.islice(matchings, k)
+        return
+    if factorize:
+        yield from factorize_perfect_matchings(graph, workers=workers)
+        return
+    partition = BipartitePartition(graph)
+    schedule = _CheckpointSchedule(checkpoint, checkpoint_every, checkpoint_seconds)
+    if resume is not None:
+        yield from _resume_search(CompactBipartiteGraph(graph, partition), resume, _PERFECT, prune,
+                                  stats, schedule)
+        return
+    if partition.n_top != partition.n_bottom:
+        return
+    matching = maximum_matching(graph, top_nodes=partition.top_nodes)
     # Express the matching only from a top node to a bottom node
-    matching = {k: v for k, v in matching.items() if k in top_nodes(graph)}
-    if matching and len(matching) == size:
+    matching = partition.top_to_bottom(matching)
+    if matching and len(matching) == partition.n_top:
+        compact_graph = CompactBipartiteGraph(graph, partition)
+        match = compact_graph.matching_from_dict(matching)
+        compact_graph.trim(match)
+        if prune is not None and _is_pruned(compact_graph, match, prune, stats, _ROOT_NODE):
+            return
+        if output != DELTA and _searches_on_bitsets(compact_graph, workers, prune, checkpoint):
+            # Same matchings in the same order, faster on small dense graphs
+            bitset_graph = BitsetBipartiteGraph(compact_graph, match)
+            if stats is not None:
+                stats.engine = BITSET_ENGINE
+            walk = bitset_graph.walk_perfect_matchings(stats)
+            if output == ARRAY:
+                mates = itertools.chain([bitset_graph.mate], walk)
+                yield from _mates_to_arrays(mates, compact_graph.n_top, batch_size)
+            else:
+                yield matching
+                yield from map(bitset_graph.matching_to_dict, walk)
+            return
+        if output == ARRAY:
+            walk = _walk_perfect_matchings(compact_graph, match, prune=prune, stats=stats)
+            yield from _match_lists_to_arrays(compact_graph, itertools.chain([match], walk),
+                                              batch_size)
+            return
+        if output == DELTA:
+            trace = _WalkTrace()
+            walk = _walk_perfect_matchings(compact_graph, match, prune=prune, stats=stats,
+                                           trace=trace)
+            yield from _match_lists_to_deltas(compact_graph, match, walk, trace)
+            return
         yield matching
-        directed_match_graph = create_directed_matching_graph(graph, top_nodes(graph), matching)
-        trimmed_directed_match_graph = strongly_connected_components_decomposition(
-            directed_match_graph)
-        graph = trimmed_directed_match_graph.to_undirected()
-        assert len(graph.edges) == len(trimmed_directed_match_graph.edges)
-        assert len(graph.nodes) == len(trimmed_directed_match_graph.nodes)
-        yield from _enum_perfect_matchings_iter(graph=copy.deepcopy(graph), matching=matching)
-
-
-def _start_cycle_with_left(graph: nx.Graph, raw_cycle: List[Any]) -> Tuple[Any, ...]:
-    # Make sure the cycle "starts"" in the the left part
-    # If not, start the cycle from the second node, which is in the left part
-    if graph.nodes[raw_cycle[0]]['bipartite'] != LEFT:
-        return tuple(raw_cycle[-1:] + raw_cycle[:-1])
-    return tuple(raw_cycle[:])
-
-
-def _enum_perfect_matchings_iter(graph: nx.Graph, matching: Dict[Any,
-                                                                 Any]) -> Iterator[Dict[Any, Any]]:
-    # Algorithm described in "Algorithms for Enumerating All Perfect, Maximum and Maximal Matchings in Bipartite Graphs"
-    # By Takeaki Uno in "Algorithms and Computation: 8th International Symposium, ISAAC '97 Singapore,
-    # December 17-19, 1997 Proceedings"
-    # See http://dx.doi.org/10.1007/3-540-63890-3_11
+        if workers is not None and workers > 1:
+            yield from _enum_matchings_in_parallel(compact_graph, match, _PERFECT, workers,
+                                                   ordered)
+        elif checkpoint is not None:
+            yield from _enum_with_checkpoints(compact_graph, match, _PERFECT, [(_EXPAND, 0, 0)], 1,
+                                              None, prune, stats, schedule)
+        else:
+            yield from _enum_perfect_matchings_iter(compact_graph, match, prune, stats)
 
-    # Step 1
-    if len(graph.edges) == 0:
-        return
 
-    # Find a cycle in the directed matching graph
-    # Note that this cycle alternates between nodes from the left and the right part of the graph
+def matching_array_labels(graph: nx.Graph) -> Tuple[List[Any], List[Any]]:
+    """Returns the labels of the top nodes and of the bottom nodes, in the order of the columns
+    and of the values of the arrays yielded with ``output=ARRAY``.
+    """
+    partition = BipartitePartition(graph)
+    return partition.top_nodes, partition.bottom_nodes
+
+
+def _check_output(output: str, batch_size: int, checkpoint: Optional[Callable[[Checkpoint], None]],
+                  resume: Optional[Checkpoint], special_search: bool) -> bool:
+    # Returns whether the matchings are yielded as arrays. `special_search` tells whether the
+    # matchings come from another search than the serial walk of the whole graph.
+    if output not in (DICT, ARRAY, DELTA):
+        raise ValueError(f"Unknown output '{output}'")
+    if output == DICT:
+        return False
+    if output == DELTA:
+        if special_search or checkpoint is not None or resume is not None:
+            # Only the walk knows which matching another one derives from
+            raise ValueError('delta output needs the serial search, without constraints, '
+                             'factorize, weight nor checkpoints')
+        return False
+    if batch_size < 1:
+        raise ValueError('batch_size must be positive')
+    if checkpoint is not None or resume is not None:
+        # A batch holds matchings that were enumerated before the caller gets them
+        raise ValueError('checkpoints are not supported with array output')
+    return True
+
+
+def _match_lists_to_arrays(compact_graph: CompactBipartiteGraph, matches: Iterable[List[int]],
+                           batch_size: int) -> Iterator[np.ndarray]:
+    # The matched edges of the top nodes are copied into a batch of edge ids, which becomes a
+    # batch of bottom indices at once. The extra last entry maps UNMATCHED to -1. The slice of
+    # the top nodes is the only object made per matching: numpy copies it faster than the
+    # whole match list.
+    n_top = compact_graph.n_top
+    bottom_of_edge = np.append(np.asarray(compact_graph.edge_bottom, dtype=np.int32) - n_top,
+                               np.int32(UNMATCHED))
+    batch = np.empty((batch_size, n_top), dtype=np.int32)
+    row = 0
+    for match in matches:
+        batch[row] = match[:n_top]
+        row += 1
+        if row == batch_size:
+            yield bottom_of_edge[batch]
+            row = 0
+    if row:
+        yield bottom_of_edge[batch[:row]]
+
+
+def _match_lists_to_deltas(compact_graph: CompactBipartiteGraph, match: List[int],
+                           walk: Iterable[Optional[List[int]]], trace: '_WalkTrace'
+                           ) -> Iterator[Tuple[int, Optional[int], List[Tuple[Any, Any, Any]]]]:
+    # Only the top nodes changed by the walk since the previous matching are compared with the
+    # bottom node they had in it, so the work per matching follows the size of the change
+    n_top = compact_graph.n_top
+    labels = compact_graph.labels
+    edge_bottom = compact_graph.edge_bottom
+    # Bottom node of each top node in the previous matching
+    bottoms = [UNMATCHED if edge == UNMATCHED else edge_bottom[edge] for edge in match[:n_top]]
+    yield 0, None, [(labels[top], None, labels[bottom]) for top, bottom in enumerate(bottoms)
+                    if bottom != UNMATCHED]
+    for index, _ in enumerate(walk, 1):
+        changes = []
+        for node in trace.changed_nodes:
+            if node >= n_top:
+                continue
+            edge = match[node]
+            bottom = UNMATCHED if edge == UNMATCHED else edge_bottom[edge]
+            old_bottom = bottoms[node]
+            if bottom != old_bottom:
+                bottoms[node] = bottom
+                old_label = None if old_bottom == UNMATCHED else labels[old_bottom]
+                new_label = None if bottom == UNMATCHED else labels[bottom]
+                changes.append((labels[node], old_label, new_label))
+        trace.changed_nodes.clear()
+        yield index, trace.parent, changes
+
+
+def _mates_to_arrays(mates: Iterable[List[int]], n_top: int,
+                     batch_size: int) -> Iterator[np.ndarray]:
+    # The bottom node of each top node in the bitset search is already its index in the labels
+    batch = np.empty((batch_size, n_top), dtype=np.int32)
+    row = 0
+    for mate in mates:
+        batch[row] = mate
+        row += 1
+        if row == batch_size:
+            yield batch.copy()
+            row = 0
+    if row:
+        yield batch[:row].copy()
+
+
+def _matchings_to_arrays(graph: nx.Graph, matchings: Iterable[Dict[Any, Any]],
+                         batch_size: int) -> Iterator[np.ndarray]:
+    top_nodes, bottom_nodes = matching_array_labels(graph)
+    bottom_index = {node: index for index, node in enumerate(bottom_nodes)}
+    batch = np.empty((batch_size, len(top_nodes)), dtype=np.int32)
+    row = 0
+    for matching in matchings:
+        batch[row] = [bottom_index.get(matching.get(top), UNMATCHED) for top in top_nodes]
+        row += 1
+        if row == batch_size:
+            yield batch.copy()
+            row = 0
+    if row:
+        yield batch[:row].copy()
+
+
+def factorize_perfect_matchings(graph: nx.Graph,
+                                workers: Optional[int] = None) -> FactorizedMatchings:
+    """Returns the perfect matchings of a bipartite graph factorised over independent components.
 
-    # TODO: avoid doing a directed graph by implementing missing algorithm steps from paper
-    directed_match_graph = create_directed_matching_graph(graph, top_nodes(graph), matching)
+    Once the edges in no perfect matching are trimmed, the graph splits into connected components
+    whose perfect matchings combine freely, and into edges that are in every perfect matching.
+    Only the matchings of each component are enumerated, ``workers`` is used for each of them.
+    """
+    partition = BipartitePartition(graph)
+    if partition.n_top != partition.n_bottom:
+        return FactorizedMatchings({}, [[]])
+    matching = partition.top_to_bottom(maximum_matching(graph, top_nodes=partition.top_nodes))
+    if not matching or len(matching) != partition.n_top:
+        return FactorizedMatchings({}, [[]])
+    compact_graph = CompactBipartiteGraph(graph, partition)
+    match = compact_graph.matching_from_dict(matching)
+    compact_graph.trim(match)
 
-    try:
-        raw_cycle = find_cycle_with_edge_of_matching(graph=directed_match_graph, matching=matching)
-    except nx.NetworkXNoCycle:
+    labels = compact_graph.labels
+    # The matching edges left without neighbours are in every perfect matching
+    fixed_edges = {top: matching[top] for top in labels[:compact_graph.n_top]
+                   if not compact_graph.degree[compact_graph.index[top]]}
+    factors: List[Sequence[Dict[Any, Any]]] = []
+    for component in compact_graph.connected_components():
+        edges = [(labels[node], labels[neighbor]) for node in component
+                 if compact_graph.is_top(node) for neighbor, _ in compact_graph.neighbors(node)]
+        factors.append(list(enum_perfect_matchings(graph.edge_subgraph(edges), workers=workers)))
+    return FactorizedMatchings(fixed_edges, factors)
+
+
+def _flip_cycle(compact_graph: CompactBipartiteGraph, match: List[int],
+                cycle: List[int]) -> List[Tuple[int, int]]:
+    # Turn M into M' in place by flipping edges along the cycle, i.e. change the direction of all
+    # the edges in the cycle. Edges out of the matching are at the odd positions of the cycle.
+    # Returns the (node, previous edge) pairs needed to undo the change.
+    changes = []
+    for edge in cycle[1::2]:
+        for node in (compact_graph.edge_top[edge], compact_graph.edge_bottom[edge]):
+            changes.append((node, match[node]))
+            match[node] = edge
+    return changes
+
+
+def _undo_matching_changes(compact_graph: CompactBipartiteGraph, match: List[int],
+                           changes: List[Tuple[int, int]]) -> None:
+    for node, edge in reversed(changes):
+        match[node] = edge
+    compact_graph.note_unmatched(node for node, edge in changes if edge == UNMATCHED)
+
+
+# Steps of the explicit stack used by the enumerators. A search-tree node is expanded on
+# `_EXPAND`; its second branch is entered on `_MINUS`; and `_RESTORE` brings the graph and the
+# matching back to the state the node received them in. The frames of `_EXPAND` and `_MINUS` hold
+# the position in the output of the matching the node receives.
+_EXPAND = 0
+_MINUS = 1
+_RESTORE = 2
+
+
+class _WalkTrace:
+    # Filled by the walk for the caller: the nodes whose matched edge changed since the previous
+    # matching was yielded, and the position in the output of the matching the last one comes from
+
+    def __init__(self) -> None:
+        self.changed_nodes: List[int] = []
+        self.parent = 0
+
+
+# Finds a new matching M' in a search-tree node. It changes the shared matching into M' and returns
+# the edge e of M' \ M to branch on together with the changes that bring back M.
+_NewMatchingStep = Callable[[CompactBipartiteGraph, List[int]],
+                            Optional[Tuple[int, List[Tuple[int, int]]]]]
+
+# Trims the graph with respect to a matching, given the end points of the edges just removed
+_Trim = Callable[[List[int], Iterable[int]], None]
+
+# Search-tree nodes handed to a `Prune` predicate
+_ROOT_NODE = 'root'
+_PLUS_NODE = 'plus'
+_MINUS_NODE = 'minus'
+
+
+def _is_pruned(compact_graph: CompactBipartiteGraph, match: List[int], prune: Prune,
+               stats: Optional[EnumerationStats], node: str) -> bool:
+    # The matchings of a search-tree node are its fixed edges completed by the matchings of the
+    # rest of its graph
+    pruned = prune(*compact_graph.fixed_edges_and_graph(match))
+    return _count_pruned(stats, pruned, node)
+
+
+def _count_pruned(stats: Optional[EnumerationStats], pruned: bool, node: str) -> bool:
+    if stats is not None:
+        stats.prune_checks += 1
+        if pruned:
+            stats.pruned_subtrees += 1
+            if node == _PLUS_NODE:
+                stats.pruned_plus += 1
+            elif node == _MINUS_NODE:
+                stats.pruned_minus += 1
+    return pruned
+
+
+def _prune_with_fixed_edges(prune: Prune, fixed_edges: Dict[Any, Any], edges: Dict[Any, Any],
+                            graph: nx.Graph) -> bool:
+    # Prunes the search of a constrained subgraph with the required edges among the fixed ones
+    return prune({**edges, **fixed_edges}, graph)
+
+
+def _check_serial_search_options(workers: Optional[int], weight: Optional[str], factorize: bool,
+                                 **options: Any) -> None:
+    # Pruning, stats and checkpoints need the serial search tree
+    names = [name for name, value in options.items() if value is not None]
+    if not names:
         return
+    if workers is not None and workers > 1:
+        raise ValueError(f'{names[0]} is not supported when the search is split between workers')
+    if factorize or weight is not None:
+        raise ValueError(f'{names[0]} is only supported by the unweighted search tree')
 
-    cycle = _start_cycle_with_left(graph, raw_cycle)
-    assert directed_match_graph.nodes[cycle[0]]['bipartite'] == LEFT
 
-    # Step 2 - TODO: Properly find right edge? (to get complexity bound)
-    edge = cast(Tuple[Any, Any], tuple(cycle[:2]))
+def _searches_on_bitsets(compact_graph: CompactBipartiteGraph, workers: Optional[int],
+                         prune: Optional[Prune],
+                         checkpoint: Optional[Callable[[Checkpoint], None]]) -> bool:
+    # The bitset search of perfect matchings is only used by a plain serial search, which
+    # `stats` can follow as well
+    return ((workers is None or workers <= 1) and prune is None and checkpoint is None and
+            BitsetBipartiteGraph.is_suitable(compact_graph))
+
+
+def _walk_search_tree(compact_graph: CompactBipartiteGraph,
+                      match: List[int],
+                      new_matching_step: _NewMatchingStep,
+                      trim: _Trim,
+                      split_depth: Optional[int] = None,
+                      prune: Optional[Prune] = None,
+                      stats: Optional[EnumerationStats] = None,
+                      stack: Optional[List[Tuple[Any, ...]]] = None,
+                      n_matchings: int = 1,
+                      trace: Optional[_WalkTrace] = None) -> Iterator[Optional[List[int]]]:
+    # Algorithm described in "Algorithms for Enumerating All Perfect, Maximum and Maximal
+    # Matchings in Bipartite Graphs" by Takeaki Uno in "Algorithms and Computation: 8th
+    # International Symposium, ISAAC '97 Singapore, December 17-19, 1997 Proceedings"
+    # See http://dx.doi.org/10.1007/3-540-63890-3_11
+
+    # The binary search tree is walked with an explicit stack instead of recursion, so the depth
+    # of the tree is not bounded by the Python recursion limit and every matching is handed to the
+    # caller directly from this frame. The graph and the matching are shared by the whole search,
+    # the shared matching is yielded every time it holds a new matching.
+    #
+    # Every node receives a graph trimmed with respect to its matching M, so each node outputs a
+    # new matching and the delay between two outputs is bounded by the work of one node.
+    #
+    # Nodes at `split_depth` are not expanded. `None` is yielded instead, while the graph and the
+    # matching are in the state the node receives them, so that the caller can search it apart.
+    #
+    # With `prune`, G+(e) and G-(e) are checked once built and trimmed, and the ones it cuts off
+    # are not searched. M' is the first matching of G+(e), so it is only yielded when G+(e) stays.
+    #
+    # The stack holds all the work left whenever a matching is yielded, so the caller can save it
+    # with the graph and the matching, and pass it back as `stack` to resume the search.
+    #
+    # The matchings are numbered from `n_matchings`, the number output before the walk, and the
+    # root receives the matching numbered 0. With `trace` the walk also records how each matching
+    # differs from the previous one and which one it derives from.
+    #
+    # With `stats` the steps and the updates of the graph are counted and timed by wrappers, so
+    # the walk without them runs the plain methods.
+    remove_nodes_of_edge = compact_graph.remove_nodes_of_edge
+    remove_edge = compact_graph.remove_edge
+    undo = compact_graph.undo
+    if stats is not None:
+        stats.engine = COMPACT_ENGINE
+        new_matching_step, trim, remove_nodes_of_edge, remove_edge, undo = _instrumented_steps(
+            stats, compact_graph, new_matching_step, trim)
+    if stack is None:
+        stack = [(_EXPAND, 0, 0)]
+    while stack:
+        frame = stack.pop()
+        step = frame[0]
+
+        if step == _EXPAND:
+            _, depth, position = frame
+            if depth == split_depth:
+                yield None
+                continue
+            if stats is not None:
+                stats.enter_node(depth)
+            new_matching = new_matching_step(compact_graph, match)
+            if new_matching is None:
+                continue
+            edge, changes = new_matching
+            if trace is not None:
+                trace.changed_nodes.extend(node for node, _ in changes)
+
+            # Construct G+(e) and trim it with respect to M'. Continue with the new matching M'
+            mark = compact_graph.undo_mark()
+            neighbors = remove_nodes_of_edge(edge)
+            trim(match, neighbors)
+            stack.append((_MINUS, edge, changes, mark, depth + 1, position))
+            if prune is not None and _is_pruned(compact_graph, match, prune, stats, _PLUS_NODE):
+                continue
+            stack.append((_EXPAND, depth + 1, n_matchings))
+            if trace is not None:
+                trace.parent = position
+            n_matchings += 1
+            yield match
+
+        elif step == _MINUS:
+            _, edge, changes, mark, depth, position = frame
+            undo(mark)
+
+            # Construct G-(e) and trim it with respect to M. Continue with the old matching M
+            _undo_matching_changes(compact_graph, match, changes)
+            if trace is not None:
+                trace.changed_nodes.extend(node for node, _ in changes)
+            remove_edge(edge)
+            trim(match, (compact_graph.edge_top[edge], compact_graph.edge_bottom[edge]))
+            stack.append((_RESTORE, mark))
+            if prune is not None and _is_pruned(compact_graph, match, prune, stats, _MINUS_NODE):
+                continue
+            stack.append((_EXPAND, depth, position))
+
+        else:
+            _, mark = frame
+            undo(mark)
+    if stats is not None:
+        stats.search_over()
+
+
+def _instrumented_steps(stats: EnumerationStats, compact_graph: CompactBipartiteGraph,
+                        new_matching_step: _NewMatchingStep, trim: _Trim) -> Tuple[Any, ...]:
+    # Wraps the steps of `_walk_search_tree` and the updates of the graph with the counters and
+    # timers of `stats`
+    clock = time.perf_counter
+
+    def timed_new_matching_step(
+            compact_graph: CompactBipartiteGraph,
+            match: List[int]) -> Optional[Tuple[int, List[Tuple[int, int]]]]:
+        start = clock()
+        new_matching = new_matching_step(compact_graph, match)
+        stats.cycle_search_time += clock() - start
+        if new_matching is not None:
+            stats.cycle_searches += 1
+        return new_matching
+
+    def timed_trim(match: List[int], seeds: Iterable[int]) -> None:
+        start = clock()
+        mark = compact_graph.undo_mark()
+        trim(match, seeds)
+        stats.removed_edges += compact_graph.undo_mark() - mark
+        stats.trims += 1
+        stats.trim_time += clock() - start
+
+    def timed_remove_nodes_of_edge(edge: int) -> List[int]:
+        start = clock()
+        mark = compact_graph.undo_mark()
+        neighbors = compact_graph.remove_nodes_of_edge(edge)
+        stats.removed_edges += compact_graph.undo_mark() - mark
+        stats.update_time += clock() - start
+        return neighbors
+
+    def timed_remove_edge(edge: int) -> None:
+        start = clock()
+        mark = compact_graph.undo_mark()
+        compact_graph.remove_edge(edge)
+        stats.removed_edges += compact_graph.undo_mark() - mark
+        stats.update_time += clock() - start
+
+    def timed_undo(mark: int) -> None:
+        start = clock()
+        stats.restored_edges += compact_graph.undo_mark() - mark
+        compact_graph.undo(mark)
+        stats.update_time += clock() - start
+
+    return (timed_new_matching_step, timed_trim, timed_remove_nodes_of_edge, timed_remove_edge,
+            timed_undo)
+
+
+def _branching_edge(compact_graph: CompactBipartiteGraph,
+                    match: List[int],
+                    nodes: Optional[List[int]] = None) -> int:
+    # Every perfect matching uses exactly one edge of a node v, so the matchings of G are split
+    # between the G+(e) of the edges e of v. Branching at a node of largest degree on the edge
+    # whose other end has the smallest degree removes the fewest edges from G+(e), keeping both
+    # subproblems as large as possible, while G-(e) only loses e. The node is taken from `nodes`
+    # when they are given.
+    if nodes is None:
+        node = compact_graph.max_degree_node()
+    else:
+        node = max(nodes, key=compact_graph.degree.__getitem__)
+    best_edge = UNMATCHED
+    best_degree = compact_graph.n_nodes
+    for neighbor, edge in compact_graph.neighbors(node):
+        top = node if compact_graph.is_top(node) else neighbor
+        if match[top] != edge and compact_graph.degree[neighbor] < best_degree:
+            best_edge = edge
+            best_degree = compact_graph.degree[neighbor]
+    return best_edge
+
+
+def _perfect_matching_step(
+        compact_graph: CompactBipartiteGraph,
+        match: List[int]) -> Optional[Tuple[int, List[Tuple[int, int]]]]:
+    # Step 1
+    # After trimming, G has no edge if and only if M is its only perfect matching
+    if compact_graph.n_alive_edges == 0:
+        return None
+
+    # Step 2
+    # Choose an edge e out of M. As G is trimmed, e lies on a cycle of D(G, M).
+    edge = _branching_edge(compact_graph, match)
 
     # Step 3
-    # already done because we are not really finding the optimal edge
+    # Find a cycle containing e in the directed matching graph
+    # Note that this cycle alternates between nodes from the left and the right part of the graph
+    cycle = compact_graph.find_cycle_through_edge(match, edge)
+    assert cycle is not None
 
     # Step 4
-    # Construct new matching M' by flipping edges along the cycle, i.e. change the direction of all the
-    # edges in the cycle
-    matching_prime = matching.copy()
-    for i in range(0, len(cycle), 2):
-        matching_prime[cycle[i]] = cycle[i - 1]
-    assert matching_prime != matching
-    yield matching_prime
-
-    # Construct G+(e)
-    graph_plus = graph_without_nodes_of_edge(graph, edge)
-
-    # Step 5
-    # Trim unnecessary edges from G+(e).
-    directed_match_graph_plus = create_directed_matching_graph(graph_plus, top_nodes(graph_plus),
-                                                               matching)
-    trimmed_directed_match_graph_plus = strongly_connected_components_decomposition(
-        directed_match_graph_plus)
-    graph_plus = trimmed_directed_match_graph_plus.to_undirected()
-    assert len(graph_plus.edges) == len(trimmed_directed_match_graph_plus.edges)
-    assert len(graph_plus.nodes) == len(trimmed_directed_match_graph_plus.nodes)
-
-    # Step 6
-    # Recurse with the old matching M but without the edge e
-    yield from _enum_perfect_matchings_iter(graph_plus, matching)
-
-    # Construct G-(e)
-    graph_minus = graph_without_edge(graph, edge)
-
-    # Step 7
-    # Trim unnecessary edges from G-(e).
-    directed_match_graph_minus = create_directed_matching_graph(graph_minus,
-                                                                top_nodes(graph_minus),
-                                                                matching_prime)
-    trimmed_directed_match_graph_minus = strongly_connected_components_decomposition(
-        directed_match_graph_minus)
-    graph_minus = trimmed_directed_match_graph_minus.to_undirected()
-    assert len(graph_minus.edges) == len(trimmed_directed_match_graph_minus.edges)
-    assert len(graph_minus.nodes) == len(trimmed_directed_match_graph_minus.nodes)
-
-    # Step 8
-    # Recurse with the new matching M' but without the edge e
-    yield from _enum_perfect_matchings_iter(graph_minus, matching_prime)
-
-
-def enum_maximum_matchings(graph: nx.Graph) -> Iterator[Dict[Any, Any]]:
-    matching = maximum_matching(graph, top_nodes=top_nodes(graph))
+    # Construct M' by flipping the cycle, M' contains e
+    return edge, _flip_cycle(compact_graph, match, cycle)
+
+
+def _walk_perfect_matchings(compact_graph: CompactBipartiteGraph,
+                            match: List[int],
+                            split_depth: Optional[int] = None,
+                            prune: Optional[Prune] = None,
+                            stats: Optional[EnumerationStats] = None,
+                            stack: Optional[List[Tuple[Any, ...]]] = None,
+                            n_matchings: int = 1,
+                            trace: Optional[_WalkTrace] = None
+                            ) -> Iterator[Optional[List[int]]]:
+    # Steps 5 and 6 construct G+(e) with M' and G-(e) with M, trimming both
+    return _walk_search_tree(compact_graph, match, _perfect_matching_step, compact_graph.trim,
+                             split_depth, prune, stats, stack, n_matchings, trace)
+
+
+def _enum_perfect_matchings_iter(
+        compact_graph: CompactBipartiteGraph,
+        match: List[int],
+        prune: Optional[Prune] = None,
+        stats: Optional[EnumerationStats] = None) -> Iterator[Dict[Any, Any]]:
+    return map(compact_graph.matching_to_dict,
+               _walk_perfect_matchings(compact_graph, match, prune=prune, stats=stats))
+
+
+def enum_maximum_matchings(graph: nx.Graph,
+                           workers: Optional[int] = None,
+                           ordered: bool = True,
+                           weight: Optional[str] = None,
+                           k: Optional[int] = None,
+                           required_edges: Iterable[Tuple[Any, Any]] = (),
+                           forbidden_edges: Iterable[Tuple[Any, Any]] = (),
+                           prune: Optional[Prune] = None,
+                           stats: Optional[EnumerationStats] = None,
+                           checkpoint: Optional[Callable[[Checkpoint], None]] = None,
+                           checkpoint_every: Optional[int] = None,
+                           checkpoint_seconds: Optional[float] = None,
+                           resume: Optional[Checkpoint] = None,
+                           output: str = DICT,
+                           batch_size: int = 1024) -> Iterator[Any]:
+    """Enumerates all maximum matchings of a bipartite graph.
+
+    All the arguments but ``graph`` work as in `enum_perfect_matchings`. The matchings keep the
+    size of the maximum matchings of the whole graph, so none is yielded when the constraints rule
+    all of them out.
+    """
+    _check_serial_search_options(workers, weight, False, prune=prune, stats=stats,
+                                 checkpoint=checkpoint, resume=resume)
+    required_edges = list(required_edges)
+    forbidden_edges = list(forbidden_edges)
+    special_search = bool(required_edges or forbidden_edges or weight is not None or
+                          (workers is not None and workers > 1))
+    if (_check_output(output, batch_size, checkpoint, resume, special_search) and
+            (special_search or k is not None)):
+        matchings = enum_maximum_matchings(graph, workers, ordered, weight, k, required_edges,
+                                           forbidden_edges, prune, stats)
+        yield from _matchings_to_arrays(graph, matchings, batch_size)
+        return
+    if required_edges or forbidden_edges:
+        subgraph, fixed_edges = constrained_graph(graph, required_edges, forbidden_edges)
+        if prune is not None:
+            prune = functools.partial(_prune_with_fixed_edges, prune, fixed_edges)
+        size = len(maximum_matching(graph, top_nodes=BipartitePartition(graph).top_nodes)) // 2
+        if len(fixed_edges) == size:
+            if prune is None or not _count_pruned(stats, prune({}, subgraph), _ROOT_NODE):
+                yield fixed_edges
+            return
+        for matching in enum_maximum_matchings(subgraph, workers, ordered, weight, k,
+                                               prune=prune, stats=stats, checkpoint=checkpoint,
+                                               checkpoint_every=checkpoint_every,
+                                               checkpoint_seconds=checkpoint_seconds,
+                                               resume=resume):
+            if len(matching) + len(fixed_edges) != size:
+                # The first matching is a maximum matching of the subgraph
+                return
+            yield {**matching, **fixed_edges}
+        return
+    if weight is not None:
+        yield from itertools.islice(enum_ranked_maximum_matchings(graph, weight), k)
+        return
+    if k is not None:
+        matchings = enum_maximum_matchings(graph, workers, ordered, prune=prune, stats=stats,
+                                           checkpoint=checkpoint,
+                                           checkpoint_every=checkpoint_every,
+                                           checkpoint_seconds=checkpoint_seconds, resume=resume,
+                                           output=output)
+        yield from itertools.islice(matchings, k)
+        return
+    partition = BipartitePartition(graph)
+    schedule = _CheckpointSchedule(checkpoint, checkpoint_every, checkpoint_seconds)
+    if resume is not None:
+        yield from _resume_search(CompactBipartiteGraph(graph, partition), resume, _MAXIMUM, prune,
+                                  stats, schedule)
+        return
+    matching = maximum_matching(graph, top_nodes=partition.top_nodes)
     # Express the matching only from a top node to a bottom node
-    matching = {k: v for k, v in matching.items() if k in top_nodes(graph)}
+    matching = partition.top_to_bottom(matching)
     if matching:
+        compact_graph = CompactBipartiteGraph(graph, partition)
+        match = compact_graph.matching_from_dict(matching)
+        compact_graph.trim_maximum(match)
+        if prune is not None and _is_pruned(compact_graph, match, prune, stats, _ROOT_NODE):
+            return
+        if output == ARRAY:
+            walk = _walk_maximum_matchings(compact_graph, match, prune=prune, stats=stats)
+            yield from _match_lists_to_arrays(compact_graph, itertools.chain([match], walk),
+                                              batch_size)
+            return
+        if output == DELTA:
+            trace = _WalkTrace()
+            walk = _walk_maximum_matchings(compact_graph, match, prune=prune, stats=stats,
+                                           trace=trace)
+            yield from _match_lists_to_deltas(compact_graph, match, walk, trace)
+            return
         yield matching
-        directed_match_graph = create_directed_matching_graph(graph, top_nodes(graph), matching)
-        trimmed_directed_match_graph = strongly_connected_components_decomposition(
-            directed_match_graph)
-        yield from _enum_maximum_matchings_iter(graph=copy.deepcopy(graph),
-                                                matching=matching,
-                                                directed_match_graph=trimmed_directed_match_graph)
-
-
-def _get_new_matching_by_exchanging_edges(matching: Dict[Any, Any],
-                                          two_edge_path: Tuple[Any, Any, Any]) -> Dict[Any, Any]:
-    (first, second, third) = two_edge_path
-
-    # Construct M'
-    if first in matching.keys():
-        matching_prime = matching.copy()
-        del matching_prime[first]
-        matching_prime[third] = second
-    else:
-        matching_prime = matching.copy()
-        del matching_prime[second]
-        matching_prime[second] = third
-    return matching_prime
-
-def _enum_maximum_matchings_iter(graph: nx.Graph, matching: Dict[Any, Any],
-                                          directed_match_graph: nx.DiGraph) \
-        -> Iterator[Dict[Any, Any]]:
-    # Algorithm described in "Algorithms for Enumerating All Perfect, Maximum and Maximal Matchings in Bipartite Graphs"
-    # By Takeaki Uno in "Algorithms and Computation: 8th International Symposium, ISAAC '97 Singapore,
-    # December 17-19, 1997 Proceedings"
-    # See http://dx.doi.org/10.1007/3-540-63890-3_11
+        if workers is not None and workers > 1:
+            yield from _enum_matchings_in_parallel(compact_graph, match, _MAXIMUM, workers,
+                                                   ordered)
+        elif checkpoint is not None:
+            free_nodes = sorted(compact_graph.nodes_left_unmatched(match))
+            yield from _enum_with_checkpoints(compact_graph, match, _MAXIMUM, [(_EXPAND, 0, 0)], 1,
+                                              free_nodes, prune, stats, schedule)
+        else:
+            yield from _enum_maximum_matchings_iter(compact_graph, match, prune, stats)
+
+
+def _exchange_edges(compact_graph: CompactBipartiteGraph, match: List[int], old_edge: int,
+                    new_edge: int) -> List[Tuple[int, int]]:
+    # Turn M into M' in place by replacing a matching edge with an adjacent edge to an unmatched
+    # node. Returns the (node, previous edge) pairs needed to undo the change.
+    changes = []
+    for edge, new_match in ((old_edge, UNMATCHED), (new_edge, new_edge)):
+        for node in (compact_graph.edge_top[edge], compact_graph.edge_bottom[edge]):
+            changes.append((node, match[node]))
+            match[node] = new_match
+    compact_graph.note_unmatched((compact_graph.edge_top[old_edge],
+                                  compact_graph.edge_bottom[old_edge]))
+    return changes
 
+
+def _maximum_matching_step(compact_graph: CompactBipartiteGraph, match: List[int],
+                           ) -> Optional[Tuple[int, List[Tuple[int, int]]]]:
     # Step 1
-    if len(graph.edges) == 0:
-        return
+    # After trimming, every edge out of M is in another maximum matching. As M is maximum, an
+    # edge out of M has an end point of degree at least 2, so M is the only maximum matching of G
+    # when all degrees are at most 1.
+    if compact_graph.n_alive_edges == 0:
+        return None
+    if compact_graph.degree[compact_graph.max_degree_node()] < 2:
+        return None
 
     # Step 2
     # Find a cycle in the directed matching graph
     # Note that this cycle alternates between nodes from the left and the right part of the graph
-    try:
-        raw_cycle = find_cycle_with_edge_of_matching(graph=directed_match_graph, matching=matching)
-    except nx.NetworkXNoCycle:
-        raw_cycle = []
-
-    if raw_cycle:
-        cycle = _start_cycle_with_left(graph, raw_cycle)
-        assert directed_match_graph.nodes[cycle[0]]['bipartite'] == LEFT
-
-        # Step 3 - TODO: Properly find right edge? (to get complexity bound)
-        edge = cast(Tuple[Any, Any], tuple(cycle[:2]))
-
-        # Step 4
-        # already done because we are not really finding the optimal edge
-
-        # Step 5
-        # Construct new matching M' by flipping edges along the cycle, i.e. change the direction of all the
-        # edges in the cycle
-        matching_prime = matching.copy()
-        for i in range(0, len(cycle), 2):
-            matching_prime[cycle[i]] = cycle[i - 1]
-
-        assert matching_prime != matching
-        yield matching_prime
-
-        # Step 6
-        # Construct G+(e) and D(G+(e), M\e)
-        graph_plus = graph_without_nodes_of_edge(graph, edge)
-        directed_match_graph_plus = create_directed_matching_graph(graph_plus,
-                                                                   top_nodes(graph_plus), matching)
-        # Recurse with the old matching M but without the edge e
-        yield from _enum_maximum_matchings_iter(graph_plus, matching, directed_match_graph_plus)
-
-        # Step 7
-        # Construct G-(e) and D(G-(e), M')
-        graph_minus = graph_without_edge(graph, edge)
-        directed_match_graph_minus = create_directed_matching_graph(graph_minus,
-                                                                    top_nodes(graph_minus),
-                                                                    matching_prime)
-        # Recurse with the new matching M' but without the edge e
-        yield from _enum_maximum_matchings_iter(graph_minus, matching_prime,
-                                                directed_match_graph_minus)
+    # The components of D(G, M) were computed when G was trimmed
+    cycle = compact_graph.find_cycle_with_edge_of_matching(match, components_are_current=True)
+
+    if cycle is not None:
+        # Step 3
+        # Choose e as an edge of the cycle out of M and construct M' by flipping the cycle
+        edge = cycle[1]
+        return edge, _flip_cycle(compact_graph, match, cycle)
+
+    # Step 4
+    # Otherwise there is a feasible path of length 2 in D(graph, matching). Construct M' by
+    # exchanging its edges and choose e as the new edge.
+    two_edge_path = compact_graph.find_feasible_two_edge_path(match)
+    if two_edge_path is None:
+        return None
+    old_edge, edge = two_edge_path
+    return edge, _exchange_edges(compact_graph, match, old_edge, edge)
+
+
+def _walk_maximum_matchings(compact_graph: CompactBipartiteGraph,
+                            match: List[int],
+                            split_depth: Optional[int] = None,
+                            prune: Optional[Prune] = None,
+                            stats: Optional[EnumerationStats] = None,
+                            stack: Optional[List[Tuple[Any, ...]]] = None,
+                            free_nodes: Optional[List[int]] = None,
+                            n_matchings: int = 1,
+                            trace: Optional[_WalkTrace] = None
+                            ) -> Iterator[Optional[List[int]]]:
+    # Steps 5 and 6 construct G+(e) with M' and G-(e) with M, removing from both the edges that
+    # are in no maximum matching
+
+    # Every matching of the search is a maximum matching of the graph it starts with, so the nodes
+    # they leave unmatched are found once. The ones that are free in the current search-tree
+    # node are indexed by the graph and the smallest one is taken, which makes the choice of a
+    # 2-edge path depend only on the search-tree node and not on the nodes searched before it.
+    # A resumed search gets the nodes of the search it continues.
+    if free_nodes is None:
+        free_nodes = sorted(compact_graph.nodes_left_unmatched(match))
+    compact_graph.index_free_nodes(match, free_nodes)
+    return _walk_search_tree(compact_graph, match, _maximum_matching_step,
+                             compact_graph.trim_maximum, split_depth, prune, stats, stack,
+                             n_matchings, trace)
+
+
+def _enum_maximum_matchings_iter(
+        compact_graph: CompactBipartiteGraph,
+        match: List[int],
+        prune: Optional[Prune] = None,
+        stats: Optional[EnumerationStats] = None) -> Iterator[Dict[Any, Any]]:
+    return map(compact_graph.matching_to_dict,
+               _walk_maximum_matchings(compact_graph, match, prune=prune, stats=stats))
+
+
+# Version of the format of the checkpoints
+_CHECKPOINT_VERSION = 2
+
+
+class _CheckpointSchedule(NamedTuple):
+    callback: Optional[Callable[[Checkpoint], None]]
+    every: Optional[int]
+    seconds: Optional[float]
+
 
+def _resume_search(compact_graph: CompactBipartiteGraph, resume: Checkpoint, kind: str,
+                   prune: Optional[Prune], stats: Optional[EnumerationStats],
+                   schedule: _CheckpointSchedule) -> Iterator[Dict[Any, Any]]:
+    if (resume.get('version') != _CHECKPOINT_VERSION or resume.get('kind') != kind or
+            (resume.get('n_nodes'), resume.get('n_edges')) !=
+            (compact_graph.n_nodes, compact_graph.n_edges)):
+        raise ValueError('The checkpoint was not taken from this search')
+    compact_graph.restore_search_state(resume['graph'])
+    stack = [tuple(frame) for frame in resume['stack']]
+    return _enum_with_checkpoints(compact_graph, list(resume['match']), kind, stack,
+                                  resume['n_matchings'], resume['free_nodes'], prune, stats,
+                                  schedule)
+
+
+def _enum_with_checkpoints(compact_graph: CompactBipartiteGraph, match: List[int], kind: str,
+                           stack: List[Tuple[Any, ...]], n_matchings: int,
+                           free_nodes: Optional[List[int]], prune: Optional[Prune],
+                           stats: Optional[EnumerationStats],
+                           schedule: _CheckpointSchedule) -> Iterator[Dict[Any, Any]]:
+    # The walk yields when its stack holds all the work left. A checkpoint taken when the next
+    # matching is requested, once the caller is done with the previous ones, holds the graph, the
+    # matching and the stack, from which the walk goes on with the next matching.
+    if kind == _PERFECT:
+        walk = _walk_perfect_matchings(compact_graph, match, None, prune, stats, stack,
+                                       n_matchings)
     else:
-        # Step 8
-        # Find feasible path of length 2 in D(graph, matching)
-        two_edge_path = find_feasible_two_edge_path(graph, matching)
-        if not two_edge_path:
-            return
+        walk = _walk_maximum_matchings(compact_graph, match, None, prune, stats, stack, free_nodes,
+                                       n_matchings)
 
-        # remove the node that is in the matching to only keep the new edge
-        edge = two_edge_path[:0:-1] if two_edge_path[0] in matching.keys() else two_edge_path[1::]
-        matching_prime = _get_new_matching_by_exchanging_edges(matching=matching,
-                                                               two_edge_path=two_edge_path)
-        assert matching_prime != matching
-        yield matching_prime
+    def take_checkpoint() -> None:
+        if schedule.callback is not None:
+            schedule.callback({
+                'version': _CHECKPOINT_VERSION,
+                'kind': kind,
+                'n_nodes': compact_graph.n_nodes,
+                'n_edges': compact_graph.n_edges,
+                'n_matchings': n_matchings,
+                'match': list(match),
+                'stack': [list(frame) for frame in stack],
+                'free_nodes': free_nodes,
+                'graph': compact_graph.search_state(),
+            })
 
-        # Step 9
-        # Construct G+(e) and D(G+(e), M\e)
-        graph_plus = graph_without_nodes_of_edge(graph, edge)
-        dgm_plus = create_directed_matching_graph(graph_plus, top_nodes(graph_plus),
-                                                  matching_prime)
-        yield from _enum_maximum_matchings_iter(graph_plus, matching_prime, dgm_plus)
+    checkpoint_count = n_matchings
+    checkpoint_time = time.monotonic()
+    for _ in walk:
+        yield compact_graph.matching_to_dict(match)
+        n_matchings += 1
+        if ((schedule.every is not None and n_matchings - checkpoint_count >= schedule.every) or
+                (schedule.seconds is not None and
+                 time.monotonic() - checkpoint_time >= schedule.seconds)):
+            take_checkpoint()
+            checkpoint_count = n_matchings
+            checkpoint_time = time.monotonic()
+    take_checkpoint()
 
-        # Step 10
-        # Construct G-(e) and D(G-(e), M')
-        graph_minus = graph_without_edge(graph, edge)
-        dgm_minus = create_directed_matching_graph(graph_minus, top_nodes(graph_minus), matching)
-        yield from _enum_maximum_matchings_iter(graph_minus, matching, dgm_minus)
 
+# Kinds of search that can be split between processes, with their walk and their trim
+_PERFECT = 'perfect'
+_MAXIMUM = 'maximum'
+_SEARCH_TREE_WALKS = {_PERFECT: _walk_perfect_matchings, _MAXIMUM: _walk_maximum_matchings}
+_TRIMS = {_PERFECT: CompactBipartiteGraph.trim, _MAXIMUM: CompactBipartiteGraph.trim_maximum}
 
-def enum_maximal_matchings(graph: nx.Graph) -> Iterator[Dict[Any, Any]]:
-    # Step 1
-    # If all vertices of G have degrees 0 or 1, output the unique maximal matching of G and stop.
-    node_degree = next((node_degree for node_degree in graph.degree if node_degree[1] >= 2), None)
-    if node_degree is None:
-        matching = maximum_matching(graph, top_nodes=top_nodes(graph))
-        yield {k: v for k, v in matching.items() if k in top_nodes(graph)}
+# Subproblems created per worker, so that uneven subtrees still keep every worker busy
+_SUBPROBLEMS_PER_WORKER = 8
+# Subproblems in flight per worker, which bounds the results held waiting to be yielded
+_PENDING_PER_WORKER = 2
+
+# Graph and kind of search of a worker process, set once by `_init_worker`
+_worker_search: Optional[Tuple[CompactBipartiteGraph, str]] = None
+
+# A subproblem is sent as the edges removed from the trimmed graph and the matching it receives,
+# both packed as arrays of edge ids
+_Subproblem = Tuple[bytes, bytes]
+
+
+def _init_worker(serialized_graph: bytes, kind: str) -> None:
+    global _worker_search
+    _worker_search = (pickle.loads(serialized_graph), kind)
+
+
+def _enum_subproblem(removed_edges: bytes, packed_match: bytes) -> array:
+    # Searches a subproblem in a worker and returns the matchings found, packed as the matched
+    # edges of the top nodes one matching after the other
+    assert _worker_search is not None
+    compact_graph, kind = _worker_search
+    mark = compact_graph.undo_mark()
+    for edge in array('l', removed_edges):
+        compact_graph.remove_edge(edge)
+    match = array('l', packed_match).tolist()
+    # The graph is already trimmed, trimming it again computes the components the search uses
+    _TRIMS[kind](compact_graph, match)
+    matchings = array('l')
+    n_top = compact_graph.n_top
+    for new_match in _SEARCH_TREE_WALKS[kind](compact_graph, match):
+        matchings.extend(new_match[:n_top])
+    compact_graph.undo(mark)
+    return matchings
+
+
+def _unpack_matchings(compact_graph: CompactBipartiteGraph,
+                      matchings: array) -> Iterator[Dict[Any, Any]]:
+    n_top = compact_graph.n_top
+    for start in range(0, len(matchings), n_top):
+        yield compact_graph.matching_to_dict(matchings[start:start + n_top])
+
+
+def _enum_matchings_in_parallel(compact_graph: CompactBipartiteGraph, match: List[int], kind: str,
+                                workers: int, ordered: bool) -> Iterator[Dict[Any, Any]]:
+    # Every node of the search tree splits its matchings between two independent subtrees. The top
+    # of the tree is walked here down to a depth that leaves enough subproblems for the workers,
+    # which receive the trimmed graph once and then each subproblem in a compact form.
+    serialized_graph = pickle.dumps(compact_graph)
+    root_mark = compact_graph.undo_mark()
+    split_depth = max(1, math.ceil(math.log2(workers * _SUBPROBLEMS_PER_WORKER)))
+
+    # Matchings found at the top of the tree and subproblems below it, in the order of the
+    # serial search
+    plan: List[Union[Dict[Any, Any], _Subproblem]] = []
+    for new_match in _SEARCH_TREE_WALKS[kind](compact_graph, match, split_depth):
+        if new_match is None:
+            removed_edges = array('l', compact_graph.removed_edges_since(root_mark))
+            plan.append((removed_edges.tobytes(), array('l', match).tobytes()))
+        else:
+            plan.append(compact_graph.matching_to_dict(new_match))
+
+    max_pending = workers * _PENDING_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(serialized_graph, kind)) as executor:
+        if ordered:
+            # Results wait in a queue in the order of the plan
+            queue: Deque[Union[Dict[Any, Any], 'Future[array]']] = deque()
+            n_pending = 0
+            for item in plan:
+                if isinstance(item, dict):
+                    queue.append(item)
+                    continue
+                queue.append(executor.submit(_enum_subproblem, *item))
+                n_pending += 1
+                while n_pending >= max_pending or (queue and isinstance(queue[0], dict)):
+                    entry = queue.popleft()
+                    if isinstance(entry, dict):
+                        yield entry
+                    else:
+                        n_pending -= 1
+                        yield from _unpack_matchings(compact_graph, entry.result())
+            for entry in queue:
+                if isinstance(entry, dict):
+                    yield entry
+                else:
+                    yield from _unpack_matchings(compact_graph, entry.result())
+        else:
+            subproblems = []
+            for item in plan:
+                if isinstance(item, dict):
+                    yield item
+                else:
+                    subproblems.append(item)
+            pending: Set['Future[array]'] = set()
+            for subproblem in subproblems:
+                pending.add(executor.submit(_enum_subproblem, *subproblem))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from _unpack_matchings(compact_graph, future.result())
+            for future in as_completed(pending):
+                yield from _unpack_matchings(compact_graph, future.result())
+
+
+def enum_maximal_matchings(
+        graph: nx.Graph,
+        required_edges: Iterable[Tuple[Any, Any]] = (),
+        forbidden_edges: Iterable[Tuple[Any, Any]] = ()) -> Iterator[Dict[Any, Any]]:
+    """Enumerates all maximal matchings of a bipartite graph.
+
+    ``required_edges`` and ``forbidden_edges`` work as in `enum_perfect_matchings`.
+    """
+    required_edges = list(required_edges)
+    forbidden_edges = list(forbidden_edges)
+    if not (required_edges or forbidden_edges):
+        yield from _enum_maximal_matchings(graph)
         return
+    subgraph, fixed_edges = constrained_graph(graph, required_edges, forbidden_edges)
+    # A maximal matching of the graph also covers an end of the forbidden edges of the subgraph
+    open_edges = [edge for edge in forbidden_edges if subgraph.has_node(edge[0]) and
+                  subgraph.has_node(edge[1])]
+    for matching in _enum_maximal_matchings(subgraph):
+        covered = set(matching)
+        covered.update(matching.values())
+        if all(node in covered or neighbor in covered for node, neighbor in open_edges):
+            yield {**matching, **fixed_edges}
+
+
+# Steps of the explicit stack of `_enum_maximal_matchings`, next to `_EXPAND` and `_RESTORE`.
+# `_ADD_EDGE` enters G+(e) for an edge e of the branching node, and `_AVOID_NODE` enters, one
+# maximum matching of G' at a time, the matchings that leave the branching node unmatched.
+_ADD_EDGE = 3
+_AVOID_NODE = 4
+
+
+def _enum_maximal_matchings(graph: nx.Graph) -> Iterator[Dict[Any, Any]]:
+    # The search runs on a single compact graph, whose subgraphs are obtained by removing edges
+    # and brought back with the undo log. The edges chosen on the way down to a search-tree node
+    # are kept on a stack as (top, bottom) pairs, so a node costs the edges it removes and a leaf
+    # the size of its matching, with a scan of the top nodes for its isolated edges.
+    compact_graph = CompactBipartiteGraph(graph)
+    labels = compact_graph.labels
+    degree = compact_graph.degree
+    chosen: List[Tuple[int, int]] = []
+    # Frames of `_EXPAND` hold the first node that may still have a degree of 2. Degrees only
+    # decrease down the search tree, and the branching node loses all its edges in every branch,
+    # so the children of a node skip every node up to it.
+    stack: List[Tuple[Any, ...]] = [(_EXPAND, 0)]
+    while stack:
+        frame = stack.pop()
+        step = frame[0]
+
+        if step == _EXPAND:
+            # Step 1
+            # If all vertices of G have degrees 0 or 1, output the unique maximal matching of G
+            _, first_node = frame
+            node = next((node for node in range(first_node, compact_graph.n_nodes)
+                         if degree[node] >= 2), None)
+            if node is None:
+                yield {labels[top]: labels[bottom]
+                       for top, bottom in itertools.chain(chosen, _isolated_edges(compact_graph))}
+                continue
+
+            # Step 2
+            # Choose a vertex v with degree at least 2
+            # Step 3
+            # For each edge e incident to v, enumerate the maximal matchings of G+(e), completed
+            # with e. The ones without an edge of v come last.
+            stack.append((_AVOID_NODE, node, None))
+            stack.extend((_ADD_EDGE, node, edge)
+                         for _, edge in reversed(compact_graph.neighbors(node)))
+
+        elif step == _ADD_EDGE:
+            _, node, edge = frame
+            mark = compact_graph.undo_mark()
+            compact_graph.remove_nodes_of_edge(edge)
+            chosen.append((compact_graph.edge_top[edge], compact_graph.edge_bottom[edge]))
+            stack.append((_RESTORE, mark, len(chosen) - 1))
+            stack.append((_EXPAND, node + 1))
+
+        elif step == _AVOID_NODE:
+            # Step 4
+            # A maximal matching without an edge of v matches every neighbour of v, so its edges
+            # at the neighbours are a maximum matching M of G', the edges incident to vertices
+            # adjacent to v except for edges incident to v, with |M| = d(v)
+            _, node, matchings = frame
+            if matchings is None:
+                matchings = _neighbor_covering_matchings(compact_graph, node)
+            edges = next(matchings, None)
+            if edges is None:
+                continue
+            stack.append((_AVOID_NODE, node, matchings))
 
-    # Step 2
-    # Choose a vertex v with degree at least 2.
-    node, degree = node_degree
-
-    for neighbor in graph.neighbors(node):
-        # Step 3: For each edge e in G incident to v, construct G+(e) and enumerate all maximal
-        # matchings including e by recursive calls.
-        # After the recursive call, reconstruct G from G+(e)
-
-        # Oder nodes in the edge according to matching convention
-        edge = (node, neighbor)
-        edge = edge if edge[0] in top_nodes(graph) else edge[::-1]
-        # Create G+(e)
-        graph_plus = graph_without_nodes_of_edge(graph, edge)
-        # Recursively get maximal matchings from G+(e) and then add e
-        for maximal_matching in enum_maximal_matchings(graph_plus):
-            maximal_matching.update({edge})
-            yield maximal_matching
-
-    # Let G' be the subgraph composed of edges incident
-    # to vertices adjacent to v, except for edges incident to v
-    edges = set()
-    for neighbor in graph.neighbors(node):
-        for second_neighbor in graph.neighbors(neighbor):
-            if second_neighbor is not node:
-                edges.add(tuple(sorted((neighbor, second_neighbor))))
-    graph_prime = graph.edge_subgraph(edges)
-    # Step 4
-    # Find a maximum matching M in G'. If |M| = d(v),
-    # then enumerate all maximum matchings in G' by ENUM_MAXIMUM_MATCHING_ITER(M,G').
-    matching = maximum_matching(graph_prime, top_nodes=top_nodes(graph_prime))
-    matching = {k: v for k, v in matching.items() if k in top_nodes(graph_prime)}
-    if len(matching) == degree:
-        directed_match_graph = create_directed_matching_graph(graph_prime, top_nodes(graph_prime),
-                                                              matching)
-        for max_matching in _enum_maximum_matchings_iter(graph_prime, matching,
-                                                         directed_match_graph):
             # Step 5
-            # For each matching, enumerate all maximal matchings including it.
-            subgraph = nx.Graph(graph_prime)
-            for edge in max_matching.items():
-                subgraph = graph_without_nodes_of_edge(subgraph, edge)
-            for maximal_matching in enum_maximal_matchings(subgraph):
-                maximal_matching.update(max_matching)
-                yield maximal_matching
\ No newline at end of file
+            # For each such M, enumerate the maximal matchings of G - v - V(M), completed with M.
+            # The nodes of v and M are removed until the next M is asked for.
+            stack.append((_RESTORE, compact_graph.undo_mark(), len(chosen)))
+            chosen.extend(edges)
+            stack.append((_EXPAND, node + 1))
+
+        else:
+            _, mark, n_chosen = frame
+            compact_graph.undo(mark)
+            del chosen[n_chosen:]
+
+
+def _isolated_edges(compact_graph: CompactBipartiteGraph) -> List[Tuple[int, int]]:
+    # Returns the (top, bottom) pairs of the alive edges of a graph whose degrees are at most 1.
+    # The scan of the top nodes stops once they are all found.
+    indptr = compact_graph.indptr
+    indices = compact_graph.indices
+    edge_ids = compact_graph.edge_ids
+    alive = compact_graph.alive
+    degree = compact_graph.degree
+    edges = []
+    top = 0
+    while len(edges) < compact_graph.n_alive_edges:
+        if degree[top]:
+            p = indptr[top]
+            while not alive[edge_ids[p]]:
+                p += 1
+            edges.append((top, indices[p]))
+        top += 1
+    return edges
+
+
+def _neighbor_covering_matchings(compact_graph: CompactBipartiteGraph,
+                                 node: int) -> Iterator[List[Tuple[int, int]]]:
+    # Yields, as (top, bottom) pairs, the maximum matchings of G' that match every neighbour of
+    # `node`, each one left with `node` and its own nodes removed from the shared graph until the
+    # next one is asked for. G' is never built: its edges are the alive edges of the neighbours
+    # once `node` is removed. The neighbours are matched in order along each of their edges, and
+    # a single working matching of the neighbours that follow is repaired with an alternating
+    # path, so that only the edges that lead to a matching are followed.
+    neighbors = [neighbor for neighbor, _ in compact_graph.neighbors(node)]
+    if any(compact_graph.degree[neighbor] < 2 for neighbor in neighbors):
+        return
+    start = compact_graph.undo_mark()
+    compact_graph.remove_node(node)
+    # Second neighbour matched to the neighbour at each position, and the other way round
+    partner = [UNMATCHED] * len(neighbors)
+    owner: Dict[int, int] = {}
+    if not all(_augment_covering(compact_graph, neighbors, partner, owner, position)
+               for position in range(len(neighbors))):
+        compact_graph.undo(start)
+        return
+    pairs: List[Tuple[int, int]] = []
+    marks: List[int] = []
+    branches = [iter(compact_graph.neighbors(neighbors[0]))]
+    while branches:
+        position = len(branches) - 1
+        if len(marks) > position:
+            compact_graph.undo(marks.pop())
+            pairs.pop()
+        second_neighbor, edge = next(branches[-1], (None, None))
+        if edge is None:
+            branches.pop()
+            continue
+        mark = compact_graph.undo_mark()
+        compact_graph.remove_nodes_of_edge(edge)
+        if not _move_covering_neighbor(compact_graph, neighbors, partner, owner, position,
+                                       second_neighbor):
+            compact_graph.undo(mark)
+            continue
+        marks.append(mark)
+        pairs.append((compact_graph.edge_top[edge], compact_graph.edge_bottom[edge]))
+        if position + 1 == len(neighbors):
+            yield list(pairs)
+        else:
+            branches.append(iter(compact_graph.neighbors(neighbors[position + 1])))
+    compact_graph.undo(start)
+
+
+def _move_covering_neighbor(compact_graph: CompactBipartiteGraph, neighbors: List[int],
+                            partner: List[int], owner: Dict[int, int], position: int,
+                            second_neighbor: int) -> bool:
+    # Matches the neighbour at `position` to `second_neighbor` in the working matching, once the
+    # nodes of their edge are removed, unless the neighbour that loses `second_neighbor` cannot be
+    # matched again. The working matching is left as it was when False is returned.
+    old_partner = partner[position]
+    if second_neighbor == old_partner:
+        return True
+    displaced = owner.get(second_neighbor)
+    partner[position] = second_neighbor
+    owner[second_neighbor] = position
+    del owner[old_partner]
+    if displaced is not None:
+        partner[displaced] = UNMATCHED
+        if not _augment_covering(compact_graph, neighbors, partner, owner, displaced):
+            partner[displaced] = second_neighbor
+            owner[second_neighbor] = displaced
+            partner[position] = old_partner
+            owner[old_partner] = position
+            return False
+    return True
+
+
+def _augment_covering(compact_graph: CompactBipartiteGraph, neighbors: List[int],
+                      partner: List[int], owner: Dict[int, int], source: int) -> bool:
+    # Matches the unmatched neighbour at position `source` along an alternating path of the
+    # working matching that ends at a free second neighbour, found breadth first
+    indptr = compact_graph.indptr
+    indices = compact_graph.indices
+    edge_ids = compact_graph.edge_ids
+    alive = compact_graph.alive
+    reached_from: Dict[int, int] = {}
+    queue = deque([source])
+    while queue:
+        position = queue.popleft()
+        neighbor = neighbors[position]
+        for p in range(indptr[neighbor], indptr[neighbor + 1]):
+            second_neighbor = indices[p]
+            if not alive[edge_ids[p]] or second_neighbor in reached_from:
+                continue
+            reached_from[second_neighbor] = position
+            next_position = owner.get(second_neighbor)
+            if next_position is not None:
+                queue.append(next_position)
+                continue
+            # Flips the path back to `source`
+            while True:
+                position = reached_from[second_neighbor]
+                previous = partner[position]
+                partner[position] = second_neighbor
+                owner[second_neighbor] = position
+                if position == source:
+                    return True
+                second_neighbor = previous
+    return False
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""Contains the enumeration of matchings by non-decreasing total weight, with Murty's method.
+
+The matchings are the assignments of a cost matrix with a row per top node and a column per
+bottom node, where missing edges cost infinity. The cheapest assignment is found with the
+shortest augmenting path algorithm on reduced costs. Murty's method then partitions the remaining
+assignments into subproblems that force the first rows of the assignment and forbid the next one,
+which are kept in a priority queue by the cost of their cheapest assignment.
+
+A subproblem only differs from its parent by some entries set to infinity. The dual potentials of
+the parent stay feasible, so its cheapest assignment is found from the parent's one with a single
+augmenting path.
+
+Maximum matchings are the cheapest assignments of a matrix padded with a dummy column per top
+node and a dummy row per bottom node, where leaving a node unmatched costs more than any
+difference of weight between matchings.
+"""
+import heapq
+import itertools
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import networkx as nx
+
+from .graphs_utils import BipartitePartition
+
+__all__ = ['enum_ranked_perfect_matchings', 'enum_ranked_maximum_matchings']
+
+UNASSIGNED = -1
+
+
+class _Assignment:
+    # Assignment of the rows of a cost matrix, with the dual potentials that prove it is the
+    # cheapest one. Every row is assigned.
+
+    def __init__(self, col_of_row: np.ndarray, row_of_col: np.ndarray, u: np.ndarray,
+                 v: np.ndarray) -> None:
+        self.col_of_row = col_of_row
+        self.row_of_col = row_of_col
+        self.u = u
+        self.v = v
+
+    def copy(self) -> '_Assignment':
+        return _Assignment(self.col_of_row.copy(), self.row_of_col.copy(), self.u.copy(),
+                           self.v.copy())
+
+    def cost(self, cost: np.ndarray) -> float:
+        return float(cost[np.arange(len(self.col_of_row)), self.col_of_row].sum())
+
+
+def _augment(cost: np.ndarray, assignment: _Assignment, current_row: int) -> bool:
+    # Assigns `current_row` along a shortest augmenting path of reduced costs and updates the
+    # potentials, returns False when no column can be reached. Each step scans the columns left
+    # with NumPy.
+    n_cols = cost.shape[1]
+    col_of_row = assignment.col_of_row
+    row_of_col = assignment.row_of_col
+    u = assignment.u
+    v = assignment.v
+    shortest = np.full(n_cols, np.inf)
+    path = np.full(n_cols, UNASSIGNED)
+    scanned_rows = [current_row]
+    scanned_cols = np.zeros(n_cols, dtype=bool)
+    remaining = np.arange(n_cols)
+    row = current_row
+    min_value = 0.0
+    while True:
+        reduced = min_value + cost[row, remaining] - u[row] - v[remaining]
+        better = reduced < shortest[remaining]
+        shortest[remaining[better]] = reduced[better]
+        path[remaining[better]] = row
+        position = int(np.argmin(shortest[remaining]))
+        min_value = float(shortest[remaining[position]])
+        if min_value == np.inf:
+            return False
+        col = int(remaining[position])
+        scanned_cols[col] = True
+        remaining = np.delete(remaining, position)
+        if row_of_col[col] == UNASSIGNED:
+            sink = col
+            break
+        row = int(row_of_col[col])
+        scanned_rows.append(row)
+
+    u[current_row] += min_value
+    for row in scanned_rows[1:]:
+        u[row] += min_value - shortest[col_of_row[row]]
+    v[scanned_cols] -= min_value - shortest[scanned_cols]
+
+    col = sink
+    while True:
+        row = int(path[col])
+        row_of_col[col] = row
+        col_of_row[row], col = col, int(col_of_row[row])
+        if row == current_row:
+            break
+    return True
+
+
+def _solve(cost: np.ndarray) -> Optional[_Assignment]:
+    # Cheapest assignment of all rows, `None` when there is none of finite cost
+    n_rows, n_cols = cost.shape
+    assignment = _Assignment(np.full(n_rows, UNASSIGNED), np.full(n_cols, UNASSIGNED),
+                             np.zeros(n_rows), np.zeros(n_cols))
+    for row in range(n_rows):
+        if not _augment(cost, assignment, row):
+            return None
+    return assignment
+
+
+# Constraints of a subproblem: the forced (row, column) pairs and the forbidden ones
+_Constraints = Tuple[Tuple[Tuple[int, int], ...], Tuple[Tuple[int, int], ...]]
+
+
+def _constrained_cost(cost: np.ndarray, constraints: _Constraints) -> np.ndarray:
+    forced, forbidden = constraints
+    cost = cost.copy()
+    for row, col in forbidden:
+        cost[row, col] = np.inf
+    for row, col in forced:
+        _force(cost, row, col)
+    return cost
+
+
+def _force(cost: np.ndarray, row: int, col: int) -> None:
+    value = cost[row, col]
+    cost[row, :] = np.inf
+    cost[:, col] = np.inf
+    cost[row, col] = value
+
+
+def _murty(cost: np.ndarray, partitioned_rows: int) -> Iterator[Tuple[float, np.ndarray]]:
+    # Yields the assignments of `cost` by non-decreasing cost. The partition of Murty only splits
+    # on the first `partitioned_rows` rows, so assignments that only differ on the other rows are
+    # yielded once.
+    assignment = _solve(cost)
+    if assignment is None:
+        return
+    counter = itertools.count()
+    queue = [(assignment.cost(cost), next(counter), ((), ()), assignment)]
+    while queue:
+        value, _, constraints, assignment = heapq.heappop(queue)
+        yield value, assignment.col_of_row[:partitioned_rows].copy()
+
+        forced, forbidden = constraints
+        forced_rows = {row for row, _ in forced}
+        subproblem_cost = _constrained_cost(cost, constraints)
+        for row in range(partitioned_rows):
+            if row in forced_rows:
+                continue
+            col = int(assignment.col_of_row[row])
+            # The child forbids the column of this row and forces the rows split before it
+            child_cost = subproblem_cost.copy()
+            child_cost[row, col] = np.inf
+            child = assignment.copy()
+            child.col_of_row[row] = UNASSIGNED
+            child.row_of_col[col] = UNASSIGNED
+            if _augment(child_cost, child, row):
+                child_constraints = (forced, forbidden + ((row, col), ))
+                heapq.heappush(queue, (child.cost(child_cost), next(counter), child_constraints,
+                                       child))
+            _force(subproblem_cost, row, col)
+            forced = forced + ((row, col), )
+
+
+def _edge_weight(graph: nx.Graph, top: Any, bottom: Any, weight: str) -> float:
+    return float(graph.edges[top, bottom].get(weight, 1))
+
+
+def enum_ranked_perfect_matchings(graph: nx.Graph, weight: str) -> Iterator[Dict[Any, Any]]:
+    """Enumerates the perfect matchings of a bipartite graph by non-decreasing total weight.
+
+    The weight of an edge is its ``weight`` attribute, 1 when it has none.
+    """
+    partition = BipartitePartition(graph)
+    if partition.n_top != partition.n_bottom or partition.n_top == 0:
+        return
+    column_of = {node: column for column, node in enumerate(partition.bottom_nodes)}
+    cost = np.full((partition.n_top, partition.n_bottom), np.inf)
+    for row, top in enumerate(partition.top_nodes):
+        for bottom in graph.adj[top]:
+            cost[row, column_of[bottom]] = _edge_weight(graph, top, bottom, weight)
+
+    for _, col_of_row in _murty(cost, partition.n_top):
+        yield {top: partition.bottom_nodes[col]
+               for top, col in zip(partition.top_nodes, col_of_row)}
+
+
+def enum_ranked_maximum_matchings(graph: nx.Graph, weight: str) -> Iterator[Dict[Any, Any]]:
+    """Enumerates the maximum matchings of a bipartite graph by non-decreasing total weight.
+
+    The weight of an edge is its ``weight`` attribute, 1 when it has none.
+    """
+    partition = BipartitePartition(graph)
+    n_top = partition.n_top
+    n_bottom = partition.n_bottom
+    if graph.number_of_edges() == 0:
+        return
+    column_of = {node: column for column, node in enumerate(partition.bottom_nodes)}
+    weights = {(top, bottom): _edge_weight(graph, top, bottom, weight)
+               for top in partition.top_nodes for bottom in graph.adj[top]}
+    # Leaving a top node and a bottom node unmatched costs more than any change of weight
+    big = (min(n_top, n_bottom) + 1) * (max(abs(value) for value in weights.values()) + 1)
+
+    # Rows are the top nodes then a dummy row per bottom node, columns are the bottom nodes then
+    # a dummy column per top node
+    size = n_top + n_bottom
+    cost = np.full((size, size), np.inf)
+    for row, top in enumerate(partition.top_nodes):
+        for bottom in graph.adj[top]:
+            cost[row, column_of[bottom]] = weights[top, bottom]
+        cost[row, n_bottom + row] = big
+    for col in range(n_bottom):
+        cost[n_top + col, col] = big
+    cost[n_top:, n_bottom:] = 0.0
+
+    n_matched = None
+    for _, col_of_row in _murty(cost, n_top):
+        matching = {top: partition.bottom_nodes[col]
+                    for top, col in zip(partition.top_nodes, col_of_row) if col < n_bottom}
+        if n_matched is None:
+            n_matched = len(matching)
+        elif len(matching) < n_matched:
+            # The remaining assignments leave more nodes unmatched
+            return
+        yield matching
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""Contains functions to draw random perfect matchings of a bipartite graph.
+
+Small graphs are sampled exactly: the partner of each top node is drawn in turn, with the
+probability of the number of perfect matchings that remain, which are permanents of minors of the
+biadjacency matrix. Larger graphs are sampled with the Markov chain of Broder and of Jerrum and
+Sinclair over perfect and near-perfect matchings, which is near-uniform after enough steps.
+"""
+import random
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import networkx as nx
+from networkx.algorithms.bipartite.matching import maximum_matching
+
+from .compact_graph import CompactBipartiteGraph, UNMATCHED
+from .counting import AUTO
+from .graphs_utils import BipartitePartition
+from .permanent import biadjacency_matrix, permanent
+
+__all__ = ['sample_perfect_matchings', 'EXACT', 'MCMC']
+
+# Sampling methods of `sample_perfect_matchings`
+EXACT = 'exact'
+MCMC = 'mcmc'
+
+# Largest side sampled exactly by the `AUTO` method
+_EXACT_MAX_SIZE = 16
+# Default steps of the Markov chain between two samples, per edge and top node of the graph
+_MIXING_STEPS_PER_EDGE_AND_NODE = 1
+
+
+def sample_perfect_matchings(graph: nx.Graph,
+                             k: int,
+                             seed: Optional[int] = None,
+                             method: str = AUTO,
+                             mixing_steps: Optional[int] = None) -> List[Dict[Any, Any]]:
+    """Returns ``k`` perfect matchings of a bipartite graph drawn independently at random.
+
+    The matchings are expressed from top nodes to bottom nodes, as the ones of
+    `enum_perfect_matchings`, and no matching is returned when the graph has none. ``method`` is
+    `EXACT` for uniform samples, `MCMC` for near-uniform samples after ``mixing_steps`` steps of
+    the Markov chain, or `AUTO` to sample exactly the graphs with at most 16 top nodes.
+    """
+    if method not in (AUTO, EXACT, MCMC):
+        raise ValueError(f"Unknown sampling method '{method}'")
+    partition = BipartitePartition(graph)
+    if partition.n_top != partition.n_bottom or partition.n_top == 0:
+        return []
+    matching = partition.top_to_bottom(maximum_matching(graph, top_nodes=partition.top_nodes))
+    if len(matching) != partition.n_top:
+        return []
+    rng = random.Random(seed)
+    if method == EXACT or (method == AUTO and partition.n_top <= _EXACT_MAX_SIZE):
+        return _sample_exactly(graph, partition, k, rng)
+    compact_graph = CompactBipartiteGraph(graph, partition)
+    if mixing_steps is None:
+        mixing_steps = (_MIXING_STEPS_PER_EDGE_AND_NODE * compact_graph.n_edges *
+                        compact_graph.n_top)
+    return _sample_with_markov_chain(compact_graph, compact_graph.matching_from_dict(matching), k,
+                                     rng, mixing_steps)
+
+
+def _sample_exactly(graph: nx.Graph, partition: BipartitePartition, k: int,
+                    rng: random.Random) -> List[Dict[Any, Any]]:
+    # Self-reducibility: the top nodes choose their partner in order, each bottom node with the
+    # probability of the perfect matchings of the rest of the graph. These are the permanents of
+    # the minors left by the rows and columns taken so far, which are shared between samples.
+    matrix = biadjacency_matrix(graph, partition.top_nodes, partition.bottom_nodes)
+    n = matrix.shape[0]
+    neighbors = [np.flatnonzero(row).tolist() for row in matrix]
+    # Permanent of the minor without the first rows and the columns of a bit mask
+    minor_permanents: Dict[int, int] = {}
+
+    def minor_permanent(used_columns: int) -> int:
+        count = minor_permanents.get(used_columns)
+        if count is None:
+            row = bin(used_columns).count('1')
+            columns = [column for column in range(n) if not used_columns >> column & 1]
+            count = permanent(matrix[row:, columns]) if columns else 1
+            minor_permanents[used_columns] = count
+        return count
+
+    samples = []
+    for _ in range(k):
+        used_columns = 0
+        sample = {}
+        for row in range(n):
+            candidates = [column for column in neighbors[row] if not used_columns >> column & 1]
+            weights = [minor_permanent(used_columns | 1 << column) for column in candidates]
+            choice = rng.randrange(sum(weights))
+            for column, weight in zip(candidates, weights):
+                if choice < weight:
+                    break
+                choice -= weight
+            used_columns |= 1 << column
+            sample[partition.top_nodes[row]] = partition.bottom_nodes[column]
+        samples.append(sample)
+    return samples
+
+
+def _sample_with_markov_chain(compact_graph: CompactBipartiteGraph, match: List[int], k: int,
+                              rng: random.Random, mixing_steps: int) -> List[Dict[Any, Any]]:
+    # The chain moves between perfect matchings and near-perfect matchings, that leave a top node
+    # and a bottom node unmatched. From a uniform random edge (t, b) it removes (t, b) from a
+    # perfect matching, adds it when t and b are the unmatched nodes, or slides it when only t or
+    # b is unmatched, which moves that hole to the former partner of the other end. Every move is
+    # as likely as its reverse, so the stationary distribution is uniform over all the states.
+    #
+    # The chain is only read at the end of each block of `mixing_steps` steps, and a block that
+    # ends on a near-perfect matching is followed by another one. Stopping at the first perfect
+    # matching reached instead would favour the matchings that the chain takes long to come back
+    # to, whatever the number of steps.
+    edge_top = compact_graph.edge_top
+    edge_bottom = compact_graph.edge_bottom
+    n_edges = compact_graph.n_edges
+    # Partner of every node
+    mate = [UNMATCHED] * compact_graph.n_nodes
+    for top in range(compact_graph.n_top):
+        mate[top] = edge_bottom[match[top]]
+        mate[edge_bottom[match[top]]] = top
+    top_hole = bottom_hole = UNMATCHED
+
+    samples = []
+    for _ in range(k):
+        while True:
+            for _ in range(mixing_steps):
+                # Lazy chain, it stays in place half of the time
+                if rng.random() < 0.5:
+                    continue
+                edge = rng.randrange(n_edges)
+                top = edge_top[edge]
+                bottom = edge_bottom[edge]
+                if top_hole == UNMATCHED:
+                    if mate[top] == bottom:
+                        mate[top] = mate[bottom] = UNMATCHED
+                        top_hole, bottom_hole = top, bottom
+                elif top == top_hole and bottom == bottom_hole:
+                    mate[top], mate[bottom] = bottom, top
+                    top_hole = bottom_hole = UNMATCHED
+                elif top == top_hole:
+                    top_hole = mate[bottom]
+                    mate[top_hole] = UNMATCHED
+                    mate[top], mate[bottom] = bottom, top
+                elif bottom == bottom_hole:
+                    bottom_hole = mate[top]
+                    mate[bottom_hole] = UNMATCHED
+                    mate[top], mate[bottom] = bottom, top
+            if top_hole == UNMATCHED:
+                break
+        labels = compact_graph.labels
+        samples.append({labels[top]: labels[mate[top]] for top in range(compact_graph.n_top)})
+    return samples
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Contains the counters that an enumeration updates while it runs."""
+from typing import Callable, Optional
+
+__all__ = ['EnumerationStats', 'COMPACT_ENGINE', 'BITSET_ENGINE']
+
+# Searches of the perfect and maximum matchings reported by `EnumerationStats.engine`
+COMPACT_ENGINE = 'compact'
+BITSET_ENGINE = 'bitset'
+
+
+class EnumerationStats:
+    """Counters of an enumeration, passed as ``stats`` and updated in place while it runs.
+
+    ``prune_checks`` counts the search-tree nodes handed to the ``prune`` predicate and
+    ``pruned_subtrees`` the ones it cut off, of which ``pruned_plus`` were G+(e) subtrees and
+    ``pruned_minus`` G-(e) subtrees. The remaining one is the root of the search.
+
+    ``search_nodes`` counts the nodes of the search tree expanded by the serial search and
+    ``max_depth`` is the depth of the deepest one. ``cycle_searches`` counts the cycles, or the
+    alternating paths of maximum matchings, searched to build a new matching, and ``trims`` the
+    trims of the graph. The graph is never copied: ``removed_edges`` counts the edges removed
+    from it and ``restored_edges`` the ones put back from its undo log. ``cycle_search_time``,
+    ``trim_time`` and ``update_time``, the time spent building G+(e) and G-(e) and restoring the
+    graph, are in seconds.
+
+    ``engine`` names the search that ran, `COMPACT_ENGINE` on `CompactBipartiteGraph` or
+    `BITSET_ENGINE` on `BitsetBipartiteGraph` for small dense graphs, which count the same nodes,
+    searches and trims. The bitset search restores edges from snapshots of the graph instead of an
+    undo log, and leaves the graph of its last node as it is, so it restores fewer edges than it
+    removes.
+
+    ``callback`` is called with the stats every ``callback_every`` search-tree nodes and when a
+    search is over, to export them while the enumeration runs.
+    """
+
+    def __init__(self,
+                 callback: Optional[Callable[['EnumerationStats'], None]] = None,
+                 callback_every: int = 1000) -> None:
+        if callback_every < 1:
+            raise ValueError('callback_every must be a positive integer')
+        self.prune_checks = 0
+        self.pruned_subtrees = 0
+        self.pruned_plus = 0
+        self.pruned_minus = 0
+        self.search_nodes = 0
+        self.max_depth = 0
+        self.cycle_searches = 0
+        self.trims = 0
+        self.removed_edges = 0
+        self.restored_edges = 0
+        self.cycle_search_time = 0.0
+        self.trim_time = 0.0
+        self.update_time = 0.0
+        self.engine: Optional[str] = None
+        self.callback = callback
+        self.callback_every = callback_every
+
+    def enter_node(self, depth: int) -> None:
+        """Counts a search-tree node at ``depth``."""
+        self.search_nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if self.callback is not None and self.search_nodes % self.callback_every == 0:
+            self.callback(self)
+
+    def search_over(self) -> None:
+        """Hands the final counters of a search to ``callback``."""
+        if self.callback is not None:
+            self.callback(self)
+
+    def __repr__(self) -> str:
+        counters = ', '.join(f'{name}={value}' for name, value in vars(self).items()
+                             if not name.startswith('callback'))
+        return f'{type(self).__name__}({counters})'
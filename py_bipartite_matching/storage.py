@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Contains a compact file format for the matchings of a graph, written as they are enumerated.
+
+A file starts with a fixed header, followed by the labels of the top and bottom nodes in JSON.
+Strings, numbers and booleans are stored as themselves, and tuples and frozensets as an object
+whose key names the type, so that reading a file never runs code from it. The matchings come
+next, from the first 8-aligned offset, as rows of little-endian int32 with a column per top node,
+that hold the index of the bottom node matched to it or -1. Rows are written by batches straight
+from the enumerator, so a file is never held in memory as a whole, and read back through a
+memory map.
+"""
+import itertools
+import json
+import struct
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+import networkx as nx
+
+from .py_bipartite_matching import (ARRAY, enum_maximal_matchings, enum_maximum_matchings,
+                                    enum_perfect_matchings, matching_array_labels,
+                                    _matchings_to_arrays)
+
+__all__ = ['write_matchings', 'MatchingFile', 'PERFECT', 'MAXIMUM', 'MAXIMAL']
+
+# Kinds of matchings that can be written
+PERFECT = 'perfect'
+MAXIMUM = 'maximum'
+MAXIMAL = 'maximal'
+_KINDS = (PERFECT, MAXIMUM, MAXIMAL)
+
+_MAGIC = b'PBMM'
+_VERSION = 2
+# Magic, version, kind, number of top nodes, of bottom nodes, of matchings and size of the labels
+_HEADER = struct.Struct('<4sHHIIQQ')
+_ROW_DTYPE = np.dtype('<i4')
+_ALIGNMENT = 8
+
+
+def write_matchings(graph: nx.Graph,
+                    path: str,
+                    kind: str = PERFECT,
+                    batch_size: int = 4096,
+                    **options: Any) -> int:
+    """Enumerates the matchings of a bipartite graph into a file and returns their number.
+
+    ``kind`` is `PERFECT`, `MAXIMUM` or `MAXIMAL`. The matchings are written by batches of
+    ``batch_size`` as they are enumerated, the other ``options`` are passed to the enumerator.
+    The file is read with `MatchingFile`. Node labels must be strings, numbers, or tuples and
+    frozensets of them, a ValueError is raised otherwise.
+    """
+    if kind not in _KINDS:
+        raise ValueError(f"Unknown kind of matchings '{kind}'")
+    top_nodes, bottom_nodes = matching_array_labels(graph)
+    if kind == MAXIMAL:
+        batches = _matchings_to_arrays(graph, enum_maximal_matchings(graph, **options), batch_size)
+    else:
+        enumerator = enum_perfect_matchings if kind == PERFECT else enum_maximum_matchings
+        batches = enumerator(graph, output=ARRAY, batch_size=batch_size, **options)
+    labels = json.dumps([[_encode_label(node) for node in nodes]
+                         for nodes in (top_nodes, bottom_nodes)]).encode()
+    # The enumerators check their options when they start, which must fail before the file is
+    # truncated
+    first_batch = next(batches, None)
+    if first_batch is not None:
+        batches = itertools.chain([first_batch], batches)
+
+    n_matchings = 0
+    with open(path, 'wb') as file:
+        file.write(_HEADER.pack(_MAGIC, _VERSION, _KINDS.index(kind), len(top_nodes),
+                                len(bottom_nodes), n_matchings, len(labels)))
+        file.write(labels)
+        file.write(bytes(-file.tell() % _ALIGNMENT))
+        for batch in batches:
+            file.write(batch.astype(_ROW_DTYPE, copy=False).tobytes())
+            n_matchings += len(batch)
+        # The number of matchings is only known at the end
+        file.seek(0)
+        file.write(_HEADER.pack(_MAGIC, _VERSION, _KINDS.index(kind), len(top_nodes),
+                                len(bottom_nodes), n_matchings, len(labels)))
+    return n_matchings
+
+
+# Containers of labels, stored as an object with a single key naming their type
+_LABEL_CONTAINERS = {'tuple': tuple, 'frozenset': frozenset}
+
+
+def _encode_label(label: Any) -> Any:
+    if isinstance(label, (str, int, float)):
+        return label
+    if isinstance(label, np.generic):
+        return label.item()
+    for name, container in _LABEL_CONTAINERS.items():
+        if type(label) is container:
+            return {name: [_encode_label(item) for item in label]}
+    raise ValueError(f'Node label {label!r} of type {type(label).__name__} cannot be written')
+
+
+def _decode_label(value: Any) -> Any:
+    if isinstance(value, dict):
+        (name, items), = value.items()
+        return _LABEL_CONTAINERS[name](_decode_label(item) for item in items)
+    return value
+
+
+class MatchingFile:
+    """Matchings of a file written by `write_matchings`, memory-mapped from disk.
+
+    Indexing and iterating give the matchings as top -> bottom dicts of labels, in the order they
+    were enumerated. ``rows`` is the memory-mapped array of bottom indices, whose columns follow
+    ``top_nodes`` and whose values index ``bottom_nodes``, for vectorised processing. The labels
+    are decoded from JSON, so a file from an untrusted source cannot run code when it is opened.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as file:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size or header[:len(_MAGIC)] != _MAGIC:
+                raise ValueError(f'{path} is not a file of matchings')
+            _, version, kind, n_top, n_bottom, n_matchings, labels_size = _HEADER.unpack(header)
+            if version != _VERSION:
+                raise ValueError(f'Unsupported version {version} of the file of matchings')
+            top_nodes, bottom_nodes = json.loads(file.read(labels_size).decode())
+        self.top_nodes: List[Any] = [_decode_label(node) for node in top_nodes]
+        self.bottom_nodes: List[Any] = [_decode_label(node) for node in bottom_nodes]
+        self.kind = _KINDS[kind]
+        offset = _HEADER.size + labels_size
+        offset += -offset % _ALIGNMENT
+        if n_matchings and n_top:
+            self.rows = np.memmap(path, dtype=_ROW_DTYPE, mode='r', offset=offset,
+                                  shape=(n_matchings, n_top))
+        else:
+            self.rows = np.empty((n_matchings, n_top), dtype=_ROW_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index: int) -> Dict[Any, Any]:
+        if not -len(self) <= index < len(self):
+            raise IndexError('matching index out of range')
+        return self._to_dict(self.rows[index])
+
+    def __iter__(self) -> Iterator[Dict[Any, Any]]:
+        for row in self.rows:
+            yield self._to_dict(row)
+
+    def _to_dict(self, row: np.ndarray) -> Dict[Any, Any]:
+        bottom_nodes = self.bottom_nodes
+        return {top: bottom_nodes[index]
+                for top, index in zip(self.top_nodes, row.tolist()) if index >= 0}
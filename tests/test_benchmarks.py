@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+import networkx as nx
+
+from benchmarks import graphs
+from benchmarks.run import CASES, compare, main, measure, run_cases
+from py_bipartite_matching.graphs_utils import BipartitePartition
+
+
+@pytest.mark.parametrize('graph', [
+    graphs.random_graph(5, 7, 0.5),
+    graphs.complete_graph(3),
+    graphs.ladder_graph(4),
+    graphs.cycle_graph(5),
+    graphs.davis_graph(),
+    graphs.cubelet_graph(2),
+])
+def test_benchmark_graphs_are_bipartite(graph):
+    partition = BipartitePartition(graph)
+    top_nodes = set(partition.top_nodes)
+    assert all((u in top_nodes) != (v in top_nodes) for u, v in graph.edges)
+
+
+def test_node_0_of_ladders_and_cycles_is_a_top_node():
+    for graph in (graphs.ladder_graph(4), graphs.cycle_graph(5)):
+        assert graph.nodes[0]['bipartite'] == 0
+
+
+def test_random_graphs_are_reproducible():
+    first, second = graphs.random_graph(10, 10, 0.3), graphs.random_graph(10, 10, 0.3)
+    assert nx.utils.graphs_equal(first, second)
+
+
+def test_measure_stops_at_max_matchings():
+    result = measure(lambda: iter(range(100)), max_matchings=10)
+
+    assert result['matchings'] == 10
+    assert not result['complete']
+    assert result['time_to_first'] <= result['total_time']
+    assert result['delay_p50'] <= result['delay_p90'] <= result['delay_p99'] <= result['delay_max']
+    assert result['peak_memory'] >= 0
+
+
+def test_measure_of_no_matching():
+    result = measure(lambda: iter([]), trace_memory=False)
+
+    assert result['matchings'] == 0
+    assert result['complete']
+    assert result['time_to_first'] is None
+    assert result['matchings_per_second'] is None
+    assert result['peak_memory'] is None
+
+
+def _results(**measures):
+    return {'results': {'case': measures}}
+
+
+@pytest.mark.parametrize('baseline, current, n_regressions', [
+    (_results(matchings_per_second=100.0), _results(matchings_per_second=80.0), 0),
+    (_results(matchings_per_second=100.0), _results(matchings_per_second=70.0), 1),
+    (_results(time_to_first=1.0), _results(time_to_first=1.3), 1),
+    (_results(time_to_first=1.0), _results(time_to_first=0.1), 0),
+    (_results(peak_memory=1000), _results(peak_memory=2000), 1),
+    (_results(time_to_first=None), _results(time_to_first=1.0), 0),
+    ({'results': {}}, _results(time_to_first=1.0), 0),
+])
+def test_compare(baseline, current, n_regressions):
+    assert len(compare(baseline, current, threshold=0.25)) == n_regressions
+
+
+def test_run_cases():
+    cases = [case for case in CASES if case.name.startswith('brute-force-perfect/')]
+    results = run_cases(cases, max_matchings=5, trace_memory=False)
+
+    assert set(results['results']) == {case.name for case in cases}
+    assert all(result['matchings'] == 5 for result in results['results'].values())
+    json.dumps(results)
+
+
+def test_main_exits_on_regression(tmpdir):
+    baseline = str(tmpdir.join('baseline.json'))
+    arguments = ['--filter', 'perfect/complete-8', '--max-matchings', '50', '--no-memory']
+    main(arguments + ['--output', baseline])
+    with open(baseline) as file:
+        results = json.load(file)
+    results['results']['perfect/complete-8']['matchings_per_second'] *= 100
+    with open(baseline, 'w') as file:
+        json.dump(results, file)
+
+    with pytest.raises(SystemExit):
+        main(arguments + ['--compare', baseline])
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import itertools
+
+from hypothesis import given, settings
+import hypothesis.strategies as st
+import networkx as nx
+from networkx.algorithms.bipartite.matching import maximum_matching
+import numpy as np
+
+from py_bipartite_matching.bitset_graph import BitsetBipartiteGraph
+from py_bipartite_matching.compact_graph import CompactBipartiteGraph
+from py_bipartite_matching.graphs_utils import BipartitePartition
+from py_bipartite_matching.py_bipartite_matching import (enum_perfect_matchings,
+                                                         _enum_perfect_matchings_iter)
+from .test_cubelets import create_cubelet_graph, example_0
+
+
+def trimmed_compact_graph(graph):
+    partition = BipartitePartition(graph)
+    matching = partition.top_to_bottom(maximum_matching(graph, top_nodes=partition.top_nodes))
+    if partition.n_top != partition.n_bottom or len(matching) != partition.n_top:
+        return None
+    compact_graph = CompactBipartiteGraph(graph, partition)
+    match = compact_graph.matching_from_dict(matching)
+    compact_graph.trim(match)
+    return compact_graph, match
+
+
+# A dense 7x7 graph takes about half a second to compare
+@settings(deadline=None)
+@given(st.integers(min_value=1, max_value=7), st.floats(min_value=0.2, max_value=1),
+       st.integers(min_value=0, max_value=3))
+def test_bitset_search_follows_the_compact_search(n, density, seed):
+    graph = nx.bipartite.gnmk_random_graph(n, n, max(n, round(density * n * n)), seed)
+    searches = trimmed_compact_graph(graph)
+    if searches is None:
+        return
+    compact_graph, match = searches
+    bitset_graph = BitsetBipartiteGraph(compact_graph, match)
+    matchings = [bitset_graph.matching_to_dict(mate)
+                 for mate in bitset_graph.walk_perfect_matchings()]
+    assert matchings == list(_enum_perfect_matchings_iter(compact_graph, match))
+
+
+def test_bitset_search_of_cubelets():
+    graph = create_cubelet_graph(example_0)
+    compact_graph, match = trimmed_compact_graph(graph)
+    assert BitsetBipartiteGraph.is_suitable(compact_graph)
+    bitset_graph = BitsetBipartiteGraph(compact_graph, match)
+    matchings = [compact_graph.matching_to_dict(match)]
+    matchings.extend(bitset_graph.matching_to_dict(mate)
+                     for mate in bitset_graph.walk_perfect_matchings())
+    assert matchings == list(enum_perfect_matchings(graph, workers=2))
+
+
+def test_bitset_search_array_output():
+    graph = nx.complete_bipartite_graph(5, 5)
+    batches = list(enum_perfect_matchings(graph, output='array', batch_size=50))
+    rows = np.concatenate(batches)
+    assert [len(batch) for batch in batches] == [50, 50, 20]
+    assert len({tuple(row) for row in rows.tolist()}) == 120
+    assert all(sorted(row) == list(range(5)) for row in rows.tolist())
+
+
+def test_bitset_graph_is_only_suitable_for_small_dense_graphs():
+    assert BitsetBipartiteGraph.is_suitable(CompactBipartiteGraph(
+        nx.complete_bipartite_graph(64, 64)))
+    assert not BitsetBipartiteGraph.is_suitable(CompactBipartiteGraph(
+        nx.complete_bipartite_graph(65, 65)))
+    # A perfect matching alone is too sparse
+    graph = nx.Graph()
+    graph.add_nodes_from(range(32), bipartite=0)
+    graph.add_nodes_from(range(32, 64), bipartite=1)
+    graph.add_edges_from((i, 32 + i) for i in range(32))
+    assert not BitsetBipartiteGraph.is_suitable(CompactBipartiteGraph(graph))
+    assert list(itertools.islice(enum_perfect_matchings(graph), 2)) == [
+        {i: 32 + i for i in range(32)}]
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import networkx as nx
+from networkx.algorithms.bipartite.matching import maximum_matching
+
+from py_bipartite_matching.compact_graph import CompactBipartiteGraph, UNMATCHED
+import py_bipartite_matching.graphs_utils as gu
+
+
+@pytest.mark.parametrize('n, m, k, seed', [(1, 1, 1, 0), (3, 2, 4, 1), (4, 4, 10, 2),
+                                           (5, 3, 0, 0)])
+def test_compact_graph_relabeling(n, m, k, seed):
+    graph = nx.bipartite.gnmk_random_graph(n, m, k, seed)
+    compact_graph = CompactBipartiteGraph(graph)
+
+    assert compact_graph.n_top == n
+    assert compact_graph.n_nodes == n + m
+    assert compact_graph.n_edges == compact_graph.n_alive_edges == graph.number_of_edges()
+    assert compact_graph.labels[:n] == list(gu.top_nodes(graph))
+    for node in range(compact_graph.n_nodes):
+        neighbors = {compact_graph.labels[v] for v, _ in compact_graph.neighbors(node)}
+        assert neighbors == set(graph.adj[compact_graph.labels[node]])
+        assert compact_graph.degree[node] == graph.degree[compact_graph.labels[node]]
+
+
+def test_compact_graph_matching_round_trip():
+    graph = nx.complete_bipartite_graph(3, 4)
+    matching = {0: 5, 1: 3}
+    compact_graph = CompactBipartiteGraph(graph)
+    match = compact_graph.matching_from_dict(matching)
+    assert match[2] == UNMATCHED
+    assert compact_graph.matching_to_dict(match) == matching
+
+
+def test_compact_graph_remove_nodes_of_edge_and_undo():
+    graph = nx.complete_bipartite_graph(3, 3)
+    compact_graph = CompactBipartiteGraph(graph)
+    mark = compact_graph.undo_mark()
+    compact_graph.remove_nodes_of_edge(0)
+    assert compact_graph.n_alive_edges == 4
+    assert compact_graph.degree[compact_graph.edge_top[0]] == 0
+    assert compact_graph.degree[compact_graph.edge_bottom[0]] == 0
+    compact_graph.remove_edge(8)
+    assert compact_graph.n_alive_edges == 3
+    compact_graph.remove_node(compact_graph.edge_top[8])
+    assert compact_graph.n_alive_edges == 2
+    # Undoing brings back every removed edge
+    compact_graph.undo(mark)
+    assert compact_graph.n_alive_edges == 9
+    assert all(compact_graph.alive)
+    assert all(degree == 3 for degree in compact_graph.degree)
+
+
+def test_compact_graph_trim():
+    # A 4-cycle with a pendant path: only the cycle edges are in some perfect matching
+    graph = nx.Graph()
+    graph.add_nodes_from([0, 1, 2], bipartite=0)
+    graph.add_nodes_from([3, 4, 5], bipartite=1)
+    graph.add_edges_from([(0, 3), (0, 4), (1, 3), (1, 4), (2, 4), (2, 5)])
+    matching = maximum_matching(graph, top_nodes=[0, 1, 2])
+    matching = {k: v for k, v in matching.items() if k in {0, 1, 2}}
+
+    compact_graph = CompactBipartiteGraph(graph)
+    match = compact_graph.matching_from_dict(matching)
+    compact_graph.trim(match)
+    alive_edges = {(compact_graph.labels[compact_graph.edge_top[edge]],
+                    compact_graph.labels[compact_graph.edge_bottom[edge]])
+                   for edge in range(compact_graph.n_edges) if compact_graph.alive[edge]}
+    assert alive_edges == {(0, 3), (0, 4), (1, 3), (1, 4)}
+
+
+@pytest.mark.parametrize(
+    '   edges,                                  matching,           expected_edges',
+    [
+        ([(0, 3), (1, 3), (1, 4)],                {0: 3, 1: 4},       {(0, 3), (1, 4)}),
+        ([(0, 3), (1, 3), (2, 3)],                {1: 3},             {(0, 3), (1, 3), (2, 3)}),
+        ([(0, 3), (0, 4), (1, 4), (1, 5), (2, 5)], {0: 3, 1: 4, 2: 5}, {(0, 3), (1, 4), (2, 5)}),
+        ([(0, 3), (0, 4), (1, 4), (2, 4)],        {0: 3, 1: 4},       {(0, 3), (1, 4), (2, 4)}),
+    ]
+)  # yapf: disable
+def test_compact_graph_trim_maximum(edges, matching, expected_edges):
+    graph = nx.Graph()
+    graph.add_nodes_from([0, 1, 2], bipartite=0)
+    graph.add_nodes_from([3, 4, 5], bipartite=1)
+    graph.add_edges_from(edges)
+
+    compact_graph = CompactBipartiteGraph(graph)
+    match = compact_graph.matching_from_dict(matching)
+    compact_graph.trim_maximum(match)
+    alive_edges = {(compact_graph.labels[compact_graph.edge_top[edge]],
+                    compact_graph.labels[compact_graph.edge_bottom[edge]])
+                   for edge in range(compact_graph.n_edges) if compact_graph.alive[edge]}
+    assert alive_edges == expected_edges
+
+
+@pytest.mark.parametrize('n, m, k, seed', [(4, 4, 10, 0), (5, 5, 14, 1), (6, 6, 20, 2),
+                                           (6, 6, 24, 3), (5, 3, 9, 0), (4, 6, 12, 1)])
+def test_compact_graph_incremental_trim(n, m, k, seed):
+    graph = nx.bipartite.gnmk_random_graph(n, m, k, seed)
+    matching = maximum_matching(graph, top_nodes=gu.top_nodes(graph))
+    matching = {k: v for k, v in matching.items() if k in set(gu.top_nodes(graph))}
+    compact_graph = CompactBipartiteGraph(graph)
+    match = compact_graph.matching_from_dict(matching)
+    trim = compact_graph.trim if len(matching) == n == m else compact_graph.trim_maximum
+    trim(match)
+
+    for edge in range(compact_graph.n_edges):
+        if not compact_graph.alive[edge] or edge in match:
+            continue
+        mark = compact_graph.undo_mark()
+        compact_graph.remove_edge(edge)
+        trim(match, (compact_graph.edge_top[edge], compact_graph.edge_bottom[edge]))
+        incrementally_trimmed = bytes(compact_graph.alive)
+        compact_graph.undo(mark)
+
+        compact_graph.remove_edge(edge)
+        trim(match)
+        assert bytes(compact_graph.alive) == incrementally_trimmed
+        compact_graph.undo(mark)
+
+
+@pytest.mark.parametrize(
+    '   edges,                      matching,       expected_path',
+    [
+        ([(0, 3), (1, 3)],          {0: 3},         ((0, 3), (1, 3))),
+        ([(0, 3), (0, 4)],          {0: 3},         ((0, 3), (0, 4))),
+        ([(0, 3), (1, 4)],          {0: 3, 1: 4},   None),
+    ]
+)  # yapf: disable
+def test_compact_graph_find_feasible_two_edge_path(edges, matching, expected_path):
+    graph = nx.Graph()
+    graph.add_nodes_from([0, 1, 2], bipartite=0)
+    graph.add_nodes_from([3, 4, 5], bipartite=1)
+    graph.add_edges_from(edges)
+
+    compact_graph = CompactBipartiteGraph(graph)
+    match = compact_graph.matching_from_dict(matching)
+    # The mate of a bottom node is stored as well
+    assert all(match[compact_graph.index[v]] == match[compact_graph.index[k]]
+               for k, v in matching.items())
+    free_nodes = [node for node in range(compact_graph.n_nodes) if match[node] == UNMATCHED]
+    path = compact_graph.find_feasible_two_edge_path(match, free_nodes)
+    if expected_path is None:
+        assert path is None
+    else:
+        assert tuple((compact_graph.labels[compact_graph.edge_top[edge]],
+                      compact_graph.labels[compact_graph.edge_bottom[edge]])
+                     for edge in path) == expected_path
+
+
+def test_compact_graph_free_node_index():
+    graph = nx.Graph()
+    graph.add_nodes_from([0, 1], bipartite=0)
+    graph.add_nodes_from([2, 3, 4], bipartite=1)
+    graph.add_edges_from([(0, 2), (0, 3), (1, 3), (1, 4)])
+    compact_graph = CompactBipartiteGraph(graph)
+    match = compact_graph.matching_from_dict({0: 2, 1: 3})
+    index = compact_graph.index
+    compact_graph.index_free_nodes(match, [index[4]])
+
+    old_edge, new_edge = compact_graph.find_feasible_two_edge_path(match)
+    assert compact_graph.edge_bottom[new_edge] == index[4]
+    # Once its edges are gone the free node leaves the index, and comes back with them
+    mark = compact_graph.undo_mark()
+    compact_graph.remove_node(index[4])
+    assert compact_graph.find_feasible_two_edge_path(match) is None
+    compact_graph.undo(mark)
+    assert compact_graph.find_feasible_two_edge_path(match) == (old_edge, new_edge)
+
+    # Exchanging the edges matches it, undoing the exchange frees it again
+    changes = [(node, match[node]) for node in range(compact_graph.n_nodes)]
+    match[index[1]] = match[index[4]] = new_edge
+    match[index[3]] = UNMATCHED
+    compact_graph.note_unmatched([index[3]])
+    assert compact_graph.find_feasible_two_edge_path(match) is None
+    for node, edge in changes:
+        match[node] = edge
+    compact_graph.note_unmatched([index[4]])
+    assert compact_graph.find_feasible_two_edge_path(match) == (old_edge, new_edge)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import itertools
+import math
+
+import hypothesis.strategies as st
+from hypothesis import given
+import pytest
+
+import networkx as nx
+
+from py_bipartite_matching.counting import count_perfect_matchings, count_maximum_matchings
+from py_bipartite_matching.py_bipartite_matching import (enum_perfect_matchings,
+                                                         enum_maximum_matchings)
+
+
+@st.composite
+def bipartite_graph_inputs(draw):
+    n = draw(st.integers(min_value=1, max_value=6))
+    m = draw(st.integers(min_value=1, max_value=6))
+    k = draw(st.integers(min_value=0, max_value=n * m))
+    seed = draw(st.integers(min_value=0, max_value=3))
+    return (n, m, k, seed)
+
+
+@given(bipartite_graph_inputs())
+def test_count_perfect_matchings(n_m_k_seed):
+    n, _, k, seed = n_m_k_seed
+    graph = nx.bipartite.gnmk_random_graph(n, n, min(k, n * n), seed)
+    assert count_perfect_matchings(graph) == sum(1 for _ in enum_perfect_matchings(graph))
+
+
+@given(bipartite_graph_inputs())
+def test_count_maximum_matchings(n_m_k_seed):
+    graph = nx.bipartite.gnmk_random_graph(*n_m_k_seed)
+    assert count_maximum_matchings(graph) == sum(1 for _ in enum_maximum_matchings(graph))
+
+
+@pytest.mark.parametrize('n, m', itertools.product(range(1, 8), range(0, 8)))
+def test_count_matchings_of_complete_graphs(n, m):
+    graph = nx.complete_bipartite_graph(n, m, nx.Graph)
+    expected_count = math.factorial(max(n, m)) // math.factorial(abs(n - m)) if m > 0 else 0
+    assert count_maximum_matchings(graph) == expected_count
+    assert count_perfect_matchings(graph) == (expected_count if n == m else 0)
+
+
+def test_count_matchings_of_independent_components():
+    # 60 disjoint 4-cycles: far too many matchings to enumerate, counted per component
+    k = 60
+    graph = nx.Graph()
+    for i in range(k):
+        graph.add_nodes_from([('top', 2 * i), ('top', 2 * i + 1)], bipartite=0)
+        graph.add_nodes_from([('bottom', 2 * i), ('bottom', 2 * i + 1)], bipartite=1)
+        graph.add_edges_from((('top', 2 * i + a), ('bottom', 2 * i + b))
+                             for a, b in itertools.product((0, 1), (0, 1)))
+    assert count_perfect_matchings(graph) == 2**k
+    assert count_maximum_matchings(graph) == 2**k
+
+
+@pytest.mark.parametrize('n, k, seed', [(4, 10, 0), (6, 20, 1), (8, 40, 2), (10, 50, 3),
+                                        (12, 30, 0), (12, 60, 1)])
+def test_count_perfect_matchings_methods(n, k, seed):
+    graph = nx.bipartite.gnmk_random_graph(n, n, k, seed)
+    count = count_perfect_matchings(graph, method='enumerate')
+    assert count_perfect_matchings(graph, method='permanent') == count
+    assert count_perfect_matchings(graph, method='auto') == count
+
+
+def test_count_perfect_matchings_unknown_method():
+    with pytest.raises(ValueError):
+        count_perfect_matchings(nx.complete_bipartite_graph(2, 2), method='ryser')
@@ -3,6 +3,8 @@ import pytest
 
 import networkx as nx
 from py_bipartite_matching.graphs_utils import graph_without_edge, graph_without_nodes_of_edge
+from py_bipartite_matching.graphs_utils import BipartitePartition, find_cycle_with_edge_of_matching
+from py_bipartite_matching.graphs_utils import constrained_graph
 
 @pytest.mark.parametrize(
     '   adjacency_list,             edge,               expected_adjacency_list',
@@ -43,3 +45,56 @@ def test_graph_without_edge(adjacency_list, edge, expected_adjacency_list):
     new_graph = graph_without_edge(graph, edge)
     expected_graph = nx.Graph(expected_adjacency_list)
     assert nx.is_isomorphic(new_graph, expected_graph)
+
+
+@pytest.mark.parametrize(
+    '   edges,                                      matching,       expected_cycle',
+    [
+        ([(0, 2), (2, 1), (1, 3), (3, 0)],          {0: 2, 1: 3},   [2, 1, 3, 0]),
+        ([(0, 2), (2, 1), (1, 3)],                  {0: 2, 1: 3},   None),
+        ([(0, 2), (1, 3), (3, 4), (4, 1)],          {0: 2, 1: 3},   [3, 4, 1]),
+        ([(0, 2), (1, 3), (3, 0)],                  {0: 2, 1: 3},   None),
+    ]
+)  # yapf: disable
+def test_find_cycle_with_edge_of_matching(edges, matching, expected_cycle):
+    graph = nx.DiGraph(edges)
+    if expected_cycle is None:
+        with pytest.raises(nx.NetworkXNoCycle):
+            find_cycle_with_edge_of_matching(graph, matching)
+    else:
+        assert find_cycle_with_edge_of_matching(graph, matching) == expected_cycle
+
+
+def test_bipartite_partition():
+    graph = nx.complete_bipartite_graph(2, 3)
+    partition = BipartitePartition(graph)
+    assert partition.top_nodes == [0, 1]
+    assert partition.bottom_nodes == [2, 3, 4]
+    assert (partition.n_top, partition.n_bottom) == (2, 3)
+    assert partition.is_top(1) and partition.is_bottom(2) and not partition.is_top(2)
+    # The index holds for subgraphs of the graph
+    assert partition.top_nodes_of(graph.subgraph([1, 2, 3])) == [1]
+    assert partition.top_to_bottom({0: 2, 2: 0, 1: 3, 3: 1}) == {0: 2, 1: 3}
+
+
+def test_constrained_graph():
+    graph = nx.complete_bipartite_graph(3, 3)
+    subgraph, fixed_edges = constrained_graph(graph, [(3, 0)], [(1, 4)])
+    assert fixed_edges == {0: 3}
+    assert set(subgraph.nodes) == {1, 2, 4, 5}
+    assert set(map(frozenset, subgraph.edges)) == {frozenset(edge) for edge in
+                                                   [(1, 5), (2, 4), (2, 5)]}
+
+
+@pytest.mark.parametrize(
+    'required_edges,    forbidden_edges', [
+        ([(0, 1)],          []),
+        ([],                [(0, 1)]),
+        ([(0, 3), (0, 4)],  []),
+        ([(0, 3), (1, 3)],  []),
+        ([(0, 3)],          [(3, 0)]),
+    ]
+)  # yapf: disable
+def test_constrained_graph_rejects_invalid_constraints(required_edges, forbidden_edges):
+    with pytest.raises(ValueError):
+        constrained_graph(nx.complete_bipartite_graph(3, 3), required_edges, forbidden_edges)
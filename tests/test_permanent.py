@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from py_bipartite_matching.permanent import permanent
+
+
+def brute_force_permanent(matrix):
+    total = 0
+    for permutation in itertools.permutations(range(len(matrix))):
+        if all(matrix[row][column] for row, column in enumerate(permutation)):
+            total += 1
+    return total
+
+
+@pytest.mark.parametrize('n, density, seed', itertools.product(range(0, 8), (0.3, 0.7), range(3)))
+def test_permanent(n, density, seed):
+    rng = np.random.default_rng(seed)
+    matrix = (rng.random((n, n)) < density).astype(np.int64)
+    assert permanent(matrix) == brute_force_permanent(matrix.tolist())
+
+
+@pytest.mark.parametrize('n', [1, 5, 12, 13, 16])
+def test_permanent_of_all_ones(n):
+    # Also checks the switch to Python integers when int64 could overflow
+    assert permanent(np.ones((n, n), dtype=np.int64)) == math.factorial(n)
+
+
+def test_permanent_of_non_square_matrix():
+    with pytest.raises(ValueError):
+        permanent(np.ones((2, 3), dtype=np.int64))
@@ -2,15 +2,25 @@
 """Tests for `py_bipartite_matching` package."""
 # -*- coding: utf-8 -*-
 import itertools
+import json
 import math
+import random
+import sys
 
 import hypothesis.strategies as st
 from hypothesis import given, example
+import numpy as np
 import pytest
 
 from py_bipartite_matching.brute_force_bipartite_matching import (
-    brute_force_enum_perfect_matchings, brute_force_enum_maximum_matchings)
+    brute_force_enum_perfect_matchings, brute_force_enum_maximum_matchings,
+    brute_force_enum_maximal_matchings, brute_force_matching_array)
 from py_bipartite_matching.py_bipartite_matching import enum_perfect_matchings, enum_maximum_matchings
+from py_bipartite_matching.py_bipartite_matching import (enum_maximal_matchings,
+                                                         matching_array_labels)
+from py_bipartite_matching.py_bipartite_matching import factorize_perfect_matchings
+from py_bipartite_matching.py_bipartite_matching import _matchings_to_arrays
+from py_bipartite_matching.stats import BITSET_ENGINE, COMPACT_ENGINE, EnumerationStats
 import py_bipartite_matching.graphs_utils as gu
 
 from networkx.algorithms.bipartite.matching import maximum_matching
@@ -168,3 +178,426 @@ def test_brute_force_enum_maximum_matchings(n_m_k_seed):
         brute_force_enum_maximum_matchings(graph)}
     assert matchings == brute_force_matchings
     print_debug_info(graph=graph, matchings=matchings)
+
+
+@given(bipartite_graph_inputs())
+@example((3, 3, 4, 0))
+def test_brute_force_enum_maximal_matchings(n_m_k_seed):
+    n, m, k, seed = n_m_k_seed
+    graph = nx.bipartite.gnmk_random_graph(n, m, k, seed)
+
+    matchings = [frozenset(matching.items()) for matching in enum_maximal_matchings(graph)]
+    brute_force_matchings = {frozenset(matching.items()) for matching in
+                             brute_force_enum_maximal_matchings(graph)}
+    assert len(matchings) == len(set(matchings))
+    assert set(matchings) == brute_force_matchings
+
+
+def sorted_rows(batches, n_columns):
+    rows = np.concatenate(list(batches) or [np.empty((0, n_columns), dtype=np.int32)])
+    return rows[np.lexsort(rows.T[::-1])]
+
+
+@pytest.mark.parametrize('kind, n, m, k, seed', [
+    ('perfect', 10, 10, 50, 0),
+    ('perfect', 11, 11, 45, 1),
+    ('perfect', 12, 12, 48, 2),
+    ('perfect', 12, 12, 60, 3),
+    ('maximum', 10, 12, 40, 0),
+    ('maximum', 12, 9, 40, 1),
+    ('maximum', 12, 12, 36, 2),
+    ('maximal', 10, 10, 25, 0),
+    ('maximal', 12, 11, 30, 1),
+    ('maximal', 12, 12, 28, 2),
+])
+def test_enumerators_against_vectorized_brute_force(kind, n, m, k, seed):
+    graph = nx.bipartite.gnmk_random_graph(n, m, k, seed)
+    if kind == 'perfect':
+        batches = enum_perfect_matchings(graph, output='array')
+    elif kind == 'maximum':
+        batches = enum_maximum_matchings(graph, output='array')
+    else:
+        batches = _matchings_to_arrays(graph, enum_maximal_matchings(graph), 1024)
+    expected_rows = brute_force_matching_array(graph, kind)
+    assert len(expected_rows) > 1
+    assert np.array_equal(sorted_rows(batches, n), expected_rows)
+
+
+def test_vectorized_brute_force_of_small_graphs():
+    graph = nx.complete_bipartite_graph(3, 3)
+    assert brute_force_matching_array(graph).tolist() == [list(row) for row in
+                                                          itertools.permutations(range(3))]
+    # The path 0 - 2 - 1 - 3 has a perfect matching, which is its only maximum matching
+    graph = nx.Graph()
+    graph.add_nodes_from([0, 1], bipartite=0)
+    graph.add_nodes_from([2, 3], bipartite=1)
+    graph.add_edges_from([(0, 2), (1, 2), (1, 3)])
+    assert brute_force_matching_array(graph, 'maximum').tolist() == [[0, 1]]
+    assert brute_force_matching_array(graph, 'maximal').tolist() == [[-1, 0], [0, 1]]
+    with pytest.raises(ValueError):
+        brute_force_matching_array(graph, 'minimum')
+    # Without top nodes, the empty matching is the only maximal one
+    graph = nx.Graph()
+    graph.add_node(0, bipartite=1)
+    assert brute_force_matching_array(graph, 'maximal').shape == (1, 0)
+    assert brute_force_matching_array(graph, 'maximum').shape == (0, 0)
+
+
+def test_maximal_matchings_with_mixed_labels():
+    # Labels of different types are never compared
+    graph = nx.Graph()
+    graph.add_nodes_from([0, 'a', (1, 2)], bipartite=0)
+    graph.add_nodes_from(['b', 3.5], bipartite=1)
+    graph.add_edges_from([(0, 'b'), (0, 3.5), ('a', 'b'), ((1, 2), 3.5)])
+    matchings = [frozenset(matching.items()) for matching in enum_maximal_matchings(graph)]
+    assert set(matchings) == {frozenset(matching.items()) for matching in
+                              brute_force_enum_maximal_matchings(graph)}
+
+
+def test_maximal_matchings_of_large_graph():
+    graph = nx.bipartite.gnmk_random_graph(1000, 1000, 3000, 0)
+    edges = {(top, bottom) for top, bottom in graph.edges()}
+    for matching in itertools.islice(enum_maximal_matchings(graph), 100):
+        covered = set(matching) | set(matching.values())
+        assert len(covered) == 2 * len(matching)
+        assert all(edge in edges for edge in matching.items())
+        assert all(top in covered or bottom in covered for top, bottom in edges)
+
+
+def disjoint_squares_graph(k):
+    # k disjoint 4-cycles, with 2^k perfect matchings and a search tree of depth k
+    graph = nx.Graph()
+    for i in range(k):
+        graph.add_nodes_from([('top', 2 * i), ('top', 2 * i + 1)], bipartite=0)
+        graph.add_nodes_from([('bottom', 2 * i), ('bottom', 2 * i + 1)], bipartite=1)
+        graph.add_edges_from((('top', 2 * i + a), ('bottom', 2 * i + b))
+                             for a, b in itertools.product((0, 1), (0, 1)))
+    return graph
+
+
+@pytest.mark.parametrize('enumerator', [enum_perfect_matchings, enum_maximum_matchings])
+def test_deep_search_tree_does_not_recurse(enumerator):
+    k = 150
+    graph = disjoint_squares_graph(k)
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(100)
+    try:
+        matchings = list(itertools.islice(enumerator(graph), k + 1))
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+    assert len({frozenset(matching.items()) for matching in matchings}) == k + 1
+
+
+@pytest.mark.parametrize('enumerator', [enum_perfect_matchings, enum_maximum_matchings])
+@pytest.mark.parametrize('graph', [
+    nx.complete_bipartite_graph(5, 5),
+    nx.complete_bipartite_graph(3, 5),
+    nx.bipartite.gnmk_random_graph(6, 6, 20, 1),
+    disjoint_squares_graph(6),
+])
+def test_parallel_enumeration(enumerator, graph):
+    matchings = list(enumerator(graph))
+    # An ordered parallel search yields the matchings in the same order as the serial one
+    assert list(enumerator(graph, workers=2)) == matchings
+    unordered_matchings = list(enumerator(graph, workers=2, ordered=False))
+    assert len(unordered_matchings) == len(matchings)
+    assert ({frozenset(matching.items()) for matching in unordered_matchings} ==
+            {frozenset(matching.items()) for matching in matchings})
+
+
+@given(balanced_bipartite_graph_inputs())
+def test_factorize_perfect_matchings(n_k_seed):
+    n, k, seed = n_k_seed
+    graph = nx.bipartite.gnmk_random_graph(n, n, k, seed)
+    matchings = {frozenset(matching.items()) for matching in enum_perfect_matchings(graph)}
+
+    factorized_matchings = factorize_perfect_matchings(graph)
+    assert len(factorized_matchings) == len(matchings)
+    streamed_matchings = [frozenset(matching.items())
+                          for matching in enum_perfect_matchings(graph, factorize=True)]
+    assert len(streamed_matchings) == len(matchings)
+    assert set(streamed_matchings) == matchings
+    # Indexing follows the order of iteration
+    assert [frozenset(factorized_matchings[index].items())
+            for index in range(len(factorized_matchings))] == streamed_matchings
+
+
+def test_factorize_perfect_matchings_of_independent_components():
+    k = 100
+    factorized_matchings = factorize_perfect_matchings(disjoint_squares_graph(k))
+    assert len(factorized_matchings.factors) == k
+    assert factorized_matchings.n_matchings == 2**k
+    assert factorized_matchings[-1] == factorized_matchings[2**k - 1]
+    with pytest.raises(IndexError):
+        factorized_matchings[2**k]
+
+
+def weighted_graph(graph, seed):
+    rng = random.Random(seed)
+    for top, bottom in graph.edges:
+        graph.edges[top, bottom]['cost'] = rng.randint(-3, 9)
+    return graph
+
+
+@pytest.mark.parametrize('enumerator', [enum_perfect_matchings, enum_maximum_matchings])
+@given(bipartite_graph_inputs())
+def test_ranked_enumeration(enumerator, n_m_k_seed):
+    n, m, k, seed = n_m_k_seed
+    graph = weighted_graph(nx.bipartite.gnmk_random_graph(n, m, k, seed), seed)
+    matchings = {frozenset(matching.items()) for matching in enumerator(graph)}
+
+    ranked_matchings = list(enumerator(graph, weight='cost'))
+    assert len(ranked_matchings) == len(matchings)
+    assert {frozenset(matching.items()) for matching in ranked_matchings} == matchings
+    weights = [sum(graph.edges[edge]['cost'] for edge in matching.items())
+               for matching in ranked_matchings]
+    assert weights == sorted(weights)
+    assert list(enumerator(graph, weight='cost', k=3)) == ranked_matchings[:3]
+
+
+def test_ranked_enumeration_finds_the_cheapest_matchings_first():
+    graph = weighted_graph(nx.complete_bipartite_graph(7, 7), 0)
+    weights = sorted(sum(graph.edges[edge]['cost'] for edge in matching.items())
+                     for matching in enum_perfect_matchings(graph))
+    ranked_matchings = list(enum_perfect_matchings(graph, weight='cost', k=10))
+    assert [sum(graph.edges[edge]['cost'] for edge in matching.items())
+            for matching in ranked_matchings] == weights[:10]
+    assert len(list(enum_perfect_matchings(graph, k=10))) == 10
+
+
+def satisfies_constraints(matching, required_edges, forbidden_edges):
+    return (all(matching.get(top) == bottom for top, bottom in required_edges) and
+            all(matching.get(top) != bottom for top, bottom in forbidden_edges))
+
+
+@pytest.mark.parametrize('enumerator', [enum_perfect_matchings, enum_maximum_matchings])
+@given(bipartite_graph_inputs(), st.randoms())
+def test_constrained_enumeration(enumerator, n_m_k_seed, rng):
+    n, m, k, seed = n_m_k_seed
+    graph = nx.bipartite.gnmk_random_graph(n, m, k, seed)
+    edges = sorted(tuple(sorted(edge)) for edge in graph.edges)
+    required_edges = rng.sample(edges, min(len(edges), 1))
+    forbidden_edges = [edge for edge in rng.sample(edges, min(len(edges), 2))
+                       if edge not in required_edges]
+    matchings = {frozenset(matching.items()) for matching in enumerator(graph)
+                 if satisfies_constraints(matching, required_edges, forbidden_edges)}
+
+    constrained_matchings = list(enumerator(graph, required_edges=required_edges,
+                                            forbidden_edges=forbidden_edges))
+    assert len(constrained_matchings) == len(matchings)
+    assert {frozenset(matching.items()) for matching in constrained_matchings} == matchings
+
+
+@pytest.mark.parametrize('enumerator',
+                         [enum_perfect_matchings, enum_maximum_matchings, enum_maximal_matchings])
+def test_constrained_enumeration_of_required_matching(enumerator):
+    graph = nx.complete_bipartite_graph(2, 2)
+    assert list(enumerator(graph, required_edges=[(0, 2), (1, 3)])) == [{0: 2, 1: 3}]
+    assert list(enumerator(graph, forbidden_edges=[(0, 2)])) == [{0: 3, 1: 2}]
+    with pytest.raises(ValueError):
+        list(enumerator(graph, required_edges=[(0, 1)]))
+
+
+def test_constrained_maximal_matchings():
+    # Path 0 - 3 - 1 - 4 - 2, whose maximal matchings are {0: 3, 1: 4}, {0: 3, 2: 4}, {1: 3, 2: 4}
+    graph = nx.Graph()
+    graph.add_nodes_from([0, 1, 2], bipartite=0)
+    graph.add_nodes_from([3, 4], bipartite=1)
+    graph.add_edges_from([(0, 3), (1, 3), (1, 4), (2, 4)])
+    assert (list(enum_maximal_matchings(graph, required_edges=[(2, 4)], forbidden_edges=[(0, 3)]))
+            == [{1: 3, 2: 4}])
+    # {0: 3} alone is not maximal, as the forbidden edge (1, 4) could still be added
+    assert list(enum_maximal_matchings(graph, required_edges=[(0, 3)],
+                                       forbidden_edges=[(1, 4)])) == [{0: 3, 2: 4}]
+
+
+@pytest.mark.parametrize('enumerator, graph', [
+    (enum_perfect_matchings, nx.complete_bipartite_graph(5, 5)),
+    (enum_perfect_matchings, nx.bipartite.gnmk_random_graph(6, 6, 24, 2)),
+    (enum_maximum_matchings, nx.complete_bipartite_graph(5, 5)),
+    (enum_maximum_matchings, nx.complete_bipartite_graph(4, 6)),
+    (enum_maximum_matchings, nx.bipartite.gnmk_random_graph(6, 5, 20, 2)),
+])
+def test_pruned_enumeration(enumerator, graph):
+    # Matchings where 0 and 1 have consecutive partners are ruled out as soon as both are fixed
+    def conflict(matching):
+        return 0 in matching and 1 in matching and abs(matching[0] - matching[1]) == 1
+
+    def prune(fixed_edges, remaining_graph):
+        assert not set(fixed_edges) & set(remaining_graph)
+        return conflict(fixed_edges)
+
+    matchings = list(enumerator(graph))
+    stats = EnumerationStats()
+    pruned_matchings = list(enumerator(graph, prune=prune, stats=stats))
+    frozen_matchings = {frozenset(matching.items()) for matching in pruned_matchings}
+    assert len(frozen_matchings) == len(pruned_matchings)
+    assert ({matching for matching in frozen_matchings if not conflict(dict(matching))} ==
+            {frozenset(matching.items()) for matching in matchings if not conflict(matching)})
+    assert len(pruned_matchings) < len(matchings)
+    assert stats.pruned_subtrees == stats.pruned_plus + stats.pruned_minus > 0
+    assert stats.prune_checks > stats.pruned_subtrees
+
+
+@pytest.mark.parametrize('enumerator', [enum_perfect_matchings, enum_maximum_matchings])
+def test_pruned_enumeration_of_required_edges(enumerator):
+    # The required edges leave no edge to match, prune gets the nodes left
+    graph = nx.complete_bipartite_graph(2, 2 if enumerator is enum_perfect_matchings else 3)
+    calls = []
+
+    def prune(fixed_edges, remaining_graph):
+        calls.append((fixed_edges, set(remaining_graph)))
+        return False
+
+    assert list(enumerator(graph, required_edges=[(0, 2), (1, 3)], prune=prune)) == [{0: 2, 1: 3}]
+    assert calls == [({0: 2, 1: 3}, set(graph) - {0, 1, 2, 3})]
+
+
+def test_pruned_enumeration_of_root():
+    stats = EnumerationStats()
+    graph = nx.complete_bipartite_graph(3, 3)
+    assert list(enum_perfect_matchings(graph, prune=lambda *_: True, stats=stats)) == []
+    assert (stats.prune_checks, stats.pruned_subtrees, stats.pruned_plus) == (1, 1, 0)
+    with pytest.raises(ValueError):
+        list(enum_perfect_matchings(graph, workers=2, prune=lambda *_: True))
+
+
+@pytest.mark.parametrize('enumerator, graph', [
+    (enum_perfect_matchings, nx.complete_bipartite_graph(5, 5)),
+    (enum_perfect_matchings, nx.bipartite.gnmk_random_graph(7, 7, 25, 3)),
+    (enum_maximum_matchings, nx.complete_bipartite_graph(4, 6)),
+    (enum_maximum_matchings, nx.bipartite.gnmk_random_graph(6, 5, 15, 2)),
+])
+def test_enumeration_stats(enumerator, graph):
+    exported = []
+    stats = EnumerationStats(callback=lambda counters: exported.append(counters.search_nodes),
+                             callback_every=10)
+    matchings = list(enumerator(graph, stats=stats))
+    assert matchings == list(enumerator(graph))
+
+    # Every node but the root yields a new matching and has a G+(e) and a G-(e) child
+    n_matchings = len(matchings)
+    assert stats.search_nodes == 2 * n_matchings - 1
+    assert stats.cycle_searches == n_matchings - 1
+    assert stats.trims == 2 * (n_matchings - 1)
+    assert 0 < stats.max_depth < stats.search_nodes
+    assert stats.removed_edges >= stats.restored_edges > 0
+    assert min(stats.cycle_search_time, stats.trim_time, stats.update_time) > 0
+    assert exported == list(range(10, stats.search_nodes + 1, 10)) + [stats.search_nodes]
+    assert 'search_nodes' in repr(stats) and 'callback' not in repr(stats)
+
+
+def test_enumeration_stats_of_both_engines():
+    # The bitset search follows the compact one, which a prune predicate selects
+    graph = nx.complete_bipartite_graph(5, 5)
+    bitset_stats = EnumerationStats()
+    compact_stats = EnumerationStats()
+    assert (list(enum_perfect_matchings(graph, stats=bitset_stats)) ==
+            list(enum_perfect_matchings(graph, prune=lambda *_: False, stats=compact_stats)))
+    assert (bitset_stats.engine, compact_stats.engine) == (BITSET_ENGINE, COMPACT_ENGINE)
+    for name in ('search_nodes', 'max_depth', 'cycle_searches', 'trims', 'removed_edges'):
+        assert getattr(bitset_stats, name) == getattr(compact_stats, name)
+    assert compact_stats.removed_edges == compact_stats.restored_edges
+
+
+def test_enumeration_stats_arguments():
+    with pytest.raises(ValueError):
+        EnumerationStats(callback_every=0)
+    stats = EnumerationStats()
+    assert list(enum_perfect_matchings(nx.complete_bipartite_graph(1, 1), stats=stats)) == [{0: 1}]
+    assert (stats.search_nodes, stats.max_depth, stats.cycle_searches) == (1, 0, 0)
+    # The workers and the other searches do not fill the stats
+    graph = nx.complete_bipartite_graph(3, 3)
+    for options in ({'workers': 2}, {'factorize': True}, {'weight': 'weight'}):
+        with pytest.raises(ValueError):
+            list(enum_perfect_matchings(graph, stats=stats, **options))
+    with pytest.raises(ValueError):
+        list(enum_maximum_matchings(graph, workers=2, stats=stats))
+
+
+@pytest.mark.parametrize('enumerator, graph', [
+    (enum_perfect_matchings, nx.complete_bipartite_graph(5, 5)),
+    (enum_perfect_matchings, nx.bipartite.gnmk_random_graph(7, 7, 30, 1)),
+    (enum_maximum_matchings, nx.complete_bipartite_graph(3, 6)),
+    (enum_maximum_matchings, nx.bipartite.gnmk_random_graph(6, 8, 30, 1)),
+])
+@pytest.mark.parametrize('interruption', [1, 17, 50])
+def test_resumed_enumeration(enumerator, graph, interruption):
+    matchings = list(enumerator(graph))
+    checkpoints = []
+
+    def save(checkpoint):
+        checkpoints.append(json.loads(json.dumps(checkpoint)))
+
+    interrupted_matchings = list(itertools.islice(
+        enumerator(graph, checkpoint=save, checkpoint_every=7), interruption))
+    # The search stops before it takes the checkpoint of the last matchings
+    checkpoint = checkpoints[-1] if checkpoints else None
+    n_saved = checkpoint['n_matchings'] if checkpoint else 0
+    assert interrupted_matchings[:n_saved] == matchings[:n_saved]
+    resumed_matchings = list(enumerator(graph, resume=checkpoint))
+    assert interrupted_matchings[:n_saved] + resumed_matchings == matchings
+
+
+def test_checkpoint_of_finished_search():
+    checkpoints = []
+    graph = nx.complete_bipartite_graph(3, 3)
+    assert len(list(enum_perfect_matchings(graph, checkpoint=checkpoints.append))) == 6
+    assert checkpoints[-1]['n_matchings'] == 6
+    assert list(enum_perfect_matchings(graph, resume=checkpoints[-1])) == []
+    with pytest.raises(ValueError):
+        list(enum_maximum_matchings(graph, resume=checkpoints[-1]))
+
+
+@pytest.mark.parametrize('enumerator, graph, options', [
+    (enum_perfect_matchings, nx.complete_bipartite_graph(5, 5), {}),
+    (enum_perfect_matchings, nx.bipartite.gnmk_random_graph(6, 6, 24, 2), {'workers': 2}),
+    (enum_perfect_matchings, nx.complete_bipartite_graph(4, 4), {'required_edges': [(0, 5)]}),
+    (enum_maximum_matchings, nx.complete_bipartite_graph(3, 5), {}),
+    (enum_maximum_matchings, nx.complete_bipartite_graph(5, 3), {'k': 12}),
+])
+def test_array_output(enumerator, graph, options):
+    matchings = list(enumerator(graph, **options))
+    batches = list(enumerator(graph, output='array', batch_size=7, **options))
+    top_nodes, bottom_nodes = matching_array_labels(graph)
+    assert all(batch.dtype == np.int32 and batch.shape[1] == len(top_nodes) for batch in batches)
+    assert [len(batch) for batch in batches[:-1]] == [7] * (len(batches) - 1)
+    assert [{top: bottom_nodes[index] for top, index in zip(top_nodes, row) if index >= 0}
+            for batch in batches for row in batch] == matchings
+
+
+@pytest.mark.parametrize('enumerator', [enum_perfect_matchings, enum_maximum_matchings])
+@given(bipartite_graph_inputs())
+def test_delta_output(enumerator, n_m_k_seed):
+    n, m, k, seed = n_m_k_seed
+    graph = nx.bipartite.gnmk_random_graph(n, m, k, seed)
+    matchings = list(enumerator(graph))
+    # The changes are applied to a single assignment
+    assignment = {}
+    seen = []
+    for index, parent, changes in enumerator(graph, output='delta'):
+        assert index == len(seen)
+        assert (parent is None) == (index == 0)
+        for top, old_bottom, new_bottom in changes:
+            assert assignment.get(top) == old_bottom != new_bottom
+            if new_bottom is None:
+                del assignment[top]
+            else:
+                assignment[top] = new_bottom
+        assert assignment == matchings[index]
+        if parent is not None:
+            # A matching comes from an earlier one by an alternating cycle or path
+            assert parent < index
+            assert seen[parent] != assignment
+        seen.append(dict(assignment))
+    assert len(seen) == len(matchings)
+
+
+@pytest.mark.parametrize('options', [
+    {'workers': 2}, {'weight': 'weight'}, {'required_edges': [(0, 4)]}, {'resume': {}},
+    {'checkpoint': print}
+])
+def test_delta_output_needs_serial_search(options):
+    graph = nx.complete_bipartite_graph(4, 4)
+    with pytest.raises(ValueError):
+        list(enum_perfect_matchings(graph, output='delta', **options))
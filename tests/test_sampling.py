@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import collections
+import math
+
+import pytest
+
+import networkx as nx
+
+from py_bipartite_matching.sampling import sample_perfect_matchings
+from py_bipartite_matching.py_bipartite_matching import enum_perfect_matchings
+
+
+@pytest.mark.parametrize('method', ['auto', 'exact', 'mcmc'])
+@pytest.mark.parametrize('n, k, seed', [(3, 9, 0), (4, 10, 1), (5, 15, 2), (6, 20, 3)])
+def test_sample_perfect_matchings(method, n, k, seed):
+    graph = nx.bipartite.gnmk_random_graph(n, n, k, seed)
+    matchings = {frozenset(matching.items()) for matching in enum_perfect_matchings(graph)}
+    samples = sample_perfect_matchings(graph, 3000, seed=seed, method=method)
+    if not matchings:
+        assert samples == []
+        return
+    counter = collections.Counter(frozenset(sample.items()) for sample in samples)
+    assert sum(counter.values()) == 3000
+    # Every perfect matching is drawn, and the frequencies pass a chi-square test of uniformity
+    assert set(counter) == matchings
+    expected_frequency = 3000 / len(matchings)
+    statistic = sum((frequency - expected_frequency)**2 / expected_frequency
+                    for frequency in counter.values())
+    assert statistic <= chi_square_critical_value(len(matchings) - 1)
+
+
+def chi_square_critical_value(degrees_of_freedom, z=3.09):
+    # Wilson-Hilferty approximation of the quantile of the chi-square distribution at the
+    # standard normal quantile z, 3.09 for a significance level of 0.001
+    if degrees_of_freedom == 0:
+        return 0.0
+    ratio = 2 / (9 * degrees_of_freedom)
+    return degrees_of_freedom * (1 - ratio + z * math.sqrt(ratio))**3
+
+
+def test_sample_perfect_matchings_is_reproducible():
+    graph = nx.complete_bipartite_graph(6, 6)
+    for method in ('exact', 'mcmc'):
+        assert (sample_perfect_matchings(graph, 20, seed=7, method=method) ==
+                sample_perfect_matchings(graph, 20, seed=7, method=method))
+
+
+def test_sample_perfect_matchings_unknown_method():
+    with pytest.raises(ValueError):
+        sample_perfect_matchings(nx.complete_bipartite_graph(2, 2), 1, method='gibbs')
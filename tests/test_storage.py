@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import networkx as nx
+
+from py_bipartite_matching.storage import MatchingFile, write_matchings
+from py_bipartite_matching.py_bipartite_matching import (enum_maximal_matchings,
+                                                         enum_maximum_matchings,
+                                                         enum_perfect_matchings)
+
+
+def labeled_graph():
+    graph = nx.Graph()
+    graph.add_nodes_from([('a', 0), ('b', 0), ('c', 0)], bipartite=0)
+    graph.add_nodes_from([('x', 1), ('y', 1), ('z', 1), ('w', 1)], bipartite=1)
+    graph.add_edges_from([(('a', 0), ('x', 1)), (('a', 0), ('y', 1)), (('b', 0), ('y', 1)),
+                          (('b', 0), ('z', 1)), (('c', 0), ('z', 1)), (('c', 0), ('w', 1)),
+                          (('c', 0), ('x', 1))])
+    return graph
+
+
+@pytest.mark.parametrize('kind, enumerator, graph', [
+    ('perfect', enum_perfect_matchings, nx.complete_bipartite_graph(4, 4)),
+    ('perfect', enum_perfect_matchings, nx.complete_bipartite_graph(3, 4)),
+    ('maximum', enum_maximum_matchings, nx.complete_bipartite_graph(3, 5)),
+    ('maximum', enum_maximum_matchings, labeled_graph()),
+    ('maximal', enum_maximal_matchings, labeled_graph()),
+])
+def test_write_matchings(tmp_path, kind, enumerator, graph):
+    path = str(tmp_path / 'matchings.bin')
+    matchings = list(enumerator(graph))
+    assert write_matchings(graph, path, kind, batch_size=5) == len(matchings)
+
+    matching_file = MatchingFile(path)
+    assert matching_file.kind == kind
+    assert len(matching_file) == len(matchings)
+    assert list(matching_file) == matchings
+    assert ([matching_file[index] for index in range(-1, len(matchings) - 1)] ==
+            matchings[-1:] + matchings[:-1])
+    with pytest.raises(IndexError):
+        matching_file[len(matchings)]
+    assert matching_file.rows.shape == (len(matchings), len(matching_file.top_nodes))
+
+
+def test_write_matchings_with_options(tmp_path):
+    path = str(tmp_path / 'matchings.bin')
+    graph = nx.complete_bipartite_graph(5, 5)
+    assert write_matchings(graph, path, required_edges=[(0, 5)], k=10) == 10
+    assert all(matching[0] == 5 for matching in MatchingFile(path))
+    with pytest.raises(ValueError):
+        write_matchings(graph, path, kind='minimal')
+
+
+def test_write_matchings_keeps_file_on_invalid_options(tmp_path):
+    path = tmp_path / 'matchings.bin'
+    path.write_bytes(b'previous content')
+    graph = nx.complete_bipartite_graph(2, 2)
+    for kind in ('perfect', 'maximum', 'maximal'):
+        with pytest.raises(ValueError):
+            write_matchings(graph, str(path), kind, required_edges=[(0, 'missing')])
+    assert path.read_bytes() == b'previous content'
+
+
+def test_write_matchings_labels(tmp_path):
+    path = str(tmp_path / 'matchings.bin')
+    tops = [0.5, ('a', (1, 2)), frozenset({'b', 3})]
+    bottoms = ['x', True, ('y', )]
+    graph = nx.Graph()
+    graph.add_nodes_from(tops, bipartite=0)
+    graph.add_nodes_from(bottoms, bipartite=1)
+    graph.add_edges_from(zip(tops, bottoms))
+    write_matchings(graph, path)
+
+    matching_file = MatchingFile(path)
+    assert matching_file.top_nodes == tops
+    assert matching_file.bottom_nodes == bottoms
+    assert list(matching_file) == [dict(zip(tops, bottoms))]
+
+    graph = nx.Graph()
+    graph.add_node(object(), bipartite=0)
+    with pytest.raises(ValueError):
+        write_matchings(graph, path)